@@ -0,0 +1,422 @@
+#Etapas de análisis en memoria: decodificación, rostro, manos e intensidades por zona
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import config
+import perfiles
+from handsMesh import (segmentar_manos_imagen, detectar_manos, geometria_manos, etiquetar_zonas_manos,
+                       dibujar_manos, COLOR_MANOS, VERSION_MODELO_MANOS)
+from faceMesh import detectar_rostro, landmarks_a_pixeles, VERSION_MODELO_ROSTRO
+from estadisticasZonas import estadisticas_por_zona, estadisticas_por_etiqueta
+from cacheResultados import cache_etapas, VERSION_ETAPAS
+from metricas import cronometrar
+
+logger = logging.getLogger(__name__)
+
+# Hilos auxiliares para la etapa de manos del análisis completo; las instancias
+# de Hands salen del pool, así que no se cargan modelos adicionales
+_ejecutor_manos = ThreadPoolExecutor(max_workers=config.EJECUTOR_HILOS, thread_name_prefix="manos")
+
+# Definir zonas faciales
+ZONAS_ROSTRO = {
+    "Frente": [9, 336, 296, 334, 293, 301, 251, 284, 332, 297, 338, 10, 109, 67, 103, 54, 21, 71, 63, 105, 66, 107],
+    "Mejilla Izquierda": [138, 215, 177, 137, 227, 111, 31, 228, 229, 230, 120, 47, 126, 209, 129, 203, 206, 216],
+    "Mejilla Derecha": [367, 435, 401, 366, 447, 340, 261, 448, 449, 450, 349, 277, 355, 429, 358, 423, 426, 436],
+    "Nariz": [2, 326, 328, 290, 392, 439, 278, 279, 420, 399, 419, 351, 168, 122, 196, 174, 198, 49, 48, 219, 64, 98, 97],
+    "Ojo Izquierdo": [223, 222, 221, 189, 245, 128, 232, 231, 230, 229, 228, 31, 226, 113, 225, 224],
+    "Ojo Derecho": [443, 444, 445, 342, 446, 261, 448, 449, 450, 350, 357, 464, 413, 441, 442],
+    "Boca": [17, 314, 405, 321, 375, 287, 409, 270, 269, 267, 0, 37, 39, 40, 185, 57, 146, 91, 181, 84],
+    "Menton": [17, 314, 405, 321, 375, 287, 432, 434, 364, 394, 395, 369, 396, 175, 171, 140, 170, 169, 135, 214, 212, 57, 61, 146, 91, 181, 84],
+    "Bozo": [2, 326, 328, 290, 327, 423, 426, 436, 410, 270, 269, 267, 0, 37, 39, 40, 185, 186, 216, 216, 206, 203, 98, 97]
+}
+
+
+class ImagenInvalida(ValueError):
+    """Los bytes recibidos no corresponden a una imagen decodificable"""
+
+
+# Primeros bytes de los formatos que decodifica cv2.imdecode
+_FIRMAS_IMAGEN = (
+    b"\xff\xd8\xff",                        # JPEG
+    b"\x89PNG\r\n\x1a\n",                   # PNG
+    b"BM",                                  # BMP
+    b"II*\x00", b"MM\x00*",                 # TIFF
+    b"\xff\x4f\xff\x51",                    # JPEG 2000 (codestream)
+    b"\x00\x00\x00\x0cjP  ",                # JPEG 2000 (JP2)
+    b"P1", b"P2", b"P3", b"P4", b"P5", b"P6", b"P7", b"PF", b"Pf",  # PBM/PGM/PPM/PAM/PFM
+    b"\x59\xa6\x6a\x95",                    # Sun raster
+    b"#?",                                  # Radiance HDR
+    b"\x76\x2f\x31\x01",                    # OpenEXR
+)
+
+
+def parece_imagen(datos):
+    """
+    Revisión barata de la cabecera (sin decodificar): True si los bytes
+    empiezan como alguno de los formatos que soporta decodificar_imagen.
+    Una imagen con cabecera válida pero dañada solo se detecta al decodificar.
+    """
+    cabecera = bytes(datos[:16])
+    if cabecera.startswith(b"RIFF"):
+        return cabecera[8:12] == b"WEBP"
+    return cabecera.startswith(_FIRMAS_IMAGEN)
+
+
+@cronometrar("decodificacion")
+def decodificar_imagen(datos):
+    """
+    Decodifica los bytes subidos a una imagen BGR (una sola vez por petición).
+
+    Raises:
+        ImagenInvalida: Si los bytes no son una imagen válida
+    """
+    image = cv2.imdecode(np.frombuffer(datos, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ImagenInvalida("No se pudo decodificar la imagen")
+    return image
+
+
+def poligonos_rostro(landmarks, w, h, zonas=ZONAS_ROSTRO):
+    """Polígono en píxeles de cada zona facial a partir de los landmarks normalizados"""
+    puntos_rostro = landmarks_a_pixeles(landmarks, w, h)
+    return {nombre_zona: puntos_rostro[indices] for nombre_zona, indices in zonas.items()}
+
+
+def procesar_zonas_rostro(image, gray_image, landmarks, zonas):
+    """
+    Calcula la intensidad promedio por zona a partir de los landmarks normalizados
+    devueltos por detectar_rostro y dibuja el contorno de cada zona en la imagen.
+    """
+    h, w = image.shape[:2]
+    poligonos = poligonos_rostro(landmarks, w, h, zonas)
+
+    estadisticas = estadisticas_por_zona(gray_image, poligonos)
+    resultados = {nombre_zona: estadisticas[nombre_zona]["promedio"] for nombre_zona in zonas}
+
+    for puntos in poligonos.values():
+        cv2.polylines(image, [puntos], isClosed=True, color=(255, 0, 255), thickness=2)
+    return resultados
+
+
+def analizar_manos_por_zonas(imagen_segmentada, gray_image, etiquetas, centroides):
+    """
+    Calcula la intensidad promedio de los píxeles en cada zona de la mano a partir
+    del mapa de etiquetas de segmentar_manos_imagen y dibuja el número de la zona
+    en una copia de la imagen segmentada.
+    """
+    try:
+        imagen_con_numeros = imagen_segmentada.copy()
+        estadisticas = estadisticas_por_etiqueta(gray_image, etiquetas, len(centroides))
+
+        resultados_manos = {}
+        for i, (zona, (cx, cy)) in enumerate(zip(estadisticas, centroides)):
+            resultados_manos[f"Zona Mano {i+1}"] = f"{zona['promedio']:.2f}"
+
+            texto = f"{i+1}"
+            cv2.putText(imagen_con_numeros, texto, (int(cx) - 10, int(cy) + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_MANOS, 1, cv2.LINE_AA)
+
+        return resultados_manos, imagen_con_numeros
+
+    except Exception as e:
+        logger.error(f"Error al analizar las manos por zonas: {str(e)}")
+        return None, None
+
+
+# ================== RESOLUCIÓN DE INFERENCIA ==================
+# La precisión de los landmarks no mejora por encima de ~1 MP, así que MediaPipe
+# y la geometría de manos trabajan sobre una copia reducida; las intensidades
+# siempre se miden sobre los píxeles originales
+
+def escala_inferencia(h, w, max_megapixeles=None):
+    """Factor (<= 1) que lleva una imagen de h x w a lo sumo a max_megapixeles"""
+    if max_megapixeles is None:
+        max_megapixeles = config.INFERENCIA_MAX_MEGAPIXELES
+    if not max_megapixeles or h * w <= max_megapixeles * 1e6:
+        return 1.0
+    return float(np.sqrt(max_megapixeles * 1e6 / (h * w)))
+
+
+def imagen_inferencia(image, max_megapixeles=None):
+    """
+    Copia reducida de la imagen para inferencia.
+
+    Returns:
+        tuple: (imagen reducida o la original si no hace falta, escala aplicada)
+    """
+    h, w = image.shape[:2]
+    escala = escala_inferencia(h, w, max_megapixeles)
+    if escala == 1.0:
+        return image, 1.0
+    tamano = (max(1, round(w * escala)), max(1, round(h * escala)))
+    return cv2.resize(image, tamano, interpolation=cv2.INTER_LINEAR), escala
+
+
+def _manos_a_resolucion_original(resultado, forma):
+    """Lleva líneas, mapa de zonas y centroides de la imagen reducida a la original"""
+    h, w = forma
+    h_red, w_red = resultado["lineas"].shape
+    if (h_red, w_red) == (h, w):
+        return resultado
+    escala_x, escala_y = w / w_red, h / h_red
+    centroides = (resultado["centroides"] + 0.5) * (escala_x, escala_y) - 0.5
+    return {
+        # Los landmarks son normalizados y no cambian con la resolución
+        "landmarks": resultado["landmarks"],
+        "lineas": cv2.resize(resultado["lineas"], (w, h), interpolation=cv2.INTER_NEAREST),
+        "etiquetas": cv2.resize(resultado["etiquetas"], (w, h), interpolation=cv2.INTER_NEAREST),
+        "centroides": centroides.reshape(-1, 2),
+    }
+
+
+# ================== CACHE DE ETAPAS ==================
+# Las etapas de inferencia (FaceMesh, Hands + geometría de zonas) se guardan por
+# hash de imagen; el render (contornos, números, PDF, JSON) siempre se recalcula
+
+def _version_etapa(version_modelo, escala):
+    return f"{VERSION_ETAPAS}|{version_modelo}|escala={escala:.6f}"
+
+
+def landmarks_rostro(image, hash_imagen=None):
+    """
+    Landmarks de FaceMesh (float32 (N, 3) normalizados, o None), detectados
+    sobre la imagen reducida a INFERENCIA_MAX_MEGAPIXELES. Con hash_imagen se
+    buscan primero en la cache de etapas y, si no están, se guardan tras detectarlos.
+    """
+    reducida, escala = imagen_inferencia(image)
+    if hash_imagen is None:
+        return detectar_rostro(reducida)
+
+    version = _version_etapa(VERSION_MODELO_ROSTRO, escala)
+    guardado = cache_etapas.obtener("rostro", hash_imagen, version)
+    if guardado is not None:
+        landmarks = guardado["landmarks"]
+        return landmarks if len(landmarks) else None
+
+    landmarks = detectar_rostro(reducida)
+    cache_etapas.guardar("rostro", hash_imagen, version, {
+        "landmarks": landmarks if landmarks is not None else np.zeros((0, 3), np.float32),
+    })
+    return landmarks
+
+
+def segmentacion_manos(image, hash_imagen=None):
+    """
+    Resultado de segmentar_manos_imagen (landmarks, líneas, mapa de zonas y
+    centroides) a la resolución de la imagen original. La detección y la
+    geometría se calculan sobre la imagen reducida; con hash_imagen se usa la
+    cache de etapas igual que en landmarks_rostro (se guarda la versión reducida).
+    """
+    reducida, escala = imagen_inferencia(image)
+    if hash_imagen is None:
+        return _manos_a_resolucion_original(segmentar_manos_imagen(reducida), image.shape[:2])
+
+    version = _version_etapa(VERSION_MODELO_MANOS, escala)
+    guardado = cache_etapas.obtener("manos", hash_imagen, version)
+    if guardado is not None:
+        h, w = reducida.shape[:2]
+        resultado = {
+            "landmarks": list(guardado["landmarks"]),
+            "lineas": np.unpackbits(guardado["lineas"], count=h * w).reshape(h, w) * np.uint8(255),
+            "etiquetas": guardado["etiquetas"].astype(np.int32),
+            "centroides": guardado["centroides"],
+        }
+        return _manos_a_resolucion_original(resultado, image.shape[:2])
+
+    resultado = segmentar_manos_imagen(reducida)
+    num_zonas = len(resultado["centroides"])
+    cache_etapas.guardar("manos", hash_imagen, version, {
+        "landmarks": np.array(resultado["landmarks"], np.float32).reshape(-1, 21, 3),
+        # Máscara de líneas a 1 bit por píxel y etiquetas en el tipo entero más pequeño
+        "lineas": np.packbits(resultado["lineas"] > 0),
+        "etiquetas": resultado["etiquetas"].astype(np.min_scalar_type(num_zonas)),
+        "centroides": resultado["centroides"],
+    })
+    return _manos_a_resolucion_original(resultado, image.shape[:2])
+
+
+# ================== ANÁLISIS ==================
+
+def analizar_rostro(image, hash_imagen=None):
+    """
+    Etapa de análisis de rostro: ejecuta FaceMesh una sola vez y usa los mismos
+    landmarks para el contorno de zonas y las intensidades por zona.
+
+    Args:
+        hash_imagen (str | None): Hash de los bytes subidos para usar la cache de etapas
+
+    Returns:
+        dict: "imagen" (copia con el contorno de zonas), "intensidades" y "landmarks"
+    """
+    imagen_rostro = image.copy()
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    landmarks = landmarks_rostro(image, hash_imagen)
+
+    intensidades = {}
+    if landmarks is not None:
+        intensidades = procesar_zonas_rostro(imagen_rostro, gray_image, landmarks, ZONAS_ROSTRO)
+
+    return {"imagen": imagen_rostro, "intensidades": intensidades, "landmarks": landmarks}
+
+
+def analizar_manos(image, hash_imagen=None):
+    """
+    Etapa de análisis de manos: segmenta en memoria y calcula las intensidades por
+    zona desde el mapa de etiquetas, sin volver a leer la imagen segmentada.
+
+    Args:
+        hash_imagen (str | None): Hash de los bytes subidos para usar la cache de etapas
+
+    Returns:
+        dict: "imagen" (líneas de segmentación), "imagen_numerada", "intensidades"
+              y "landmarks"
+    """
+    resultado = segmentacion_manos(image, hash_imagen)
+    imagen_segmentada = dibujar_manos(image, resultado["lineas"])
+
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    intensidades, imagen_con_numeros = analizar_manos_por_zonas(
+        imagen_segmentada, gray_image, resultado["etiquetas"], resultado["centroides"])
+
+    return {
+        "imagen": imagen_segmentada,
+        "imagen_numerada": imagen_con_numeros,
+        "intensidades": intensidades or {},
+        "landmarks": resultado["landmarks"],
+    }
+
+
+def _rostro_y_manos(etapa_rostro, etapa_manos, image, concurrente, hash_imagen):
+    if concurrente is None:
+        concurrente = config.ANALISIS_CONCURRENTE
+    if not concurrente:
+        return etapa_rostro(image, hash_imagen), etapa_manos(image, hash_imagen)
+
+    futuro_manos = perfiles.enviar(_ejecutor_manos, etapa_manos, image, hash_imagen)
+    try:
+        rostro = etapa_rostro(image, hash_imagen)
+    finally:
+        # Se espera a la etapa de manos aunque falle la de rostro, para no
+        # dejarla corriendo con el pool de manos ocupado
+        manos = futuro_manos.result()
+    return rostro, manos
+
+
+def analizar_rostro_y_manos(image, concurrente=None, hash_imagen=None):
+    """
+    Ejecuta las etapas de rostro y manos sobre la misma imagen decodificada.
+
+    Las etapas son independientes hasta armar el reporte y MediaPipe/OpenCV
+    liberan el GIL, así que por defecto la de manos corre en un hilo auxiliar
+    mientras el hilo actual procesa el rostro; la latencia queda cerca de
+    max(rostro, manos). Con concurrente=False (o ANALISIS_CONCURRENTE=0) se
+    ejecutan una tras otra.
+
+    Returns:
+        tuple: (resultado de analizar_rostro, resultado de analizar_manos)
+    """
+    return _rostro_y_manos(analizar_rostro, analizar_manos, image, concurrente, hash_imagen)
+
+
+# ================== MEDICIONES (SIN RENDER) ==================
+# Solo números: no se dibujan contornos ni se genera el PDF
+
+def _redondear_landmarks(landmarks, decimales=6):
+    return np.round(landmarks.astype(np.float64), decimales).tolist()
+
+
+def medir_rostro(image, hash_imagen=None):
+    """
+    Estadísticas por zona facial y landmarks normalizados, sin dibujar.
+
+    Returns:
+        dict: "detectado", "zonas" (nombre -> promedio, desviacion, minimo,
+              maximo, pixeles) y "landmarks" (lista de [x, y, z])
+    """
+    landmarks = landmarks_rostro(image, hash_imagen)
+    if landmarks is None:
+        return {"detectado": False, "zonas": {}, "landmarks": []}
+
+    h, w = image.shape[:2]
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    estadisticas = estadisticas_por_zona(gray_image, poligonos_rostro(landmarks, w, h))
+    return {
+        "detectado": True,
+        "zonas": {nombre_zona: estadisticas[nombre_zona] for nombre_zona in ZONAS_ROSTRO},
+        "landmarks": _redondear_landmarks(landmarks),
+    }
+
+
+def medir_manos(image, hash_imagen=None):
+    """
+    Estadísticas por zona de la mano ("Zona Mano N", con su centroide en
+    píxeles) y landmarks normalizados de cada mano, sin dibujar.
+
+    Returns:
+        dict: "manos_detectadas", "zonas" y "landmarks" (una lista de 21 [x, y, z] por mano)
+    """
+    resultado = segmentacion_manos(image, hash_imagen)
+    centroides = resultado["centroides"]
+
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    estadisticas = estadisticas_por_etiqueta(gray_image, resultado["etiquetas"], len(centroides))
+
+    zonas = {}
+    for i, (zona, (cx, cy)) in enumerate(zip(estadisticas, centroides)):
+        zonas[f"Zona Mano {i+1}"] = dict(zona, centroide=[round(float(cx), 2), round(float(cy), 2)])
+
+    return {
+        "manos_detectadas": len(resultado["landmarks"]),
+        "zonas": zonas,
+        "landmarks": [_redondear_landmarks(mano) for mano in resultado["landmarks"]],
+    }
+
+
+def medir_rostro_y_manos(image, concurrente=None, hash_imagen=None):
+    """Igual que analizar_rostro_y_manos, pero con medir_rostro y medir_manos"""
+    return _rostro_y_manos(medir_rostro, medir_manos, image, concurrente, hash_imagen)
+
+
+# ================== SEGUIMIENTO (VIDEO Y TIEMPO REAL) ==================
+# Cada cuadro usa los trackers de su sesión en lugar de las instancias de
+# imagen estática, y no pasa por las caches (los cuadros no se repiten)
+
+def medir_cuadro(image, face_mesh, hands, landmarks=True):
+    """
+    Mediciones compactas de un cuadro con FaceMesh y Hands en modo seguimiento:
+    promedio de cada zona facial (ZONAS_ROSTRO) y de cada "Zona Mano N" y,
+    opcionalmente, los landmarks con 4 decimales.
+
+    La numeración de las zonas de la mano sale del etiquetado de cada cuadro,
+    así que no se garantiza que una zona conserve su número entre cuadros.
+
+    Returns:
+        dict: "rostro" (None si no hay rostro) y "manos" ("detectadas", "zonas")
+    """
+    reducida, _ = imagen_inferencia(image)
+    h, w = image.shape[:2]
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    rostro = None
+    puntos_rostro = detectar_rostro(reducida, face_mesh=face_mesh)
+    if puntos_rostro is not None:
+        estadisticas = estadisticas_por_zona(gray_image, poligonos_rostro(puntos_rostro, w, h))
+        rostro = {"zonas": {nombre_zona: round(estadisticas[nombre_zona]["promedio"], 2)
+                            for nombre_zona in ZONAS_ROSTRO}}
+        if landmarks:
+            rostro["landmarks"] = _redondear_landmarks(puntos_rostro, 4)
+
+    puntos_manos = detectar_manos(reducida, hands=hands)
+    manos = {"detectadas": len(puntos_manos), "zonas": {}}
+    if puntos_manos:
+        etiquetas, centroides = etiquetar_zonas_manos(geometria_manos(reducida, puntos_manos))
+        if etiquetas.shape != (h, w):
+            etiquetas = cv2.resize(etiquetas, (w, h), interpolation=cv2.INTER_NEAREST)
+        estadisticas = estadisticas_por_etiqueta(gray_image, etiquetas, len(centroides))
+        manos["zonas"] = {f"Zona Mano {i+1}": round(zona["promedio"], 2) for i, zona in enumerate(estadisticas)}
+    if landmarks:
+        manos["landmarks"] = [_redondear_landmarks(mano, 4) for mano in puntos_manos]
+
+    return {"rostro": rostro, "manos": manos}
@@ -0,0 +1,414 @@
+#Generador de carga contra una instancia local de mainAmbosFullTest:app
+#
+# Reproduce un directorio de imágenes contra /procesar-imagen-rostro/,
+# /procesar-imagen-manos/ y /procesar-imagen-completa/ y reporta throughput,
+# latencias p50/p95/p99, errores por código y, si conoce el PID del servidor,
+# CPU y memoria (RSS) de cada worker a lo largo de la prueba (leídos de /proc).
+#
+# Dos modos:
+#   --concurrencia N   lazo cerrado: N clientes que envían la siguiente petición al recibir la anterior
+#   --tasa R           lazo abierto: llegadas de Poisson a R peticiones/s (como máximo --concurrencia en vuelo)
+#
+# Con --iniciar se levanta el servidor, se espera a que responda y se detiene
+# al terminar, así que se pueden comparar configuraciones de un solo comando:
+#
+#   python benchmarks/bench_carga.py --iniciar "gunicorn -w 4 -k uvicorn.workers.UvicornWorker \
+#       mainAmbosFullTest:app --bind 127.0.0.1:8000" --concurrencia 8 --duracion 60 \
+#       --json w4.json --html w4.html
+#   python benchmarks/bench_carga.py --url http://127.0.0.1:8000 --pid 1234 --tasa 5 --duracion 60
+#
+# Por defecto a cada imagen se le agregan bytes aleatorios al final (los
+# decodificadores los ignoran) para que el hash cambie y la cache de
+# resultados no responda; --con-cache envía las imágenes tal cual.
+import argparse
+import asyncio
+import glob
+import html
+import json
+import os
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "rostro": "/procesar-imagen-rostro/",
+    "manos": "/procesar-imagen-manos/",
+    "completa": "/procesar-imagen-completa/",
+}
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+TIPOS = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+
+
+# ================== WORKERS (/proc) ==================
+
+def _hijos(pid):
+    """PIDs de los procesos hijos directos (los workers de gunicorn)"""
+    hijos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(campos[1]) == pid:
+            hijos.append(int(entrada))
+    return hijos
+
+
+def _cpu_y_rss(pid):
+    """(segundos de CPU acumulados, RSS en MB) de un proceso, o None si ya no existe"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            campos = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            paginas = int(f.read().split()[1])
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(campos[11]) + int(campos[12])) / ticks, paginas * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+async def muestrear_workers(pid, intervalo, muestras, detener):
+    """Agrega a `muestras` el CPU (%) y RSS (MB) de cada worker cada `intervalo` segundos"""
+    anteriores = {}
+    inicio = time.perf_counter()
+    while not detener.is_set():
+        ahora = time.perf_counter()
+        procesos = _hijos(pid) or [pid]
+        fila = {"t": round(ahora - inicio, 2), "workers": {}}
+        for proceso in procesos:
+            medida = _cpu_y_rss(proceso)
+            if medida is None:
+                continue
+            cpu, rss = medida
+            anterior = anteriores.get(proceso)
+            porcentaje = 100 * (cpu - anterior[0]) / (ahora - anterior[1]) if anterior else 0.0
+            anteriores[proceso] = (cpu, ahora)
+            fila["workers"][str(proceso)] = {"cpu": round(porcentaje, 1), "rss_mb": round(rss, 1)}
+        if anteriores:
+            muestras.append(fila)
+        try:
+            await asyncio.wait_for(detener.wait(), intervalo)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ================== CARGA ==================
+
+def cargar_imagenes(directorio):
+    rutas = sorted(ruta for ruta in glob.glob(os.path.join(directorio, "*"))
+                   if ruta.lower().endswith(EXTENSIONES))
+    if not rutas:
+        sys.exit(f"No hay imágenes en {directorio}")
+    imagenes = []
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            imagenes.append((os.path.basename(ruta), f.read(), TIPOS[os.path.splitext(ruta)[1].lower()]))
+    return imagenes
+
+
+class Generador:
+    """Elige endpoint e imagen para cada petición y registra cada resultado"""
+
+    def __init__(self, imagenes, endpoints, con_cache, semilla):
+        self.imagenes = imagenes
+        self.endpoints = endpoints
+        self.con_cache = con_cache
+        self.rng = random.Random(semilla)
+        self.resultados = []
+        self.enviadas = 0
+
+    def siguiente(self):
+        nombre, datos, tipo = self.imagenes[self.enviadas % len(self.imagenes)]
+        endpoint = self.endpoints[self.enviadas % len(self.endpoints)]
+        self.enviadas += 1
+        if not self.con_cache:
+            datos = datos + self.rng.randbytes(16)
+        return endpoint, nombre, datos, tipo
+
+    async def enviar(self, cliente, inicio_prueba):
+        endpoint, nombre, datos, tipo = self.siguiente()
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.post(ENDPOINTS[endpoint], files={"file": (nombre, datos, tipo)})
+            await respuesta.aread()
+            estado = respuesta.status_code
+        except httpx.HTTPError as e:
+            estado = type(e).__name__
+        fin = time.perf_counter()
+        self.resultados.append({
+            "endpoint": endpoint,
+            "estado": estado,
+            "t": round(fin - inicio_prueba, 4),
+            "latencia_ms": round(1000 * (fin - inicio), 2),
+        })
+
+
+async def lazo_cerrado(generador, cliente, concurrencia, fin, inicio_prueba, max_peticiones):
+    async def cliente_virtual():
+        while time.perf_counter() < fin and (max_peticiones is None or generador.enviadas < max_peticiones):
+            await generador.enviar(cliente, inicio_prueba)
+
+    await asyncio.gather(*(cliente_virtual() for _ in range(concurrencia)))
+
+
+async def lazo_abierto(generador, cliente, tasa, concurrencia, fin, inicio_prueba, max_peticiones, rng):
+    """
+    Llegadas de Poisson a `tasa` por segundo. Si ya hay `concurrencia`
+    peticiones en vuelo la llegada se cuenta como descartada (el cliente no
+    se vuelve un lazo cerrado sin avisar).
+    """
+    en_vuelo = set()
+    descartadas = 0
+    proxima = time.perf_counter()
+    while proxima < fin and (max_peticiones is None or generador.enviadas < max_peticiones):
+        await asyncio.sleep(max(0.0, proxima - time.perf_counter()))
+        if len(en_vuelo) >= concurrencia:
+            descartadas += 1
+        else:
+            tarea = asyncio.create_task(generador.enviar(cliente, inicio_prueba))
+            en_vuelo.add(tarea)
+            tarea.add_done_callback(en_vuelo.discard)
+        proxima += rng.expovariate(tasa)
+    if en_vuelo:
+        await asyncio.gather(*en_vuelo)
+    return descartadas
+
+
+# ================== REPORTE ==================
+
+def _percentiles(latencias):
+    if not latencias:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None, "promedio_ms": None}
+    arreglo = np.asarray(latencias)
+    p50, p95, p99 = np.percentile(arreglo, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1), "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(arreglo.max()), 1), "promedio_ms": round(float(arreglo.mean()), 1)}
+
+
+def _resumen(resultados, duracion):
+    correctas = [r["latencia_ms"] for r in resultados if r["estado"] == 200]
+    errores = {}
+    for r in resultados:
+        if r["estado"] != 200:
+            errores[str(r["estado"])] = errores.get(str(r["estado"]), 0) + 1
+    total = len(resultados)
+    return {
+        "peticiones": total,
+        "correctas": len(correctas),
+        "errores": errores,
+        "tasa_error": round((total - len(correctas)) / total, 4) if total else 0.0,
+        "throughput_rps": round(len(correctas) / duracion, 3) if duracion else 0.0,
+        "latencia": _percentiles(correctas),
+    }
+
+
+def _serie(resultados, duracion):
+    """Por segundo: peticiones completadas, errores y p50/p95 de latencia"""
+    serie = []
+    for segundo in range(int(np.ceil(duracion)) or 1):
+        ventana = [r for r in resultados if segundo <= r["t"] < segundo + 1]
+        correctas = [r["latencia_ms"] for r in ventana if r["estado"] == 200]
+        latencia = _percentiles(correctas)
+        serie.append({"t": segundo, "completadas": len(correctas), "errores": len(ventana) - len(correctas),
+                      "p50_ms": latencia["p50_ms"], "p95_ms": latencia["p95_ms"]})
+    return serie
+
+
+def informe(args, generador, duracion, descartadas, muestras):
+    resultados = generador.resultados
+    return {
+        "configuracion": {
+            "url": args.url,
+            "iniciar": args.iniciar,
+            "modo": "abierto" if args.tasa else "cerrado",
+            "tasa": args.tasa,
+            "concurrencia": args.concurrencia,
+            "duracion_s": args.duracion,
+            "endpoints": args.endpoints,
+            "imagenes": len(generador.imagenes),
+            "con_cache": args.con_cache,
+            "etiqueta": args.etiqueta,
+        },
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+        "duracion_real_s": round(duracion, 3),
+        "llegadas_descartadas": descartadas,
+        "total": _resumen(resultados, duracion),
+        "por_endpoint": {endpoint: _resumen([r for r in resultados if r["endpoint"] == endpoint], duracion)
+                         for endpoint in args.endpoints},
+        "serie": _serie(resultados, duracion),
+        "workers": muestras,
+    }
+
+
+def _svg_lineas(series, titulo, unidad, ancho=640, alto=180):
+    """Gráfico de líneas SVG simple: series es {nombre: [(x, y), ...]}"""
+    puntos = [p for valores in series.values() for p in valores if p[1] is not None]
+    if not puntos:
+        return ""
+    max_x = max(x for x, _ in puntos) or 1
+    max_y = max(y for _, y in puntos) or 1
+    colores = ["#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#17becf"]
+    lineas, leyenda = [], []
+    for i, (nombre, valores) in enumerate(series.items()):
+        color = colores[i % len(colores)]
+        coordenadas = " ".join(f"{40 + x / max_x * (ancho - 50):.1f},{alto - 20 - y / max_y * (alto - 40):.1f}"
+                               for x, y in valores if y is not None)
+        lineas.append(f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{coordenadas}"/>')
+        leyenda.append(f'<span style="color:{color}">&#9632; {html.escape(nombre)}</span>')
+    return (f"<h3>{html.escape(titulo)}</h3><div>{' '.join(leyenda)}</div>"
+            f'<svg width="{ancho}" height="{alto}" style="border:1px solid #ccc">'
+            f'<text x="2" y="14" font-size="11">{max_y:.0f} {html.escape(unidad)}</text>'
+            f'<text x="{ancho - 60}" y="{alto - 4}" font-size="11">{max_x:.0f} s</text>'
+            f'{"".join(lineas)}</svg>')
+
+
+def reporte_html(datos):
+    filas = []
+    for nombre, resumen in [("total", datos["total"])] + list(datos["por_endpoint"].items()):
+        latencia = resumen["latencia"]
+        filas.append(
+            f"<tr><td>{html.escape(nombre)}</td><td>{resumen['peticiones']}</td><td>{resumen['throughput_rps']}</td>"
+            f"<td>{latencia['p50_ms']}</td><td>{latencia['p95_ms']}</td><td>{latencia['p99_ms']}</td>"
+            f"<td>{latencia['max_ms']}</td><td>{resumen['tasa_error']:.2%}</td>"
+            f"<td>{html.escape(json.dumps(resumen['errores']))}</td></tr>")
+
+    serie = datos["serie"]
+    graficos = [
+        _svg_lineas({"completadas/s": [(p["t"], p["completadas"]) for p in serie],
+                     "errores/s": [(p["t"], p["errores"]) for p in serie]}, "Throughput", "req/s"),
+        _svg_lineas({"p50": [(p["t"], p["p50_ms"]) for p in serie],
+                     "p95": [(p["t"], p["p95_ms"]) for p in serie]}, "Latencia", "ms"),
+    ]
+    workers = sorted({pid for muestra in datos["workers"] for pid in muestra["workers"]})
+    if workers:
+        for campo, titulo, unidad in (("cpu", "CPU por worker", "%"), ("rss_mb", "Memoria (RSS) por worker", "MB")):
+            graficos.append(_svg_lineas(
+                {f"pid {pid}": [(m["t"], m["workers"][pid][campo]) for m in datos["workers"] if pid in m["workers"]]
+                 for pid in workers}, titulo, unidad))
+
+    configuracion = html.escape(json.dumps(datos["configuracion"], ensure_ascii=False, indent=2))
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>Prueba de carga</title>
+<style>body{{font-family:sans-serif;margin:2em}} table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}} td:first-child{{text-align:left}}</style></head>
+<body><h1>Prueba de carga{(': ' + html.escape(datos['configuracion']['etiqueta'])) if datos['configuracion']['etiqueta'] else ''}</h1>
+<pre>{configuracion}</pre>
+<p>Duración: {datos['duracion_real_s']} s &middot; llegadas descartadas: {datos['llegadas_descartadas']}</p>
+<table><tr><th>endpoint</th><th>peticiones</th><th>req/s</th><th>p50 ms</th><th>p95 ms</th><th>p99 ms</th>
+<th>máx ms</th><th>errores</th><th>códigos</th></tr>{''.join(filas)}</table>
+{''.join(graficos)}
+</body></html>
+"""
+
+
+# ================== SERVIDOR ==================
+
+async def esperar_servidor(url, proceso, limite=120):
+    """Espera a que el servidor responda /ready (o /health si no existe)"""
+    fin = time.perf_counter() + limite
+    async with httpx.AsyncClient(base_url=url, timeout=5) as cliente:
+        while time.perf_counter() < fin:
+            if proceso is not None and proceso.poll() is not None:
+                sys.exit(f"El servidor terminó al arrancar (código {proceso.returncode})")
+            for ruta in ("/ready", "/health"):
+                try:
+                    respuesta = await cliente.get(ruta)
+                except httpx.HTTPError:
+                    break
+                if respuesta.status_code == 200:
+                    return
+                if respuesta.status_code != 404:
+                    break
+            await asyncio.sleep(0.5)
+    sys.exit(f"El servidor no respondió en {limite} s")
+
+
+async def ejecutar(args):
+    imagenes = cargar_imagenes(args.imagenes)
+    proceso = None
+    if args.iniciar:
+        proceso = subprocess.Popen(shlex.split(args.iniciar), cwd=RAIZ)
+        args.pid = proceso.pid
+    try:
+        await esperar_servidor(args.url, proceso)
+        generador = Generador(imagenes, args.endpoints, args.con_cache, args.semilla)
+        muestras, detener = [], asyncio.Event()
+        muestreo = (asyncio.create_task(muestrear_workers(args.pid, args.intervalo, muestras, detener))
+                    if args.pid and os.path.isdir("/proc") else None)
+
+        limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limites) as cliente:
+            inicio = time.perf_counter()
+            fin = inicio + args.duracion
+            descartadas = 0
+            if args.tasa:
+                descartadas = await lazo_abierto(generador, cliente, args.tasa, args.concurrencia, fin, inicio,
+                                                 args.peticiones, random.Random(args.semilla))
+            else:
+                await lazo_cerrado(generador, cliente, args.concurrencia, fin, inicio, args.peticiones)
+            duracion = time.perf_counter() - inicio
+
+        detener.set()
+        if muestreo is not None:
+            await muestreo
+        return informe(args, generador, duracion, descartadas, muestras)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            try:
+                proceso.wait(30)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de los endpoints de segmentación")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--iniciar", help="Comando que levanta el servidor (se ejecuta en la raíz del repositorio)")
+    parser.add_argument("--pid", type=int, help="PID del servidor (maestro de gunicorn) para medir CPU/RSS")
+    parser.add_argument("--imagenes", default=RAIZ, help="Directorio de imágenes a reproducir")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--concurrencia", type=int, default=4,
+                        help="Clientes en lazo cerrado, o máximo de peticiones en vuelo con --tasa")
+    parser.add_argument("--tasa", type=float, help="Llegadas por segundo (lazo abierto, Poisson)")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de prueba")
+    parser.add_argument("--peticiones", type=int, help="Máximo de peticiones (además de --duracion)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="Segundos entre muestras de CPU/RSS")
+    parser.add_argument("--con-cache", action="store_true", help="Enviar las imágenes sin variar (la cache responde)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--etiqueta", default="", help="Nombre de la configuración probada (aparece en el reporte)")
+    parser.add_argument("--json", help="Guarda el reporte en JSON")
+    parser.add_argument("--html", help="Guarda el reporte en HTML")
+    args = parser.parse_args()
+
+    datos = asyncio.run(ejecutar(args))
+    total = datos["total"]
+    print(f"{total['peticiones']} peticiones en {datos['duracion_real_s']} s: {total['throughput_rps']} req/s, "
+          f"p50 {total['latencia']['p50_ms']} ms, p95 {total['latencia']['p95_ms']} ms, "
+          f"p99 {total['latencia']['p99_ms']} ms, errores {total['tasa_error']:.2%} {total['errores'] or ''}")
+    for endpoint, resumen in datos["por_endpoint"].items():
+        print(f"  {endpoint:<9} {resumen['peticiones']:5d} pet. {resumen['throughput_rps']:7.2f} req/s  "
+              f"p50 {resumen['latencia']['p50_ms']} p95 {resumen['latencia']['p95_ms']} "
+              f"p99 {resumen['latencia']['p99_ms']} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+    if args.html:
+        with open(args.html, "w", encoding="utf-8") as f:
+            f.write(reporte_html(datos))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#Benchmark de la búsqueda de la línea de nudillos (handsMesh.buscar_nudillos)
+#
+# Compara el recorrido original paso a paso (hasta 500 pasos x 3 segmentos x
+# 1000 muestras en Python) contra buscar_nudillos sobre manos sintéticas, y
+# verifica que ambas implementaciones se detengan en las mismas posiciones.
+#
+#   python benchmarks/bench_nudillos.py --casos 20 --semilla 0
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from handsMesh import buscar_nudillos
+
+
+def buscar_nudillos_referencia(hand_points, mask, max_steps=500):
+    """Recorrido original de segmentar_manos, copiado sin cambios de comportamiento"""
+    def calculate_line_equation(p1, p2):
+        x1, y1 = hand_points[p1]
+        x2, y2 = hand_points[p2]
+        if x2 == x1:
+            return None, None
+        m = (y2 - y1) / (x2 - x1)
+        b = y1 - m * x1
+        return m, b
+
+    def move_point_up(p, m, b, step=1):
+        x, y = hand_points[p]
+        y_new = y - step
+        x_new = (y_new - b) / m if m != 0 else x
+        return int(x_new), int(y_new)
+
+    def is_line_out_of_mask(p1, p2, mask):
+        x1, y1 = p1
+        x2, y2 = p2
+
+        if mask[y1, x1] == 0 or mask[y2, x2] == 0:
+            return True
+
+        num_steps = 1000
+        for t in np.linspace(0, 1, num_steps):
+            xt = int(x1 * (1 - t) + x2 * t)
+            yt = int(y1 * (1 - t) + y2 * t)
+
+            if xt < 0 or yt < 0 or xt >= mask.shape[1] or yt >= mask.shape[0]:
+                return True
+
+            if mask[yt, xt] == 0:
+                return True
+
+        return False
+
+    m_5_6, b_5_6 = calculate_line_equation(5, 6)
+    m_9_10, b_9_10 = calculate_line_equation(9, 10)
+    m_17_18, b_17_18 = calculate_line_equation(17, 18)
+    m_13_14, b_13_14 = calculate_line_equation(13, 14)
+
+    step = 1
+    for _ in range(max_steps):
+        p5_new = move_point_up(5, m_5_6, b_5_6, step)
+        p9_new = move_point_up(9, m_9_10, b_9_10, step)
+        p17_new = move_point_up(17, m_17_18, b_17_18, step)
+        p13_new = move_point_up(13, m_13_14, b_13_14, step)
+
+        out_5_9 = is_line_out_of_mask(p5_new, p9_new, mask)
+        out_17_13 = is_line_out_of_mask(p17_new, p13_new, mask)
+        out_9_13 = is_line_out_of_mask(p9_new, p13_new, mask)
+
+        if out_5_9 and out_17_13 and out_9_13:
+            break
+
+        if not out_5_9:
+            hand_points[5] = p5_new
+            hand_points[9] = p9_new
+        if not out_17_13:
+            hand_points[17] = p17_new
+            hand_points[13] = p13_new
+        if not out_9_13:
+            hand_points[9] = p9_new
+            hand_points[13] = p13_new
+    return hand_points
+
+
+def mano_sintetica(rng, lado=900):
+    """Máscara de una palma con cuatro dedos y los landmarks 5-18 dentro de la palma"""
+    mask = np.zeros((lado, lado), np.uint8)
+    cx = lado // 2
+    ancho = int(lado * rng.uniform(0.35, 0.45))
+    alto_palma = int(lado * rng.uniform(0.25, 0.35))
+    base = int(lado * 0.85)
+    techo = base - alto_palma
+    cv2.rectangle(mask, (cx - ancho // 2, techo), (cx + ancho // 2, base), 255, -1)
+
+    hand_points = np.zeros((21, 2), np.int32)
+    separacion = ancho / 4
+    for i, (p, q) in enumerate(((5, 6), (9, 10), (13, 14), (17, 18))):
+        x = int(cx - ancho / 2 + separacion * (i + 0.5) + rng.normal(0, 3))
+        # Cada dedo arranca a una altura distinta para que los segmentos salgan en pasos distintos
+        inicio_dedo = techo - int(rng.uniform(0, 0.08) * lado)
+        inclinacion = rng.normal(0, 0.08)
+        punta = (int(x + inclinacion * lado * 0.4), int(inicio_dedo - lado * 0.3))
+        cv2.line(mask, (x, techo + 5), punta, 255, int(separacion * 0.8))
+        cv2.rectangle(mask, (x - int(separacion * 0.4), inicio_dedo), (x + int(separacion * 0.4), techo + 5), 255, -1)
+        y_base = int(base - alto_palma * rng.uniform(0.3, 0.6))
+        hand_points[p] = (x + int(inclinacion * (base - y_base) * -1), y_base)
+        hand_points[q] = (int(x + inclinacion * lado * 0.1), int(techo - lado * 0.05))
+        if hand_points[q][0] == hand_points[p][0]:
+            # La versión original no admite rectas verticales (m = None)
+            hand_points[q][0] += 1
+    return hand_points, mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--casos", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--lado", type=int, default=900)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.semilla)
+    tiempos_ref, tiempos_nuevo = [], []
+    for caso in range(args.casos):
+        puntos, mask = mano_sintetica(rng, args.lado)
+
+        inicio = time.perf_counter()
+        esperado = buscar_nudillos_referencia(puntos.copy(), mask)
+        tiempos_ref.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        obtenido = buscar_nudillos(puntos.copy(), mask)
+        tiempos_nuevo.append(time.perf_counter() - inicio)
+
+        if not np.array_equal(esperado, obtenido):
+            raise SystemExit(f"Caso {caso}: posiciones distintas\n{esperado[[5, 9, 13, 17]]}\n{obtenido[[5, 9, 13, 17]]}")
+        subida = int(puntos[[5, 9, 13, 17], 1].max() - esperado[[5, 9, 13, 17], 1].min())
+        print(f"caso {caso:3d}  subida {subida:4d}px  referencia {1000 * tiempos_ref[-1]:9.1f} ms  "
+              f"nuevo {1000 * tiempos_nuevo[-1]:7.2f} ms")
+
+    ref = 1000 * np.median(tiempos_ref)
+    nuevo = 1000 * np.median(tiempos_nuevo)
+    print(f"\nMediana: referencia {ref:.1f} ms  nuevo {nuevo:.2f} ms  (x{ref / nuevo:.0f})")
+    print("Posiciones idénticas en todos los casos")
+
+
+if __name__ == "__main__":
+    main()
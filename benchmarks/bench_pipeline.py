@@ -0,0 +1,253 @@
+#Suite de benchmarks de las etapas de segmentación, reporte y del endpoint completo
+#
+# Mide, sin red ni servicios externos, cada etapa caliente del pipeline sobre
+# las imágenes del repositorio y sobre imágenes sintéticas de 0.5/2/8/24 MP:
+#
+#   segmentar_rostro, segmentar_manos      (API de archivos de faceMesh / handsMesh)
+#   procesar_zonas_rostro                  (landmarks ya detectados)
+#   analizar_manos_por_zonas               (mapa de zonas ya calculado)
+#   pdf_completo                           (generar_pdf_completo)
+#   endpoint_completo                      (POST /procesar-imagen-completa/ con TestClient, sin caches)
+#
+# Rostro: FaceMesh real. Manos: landmarks sintéticos fijos (no hay fotos de
+# manos en el repositorio), así que las etapas de manos miden la geometría y
+# las zonas, no la detección de MediaPipe.
+#
+# Los resultados (mediana por etapa e imagen) se guardan en JSON; con --base se
+# comparan contra una ejecución guardada y el proceso termina con código 1 si
+# alguna etapa empeora más de --tolerancia por ciento:
+#
+#   python benchmarks/bench_pipeline.py --salida resultados.json
+#   python benchmarks/bench_pipeline.py --base benchmarks/linea_base.json --tolerancia 20
+#
+# benchmarks/linea_base.json se generó sobre el árbol final con
+#
+#   python benchmarks/bench_pipeline.py --repeticiones 15 --salida benchmarks/linea_base.json
+#
+# en una VM compartida de 1 CPU (ver "entorno" en el JSON). Solo es comparable
+# en una máquina equivalente: con otro número de CPUs o de versiones de
+# numpy/OpenCV/MediaPipe hay que regenerarla antes de usar --base. Con --base y
+# sin --repeticiones se usan las repeticiones de la línea base. En esa VM, dos
+# ejecuciones del mismo árbol difieren hasta un 20-40 % en algunas etapas, así
+# que ahí --tolerancia 20 da falsos positivos; como compuerta conviene una
+# máquina dedicada y sin carga.
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Sin caches (cada repetición debe recalcular), sin hilos de trabajos y con
+# límite de subida suficiente para 24 MP; se fija antes de importar config
+os.environ.update({"CACHE_MEMORIA_MB": "0", "CACHE_ETAPAS_MEMORIA_MB": "0", "CACHE_DIRECTORIO": "",
+                   "TRABAJOS_HILOS": "0", "MAX_SUBIDA_MB": "1024", "DIRECTORIO_RESULTADOS": ""})
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import handsMesh
+from faceMesh import segmentar_rostro, detectar_rostro
+from analisis import (ZONAS_ROSTRO, procesar_zonas_rostro, analizar_manos_por_zonas, segmentacion_manos,
+                      analizar_rostro_y_manos)
+from handsMesh import segmentar_manos, dibujar_manos
+from reportes import generar_pdf_completo
+from bench_resolucion_inferencia import HandsFijas, manos_sinteticas, imagen_manos, redimensionar
+
+ETAPAS = ("segmentar_rostro", "segmentar_manos", "procesar_zonas_rostro", "analizar_manos_por_zonas",
+          "pdf_completo", "endpoint_completo")
+
+
+def medir(funcion, repeticiones, preparar=None):
+    """Mediana y mínimo (ms) de `repeticiones` llamadas, tras una de calentamiento"""
+    argumentos = preparar() if preparar else ()
+    funcion(*argumentos)
+    tiempos = []
+    for _ in range(repeticiones):
+        argumentos = preparar() if preparar else ()
+        inicio = time.perf_counter()
+        funcion(*argumentos)
+        tiempos.append(1000 * (time.perf_counter() - inicio))
+    return {"mediana_ms": round(float(np.median(tiempos)), 3), "min_ms": round(min(tiempos), 3),
+            "repeticiones": repeticiones}
+
+
+def imagenes_de_prueba(megapixeles, rng, manos):
+    """
+    Pares (nombre, imagen para las etapas de rostro, imagen para las de manos):
+    las imágenes del repositorio tal cual y las sintéticas a cada tamaño.
+    """
+    corpus = sorted(glob.glob(os.path.join(RAIZ, "*_segmentado.jpg"))) + [os.path.join(RAIZ, "temp_img.png")]
+    imagenes = []
+    for ruta in corpus:
+        imagen = cv2.imread(ruta)
+        if imagen is not None:
+            imagenes.append((f"corpus:{os.path.basename(ruta)[:8]}", imagen, imagen))
+    base_rostro = cv2.imread(corpus[0])
+    base_manos = imagen_manos(rng, manos, 2000, 1500)
+    for mp_objetivo in megapixeles:
+        imagenes.append((f"sintetica:{mp_objetivo:g}MP", redimensionar(base_rostro, mp_objetivo),
+                         redimensionar(base_manos, mp_objetivo)))
+    return imagenes
+
+
+def medir_imagen(nombre, rostro, manos, etapas, repeticiones, cliente, directorio):
+    resultados = {}
+    ruta_rostro = os.path.join(directorio, "rostro.png")
+    ruta_manos = os.path.join(directorio, "manos.png")
+    salida = os.path.join(directorio, "salida.jpg")
+    cv2.imwrite(ruta_rostro, rostro)
+    cv2.imwrite(ruta_manos, manos)
+
+    if "segmentar_rostro" in etapas:
+        resultados["segmentar_rostro"] = medir(lambda: segmentar_rostro(ruta_rostro, salida), repeticiones)
+    if "segmentar_manos" in etapas:
+        resultados["segmentar_manos"] = medir(lambda: segmentar_manos(ruta_manos, salida), repeticiones)
+
+    if "procesar_zonas_rostro" in etapas:
+        landmarks = detectar_rostro(rostro)
+        if landmarks is not None:
+            gris = cv2.cvtColor(rostro, cv2.COLOR_BGR2GRAY)
+            resultados["procesar_zonas_rostro"] = medir(
+                lambda imagen: procesar_zonas_rostro(imagen, gris, landmarks, ZONAS_ROSTRO), repeticiones,
+                preparar=lambda: (rostro.copy(),))
+
+    if "analizar_manos_por_zonas" in etapas:
+        segmentacion = segmentacion_manos(manos)
+        segmentada = dibujar_manos(manos, segmentacion["lineas"])
+        gris = cv2.cvtColor(manos, cv2.COLOR_BGR2GRAY)
+        resultados["analizar_manos_por_zonas"] = medir(
+            lambda: analizar_manos_por_zonas(segmentada, gris, segmentacion["etiquetas"], segmentacion["centroides"]),
+            repeticiones)
+
+    if "pdf_completo" in etapas:
+        analisis_rostro, analisis_manos = analizar_rostro_y_manos(rostro)
+        resultados["pdf_completo"] = medir(lambda: generar_pdf_completo(analisis_rostro, analisis_manos), repeticiones)
+
+    if "endpoint_completo" in etapas:
+        ok, jpeg = cv2.imencode(".jpg", rostro)
+        datos = jpeg.tobytes()
+
+        def peticion():
+            respuesta = cliente.post("/procesar-imagen-completa/", files={"file": ("imagen.jpg", datos, "image/jpeg")})
+            if respuesta.status_code != 200:
+                raise RuntimeError(f"{nombre}: /procesar-imagen-completa/ devolvió {respuesta.status_code}")
+            return respuesta.content
+
+        resultados["endpoint_completo"] = medir(peticion, repeticiones)
+
+    return {f"{etapa}/{nombre}": valores for etapa, valores in resultados.items()}
+
+
+def entorno():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": mp.__version__,
+        "commit": commit,
+    }
+
+
+def comparar(actual, base, tolerancia, minimo_ms):
+    """
+    Compara medianas contra la línea base.
+
+    Una etapa es una regresión si empeora más de `tolerancia` por ciento y
+    además más de `minimo_ms` (para no fallar por ruido en etapas de pocos ms).
+
+    Returns:
+        list: Claves "etapa/imagen" con regresión
+    """
+    regresiones = []
+    print(f"\n{'etapa/imagen':<48} {'base ms':>10} {'actual ms':>10} {'cambio':>8}")
+    for clave, valores in actual.items():
+        if clave not in base:
+            print(f"{clave:<48} {'-':>10} {valores['mediana_ms']:10.1f} {'nuevo':>8}")
+            continue
+        anterior, nuevo = base[clave]["mediana_ms"], valores["mediana_ms"]
+        cambio = 100 * (nuevo - anterior) / anterior if anterior else 0.0
+        regresion = cambio > tolerancia and nuevo - anterior > minimo_ms
+        if regresion:
+            regresiones.append(clave)
+        print(f"{clave:<48} {anterior:10.1f} {nuevo:10.1f} {cambio:+7.1f}%{'  REGRESIÓN' if regresion else ''}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las etapas del pipeline")
+    parser.add_argument("--megapixeles", type=float, nargs="+", default=[0.5, 2, 8, 24])
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument("--repeticiones", type=int,
+                        help="Repeticiones por etapa (por defecto 3, o las de --base)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="Guarda los resultados en este JSON")
+    parser.add_argument("--base", help="JSON de una ejecución anterior contra el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=20.0,
+                        help="Porcentaje de empeoramiento de la mediana a partir del cual una etapa falla")
+    parser.add_argument("--minimo-ms", type=float, default=1.0,
+                        help="Diferencia absoluta mínima (ms) para considerar una regresión")
+    args = parser.parse_args()
+
+    base = None
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+    if args.repeticiones is None:
+        args.repeticiones = base["repeticiones"] if base else 3
+
+    rng = np.random.default_rng(args.semilla)
+    manos = manos_sinteticas(rng)
+    handsMesh.pool_manos = handsMesh.PoolManos(tamano=1, fabrica=lambda: HandsFijas(manos))
+
+    # mainAmbosFullTest monta static/ con una ruta relativa
+    os.chdir(RAIZ)
+    from fastapi.testclient import TestClient
+    import mainAmbosFullTest
+
+    resultados = {}
+    with TestClient(mainAmbosFullTest.app) as cliente, tempfile.TemporaryDirectory() as directorio:
+        for nombre, rostro, imagen_mano in imagenes_de_prueba(args.megapixeles, rng, manos):
+            h, w = rostro.shape[:2]
+            print(f"{nombre} ({w}x{h})", file=sys.stderr)
+            medidas = medir_imagen(nombre, rostro, imagen_mano, args.etapas, args.repeticiones, cliente, directorio)
+            for clave, valores in medidas.items():
+                print(f"  {clave:<46} {valores['mediana_ms']:10.1f} ms", file=sys.stderr)
+            resultados.update(medidas)
+
+    informe = {"entorno": entorno(), "repeticiones": args.repeticiones, "resultados": resultados}
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+
+    if base:
+        entorno_base = base.get("entorno", {})
+        for campo in ("cpus", "numpy", "opencv", "mediapipe"):
+            if entorno_base.get(campo) != informe["entorno"][campo]:
+                print(f"Aviso: la línea base se midió con otro valor de {campo} "
+                      f"({entorno_base.get(campo)} vs {informe['entorno'][campo]})", file=sys.stderr)
+        if args.repeticiones < base["repeticiones"]:
+            print(f"Aviso: menos repeticiones ({args.repeticiones}) que la línea base ({base['repeticiones']})",
+                  file=sys.stderr)
+        regresiones = comparar(resultados, base["resultados"], args.tolerancia, args.minimo_ms)
+        if regresiones:
+            print(f"\n{len(regresiones)} etapa(s) empeoraron más de {args.tolerancia:g}%", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#Benchmark de la resolución de inferencia (config.INFERENCIA_MAX_MEGAPIXELES)
+#
+# Para cada tamaño de imagen y cada límite de megapíxeles mide el tiempo de las
+# etapas de rostro y manos (inferencia + geometría + estadísticas) y cuánto se
+# desvían las intensidades por zona respecto a la inferencia a resolución
+# completa. Las intensidades siempre se miden sobre los píxeles originales.
+#
+# Rostro: FaceMesh real sobre las imágenes del repositorio ampliadas.
+# Manos: landmarks sintéticos fijos (no hay fotos de manos en el repositorio),
+# así que la parte de manos mide la geometría y el mapa de zonas, no MediaPipe.
+#
+#   python benchmarks/bench_resolucion_inferencia.py --megapixeles 2 4 8 12 --limites 0 2 1 0.5
+import argparse
+import glob
+import os
+import sys
+import time
+import types
+
+import cv2
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import config
+import handsMesh
+from analisis import medir_rostro, medir_manos
+
+# Landmarks normalizados de una mano abierta (orden de MediaPipe Hands)
+MANO_BASE = np.array([
+    (0.50, 0.90), (0.40, 0.85), (0.33, 0.77), (0.28, 0.70), (0.24, 0.63),
+    (0.42, 0.60), (0.41, 0.48), (0.405, 0.41), (0.40, 0.35),
+    (0.49, 0.58), (0.49, 0.45), (0.49, 0.37), (0.49, 0.30),
+    (0.56, 0.60), (0.57, 0.48), (0.575, 0.41), (0.58, 0.35),
+    (0.62, 0.64), (0.64, 0.55), (0.65, 0.49), (0.66, 0.44)])
+DEDOS = ([1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 16], [17, 18, 19, 20])
+
+
+class HandsFijas:
+    """Sustituto de mp.solutions.hands.Hands que devuelve siempre los mismos landmarks"""
+
+    def __init__(self, manos):
+        self._graph = True
+        self._resultado = types.SimpleNamespace(multi_hand_landmarks=[
+            types.SimpleNamespace(landmark=[types.SimpleNamespace(x=float(x), y=float(y), z=0.0) for x, y in mano])
+            for mano in manos])
+
+    def process(self, image):
+        return self._resultado
+
+    def close(self):
+        self._graph = None
+
+
+def manos_sinteticas(rng):
+    manos = []
+    for desplazamiento in (-0.2, 0.2):
+        angulo = rng.uniform(-0.3, 0.3)
+        rotacion = np.array([[np.cos(angulo), -np.sin(angulo)], [np.sin(angulo), np.cos(angulo)]])
+        mano = (MANO_BASE - (0.5, 0.65)) @ rotacion.T * 0.9 + (0.5 + desplazamiento, 0.65)
+        manos.append(mano + rng.normal(0, 0.004, mano.shape))
+    return manos
+
+
+def imagen_manos(rng, manos, w, h):
+    """Fondo oscuro con las manos en gris claro y textura, para que haya variación de intensidad"""
+    imagen = np.full((h, w, 3), 30, np.uint8)
+    for mano in manos:
+        puntos = (mano * (w, h)).astype(np.int32)
+        cv2.fillConvexPoly(imagen, cv2.convexHull(puntos[[0, 1, 2, 5, 9, 13, 17]]), (190, 190, 190))
+        for dedo in DEDOS:
+            for a, b in zip(dedo, dedo[1:]):
+                cv2.line(imagen, tuple(int(v) for v in puntos[a]), tuple(int(v) for v in puntos[b]),
+                         (210, 210, 210), max(3, int(w * 0.035)))
+    ruido = rng.normal(0, 12, (h, w, 1))
+    gradiente = np.linspace(-25, 25, w)[None, :, None]
+    return np.clip(imagen + ruido + gradiente, 0, 255).astype(np.uint8)
+
+
+def redimensionar(imagen, megapixeles):
+    h, w = imagen.shape[:2]
+    escala = np.sqrt(megapixeles * 1e6 / (h * w))
+    return cv2.resize(imagen, (round(w * escala), round(h * escala)), interpolation=cv2.INTER_CUBIC)
+
+
+def medir(funcion, imagen, limite, repeticiones):
+    config.INFERENCIA_MAX_MEGAPIXELES = limite
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(imagen)
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, 1000 * float(np.median(tiempos))
+
+
+def desviacion_rostro(referencia, resultado):
+    if not referencia["detectado"] or not resultado["detectado"]:
+        return None
+    return max(abs(referencia["zonas"][z]["promedio"] - resultado["zonas"][z]["promedio"]) for z in referencia["zonas"])
+
+
+def desviacion_manos(referencia, resultado, tolerancia):
+    """
+    Máxima diferencia de intensidad entre zonas equivalentes (centroide más
+    cercano a menos de `tolerancia` píxeles) y zonas sin pareja.
+    """
+    zonas_ref = list(referencia["zonas"].values())
+    zonas = list(resultado["zonas"].values())
+    if not zonas_ref or not zonas:
+        return None, abs(len(zonas_ref) - len(zonas))
+    centros = np.array([z["centroide"] for z in zonas])
+    maxima, sin_pareja = 0.0, 0
+    for zona in zonas_ref:
+        distancias = np.hypot(*(centros - zona["centroide"]).T)
+        cercana = int(np.argmin(distancias))
+        if distancias[cercana] > tolerancia:
+            sin_pareja += 1
+            continue
+        maxima = max(maxima, abs(zona["promedio"] - zonas[cercana]["promedio"]))
+    return maxima, sin_pareja
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megapixeles", type=float, nargs="+", default=[2, 4, 8, 12])
+    parser.add_argument("--limites", type=float, nargs="+", default=[0, 2, 1, 0.5],
+                        help="Valores de INFERENCIA_MAX_MEGAPIXELES (0 = resolución completa, referencia)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.semilla)
+    manos = manos_sinteticas(rng)
+    handsMesh.pool_manos = handsMesh.PoolManos(tamano=1, fabrica=lambda: HandsFijas(manos))
+
+    rostros = sorted(glob.glob(os.path.join(RAIZ, "*_segmentado.jpg")))[:1]
+    base_rostro = cv2.imread(rostros[0])
+    base_manos = imagen_manos(rng, manos, 2000, 1500)
+
+    limites = [0.0] + [l for l in args.limites if l != 0]
+    print(f"Rostro: {os.path.basename(rostros[0])}  |  manos: sintéticas (2 manos)\n")
+    print(f"{'MP':>5} {'límite':>7} | {'rostro ms':>9} {'x':>5} {'desv. máx':>9} | "
+          f"{'manos ms':>9} {'x':>5} {'zonas':>5} {'desv. máx':>9} {'sin par':>7}")
+    for megapixeles in args.megapixeles:
+        imagen_rostro = redimensionar(base_rostro, megapixeles)
+        imagen_mano = redimensionar(base_manos, megapixeles)
+        tolerancia = 0.02 * max(imagen_mano.shape[:2])
+        ref_rostro = ref_manos = None
+        for limite in limites:
+            rostro, t_rostro = medir(medir_rostro, imagen_rostro, limite, args.repeticiones)
+            manos_res, t_manos = medir(medir_manos, imagen_mano, limite, args.repeticiones)
+            if limite == 0:
+                ref_rostro, ref_manos = (rostro, t_rostro), (manos_res, t_manos)
+            d_rostro = desviacion_rostro(ref_rostro[0], rostro)
+            d_manos, sin_pareja = desviacion_manos(ref_manos[0], manos_res, tolerancia)
+            print(f"{megapixeles:5.1f} {('completa' if limite == 0 else f'{limite:g} MP'):>7} | "
+                  f"{t_rostro:9.1f} {ref_rostro[1] / t_rostro:5.1f} "
+                  f"{'-' if d_rostro is None else f'{d_rostro:.3f}':>9} | "
+                  f"{t_manos:9.1f} {ref_manos[1] / t_manos:5.1f} {len(manos_res['zonas']):5d} "
+                  f"{'-' if d_manos is None else f'{d_manos:.3f}':>9} {sin_pareja:7d}")
+        print()
+    print("desv. máx: mayor diferencia absoluta (niveles de gris, 0-255) del promedio de una zona "
+          "respecto a la inferencia a resolución completa")
+
+
+if __name__ == "__main__":
+    main()
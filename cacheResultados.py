@@ -0,0 +1,343 @@
+#Cache por contenido (hash SHA-256 de la imagen) de reportes y de resultados intermedios
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+
+import config
+from faceMesh import VERSION_MODELO_ROSTRO
+from handsMesh import VERSION_MODELO_MANOS
+from metricas import CONSULTAS_CACHE
+
+logger = logging.getLogger(__name__)
+
+# Cambiar cuando el análisis o el formato de los reportes produzca otro resultado
+# para la misma imagen; las entradas con otra versión dejan de encontrarse
+VERSION_PIPELINE = "2"
+# Cambiar cuando cambie la detección o la geometría de las etapas cacheadas
+# (landmarks, líneas y mapa de zonas de las manos)
+VERSION_ETAPAS = "1"
+# Los reportes se construyen sobre las etapas, así que dependen de todo lo que
+# las invalida (VERSION_ETAPAS, la versión y opciones de los modelos) y de la
+# resolución de inferencia (las etapas la llevan en su versión, ver
+# analisis._version_etapa)
+VERSION_REPORTES = (f"{VERSION_PIPELINE}|etapas={VERSION_ETAPAS}|{VERSION_MODELO_ROSTRO}|{VERSION_MODELO_MANOS}"
+                    f"|mp={config.INFERENCIA_MAX_MEGAPIXELES}")
+
+
+def hash_contenido(datos):
+    """SHA-256 (hex) de los bytes subidos"""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def clave_resultado(hash_imagen, endpoint, version=VERSION_REPORTES):
+    """Clave de cache: combina el hash de la imagen, el endpoint (o etapa) y la versión"""
+    return hashlib.sha256(f"{version}:{endpoint}:{hash_imagen}".encode()).hexdigest()
+
+
+class CacheMemoria:
+    """
+    Cache LRU en memoria acotada por bytes (por worker).
+
+    Al superar `max_bytes` se desalojan las entradas usadas hace más tiempo;
+    un valor más grande que el límite completo no se guarda.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._desalojos = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is None:
+                self._fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        tamano = len(valor)
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._entradas[clave] = valor
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                _, desalojado = self._entradas.popitem(last=False)
+                self._bytes -= len(desalojado)
+                self._desalojos += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "desalojos": self._desalojos,
+            }
+
+
+class CacheDisco:
+    """
+    Cache en disco compartida por todos los workers de gunicorn.
+
+    Cada valor es un archivo `<directorio>/<clave[:2]>/<clave><extension>`
+    escrito de forma atómica (archivo temporal + os.replace), así que un worker
+    nunca lee un archivo a medio escribir por otro.
+
+    Con `max_bytes` > 0, guardar() recorre el directorio como mucho cada
+    `intervalo_limpieza` segundos y, si ocupa más que el límite, borra los
+    archivos con mtime más antiguo hasta bajar al 90 %. Cada acierto renueva el
+    mtime del archivo, así que se desalojan los usados hace más tiempo. Entre
+    una limpieza y otra el directorio puede pasarse del límite.
+    """
+
+    def __init__(self, directorio, extension=".bin", max_bytes=0, intervalo_limpieza=60):
+        self.directorio = directorio
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.intervalo_limpieza = intervalo_limpieza
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._errores = 0
+        self._desalojos = 0
+        self._bytes = None
+        self._ultima_limpieza = None
+        self._limpiando = False
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave[:2], clave + self.extension)
+
+    def obtener(self, clave):
+        try:
+            with open(self._ruta(clave), "rb") as f:
+                valor = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._fallos += 1
+            return None
+        except OSError as e:
+            logger.warning(f"No se pudo leer la cache en disco: {str(e)}")
+            with self._lock:
+                self._errores += 1
+            return None
+        if self.max_bytes > 0:
+            try:
+                os.utime(self._ruta(clave))
+            except OSError:
+                pass
+        with self._lock:
+            self._aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        ruta = self._ruta(clave)
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(valor)
+                os.replace(temporal, ruta)
+            except BaseException:
+                os.unlink(temporal)
+                raise
+        except OSError as e:
+            logger.warning(f"No se pudo escribir la cache en disco: {str(e)}")
+            with self._lock:
+                self._errores += 1
+        if self.max_bytes > 0:
+            self._limpiar_si_toca()
+
+    def _limpiar_si_toca(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if self._limpiando or (self._ultima_limpieza is not None
+                                   and ahora - self._ultima_limpieza < self.intervalo_limpieza):
+                return
+            self._limpiando = True
+            self._ultima_limpieza = ahora
+        try:
+            self.limpiar()
+        finally:
+            with self._lock:
+                self._limpiando = False
+
+    def limpiar(self):
+        """
+        Borra los archivos con mtime más antiguo hasta que el directorio ocupe
+        como mucho el 90 % de `max_bytes`; devuelve cuántos borró. Otros
+        workers pueden estar limpiando a la vez: los archivos que desaparecen
+        en medio se ignoran.
+        """
+        archivos = []
+        total = 0
+        for raiz, _, nombres in os.walk(self.directorio):
+            for nombre in nombres:
+                if not nombre.endswith(self.extension):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    info = os.stat(ruta)
+                except OSError:
+                    continue
+                archivos.append((info.st_mtime, info.st_size, ruta))
+                total += info.st_size
+
+        borrados = 0
+        if total > self.max_bytes:
+            objetivo = 0.9 * self.max_bytes
+            archivos.sort()
+            for _, tamano, ruta in archivos:
+                if total <= objetivo:
+                    break
+                try:
+                    os.unlink(ruta)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"No se pudo borrar de la cache en disco: {str(e)}")
+                    continue
+                else:
+                    borrados += 1
+                total -= tamano
+            logger.info(f"Cache en disco {self.directorio}: {borrados} archivos desalojados")
+
+        with self._lock:
+            self._bytes = total
+            self._desalojos += borrados
+        return borrados
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "directorio": self.directorio,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "errores": self._errores,
+                # Tamaño medido en la última limpieza (None si nunca se limpió)
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "desalojos": self._desalojos,
+            }
+
+
+class CacheResultados:
+    """Cache de dos niveles: memoria (LRU por worker) y, opcionalmente, disco compartido"""
+
+    def __init__(self, memoria=None, disco=None, version=None, nombre="resultados"):
+        self.memoria = memoria
+        self.disco = disco
+        self.version = version
+        self._aciertos = CONSULTAS_CACHE.labels(nombre, "hit")
+        self._fallos = CONSULTAS_CACHE.labels(nombre, "miss")
+
+    def obtener(self, clave):
+        valor = self._buscar(clave)
+        (self._fallos if valor is None else self._aciertos).inc()
+        return valor
+
+    def _buscar(self, clave):
+        if self.memoria is not None:
+            valor = self.memoria.obtener(clave)
+            if valor is not None:
+                return valor
+        if self.disco is not None:
+            valor = self.disco.obtener(clave)
+            if valor is not None:
+                # Se promueve a memoria para las siguientes peticiones de este worker
+                if self.memoria is not None:
+                    self.memoria.guardar(clave, valor)
+                return valor
+        return None
+
+    def guardar(self, clave, valor):
+        if self.memoria is not None:
+            self.memoria.guardar(clave, valor)
+        if self.disco is not None:
+            self.disco.guardar(clave, valor)
+
+    def estadisticas(self):
+        return {
+            "version": self.version,
+            "memoria": self.memoria.estadisticas() if self.memoria is not None else None,
+            "disco": self.disco.estadisticas() if self.disco is not None else None,
+        }
+
+
+def serializar_arreglos(arreglos):
+    """Empaqueta un dict de arreglos numpy en un npz comprimido (bytes)"""
+    buffer = BytesIO()
+    np.savez_compressed(buffer, **arreglos)
+    return buffer.getvalue()
+
+
+def deserializar_arreglos(datos):
+    """Inverso de serializar_arreglos"""
+    with np.load(BytesIO(datos), allow_pickle=False) as npz:
+        return {nombre: npz[nombre] for nombre in npz.files}
+
+
+class CacheEtapas:
+    """
+    Cache de resultados intermedios por imagen (landmarks, mapas de zonas),
+    guardados como npz comprimido sobre una CacheResultados.
+
+    La clave combina el hash de la imagen, el nombre de la etapa y una versión
+    que debe incluir VERSION_ETAPAS y la configuración del modelo, de modo que
+    un cambio en cualquiera de ellos invalida las entradas anteriores.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def obtener(self, etapa, hash_imagen, version):
+        datos = self.cache.obtener(clave_resultado(hash_imagen, f"etapa:{etapa}", version))
+        if datos is None:
+            return None
+        try:
+            return deserializar_arreglos(datos)
+        except Exception as e:
+            logger.warning(f"Entrada de cache de etapas ilegible ({etapa}): {str(e)}")
+            return None
+
+    def guardar(self, etapa, hash_imagen, version, arreglos):
+        self.cache.guardar(clave_resultado(hash_imagen, f"etapa:{etapa}", version), serializar_arreglos(arreglos))
+
+    def estadisticas(self):
+        return self.cache.estadisticas()
+
+
+def _crear_cache(memoria_mb, subdirectorio, extension, version):
+    return CacheResultados(
+        memoria=CacheMemoria(memoria_mb * 1024 * 1024) if memoria_mb > 0 else None,
+        disco=CacheDisco(os.path.join(config.CACHE_DIRECTORIO, subdirectorio), extension,
+                         max_bytes=config.CACHE_DISCO_MB * 1024 * 1024) if config.CACHE_DIRECTORIO else None,
+        version=version,
+        nombre=subdirectorio,
+    )
+
+
+# Caches del worker actual
+# Los reportes pueden ser PDF o JSON según el endpoint: extensión neutra
+cache_reportes = _crear_cache(config.CACHE_MEMORIA_MB, "reportes", ".bin", VERSION_REPORTES)
+cache_etapas = CacheEtapas(_crear_cache(config.CACHE_ETAPAS_MEMORIA_MB, "etapas", ".npz", VERSION_ETAPAS))
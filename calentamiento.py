@@ -0,0 +1,162 @@
+#Calentamiento de los modelos al arrancar cada worker y estado para /ready
+#
+# La primera petición de un worker pagaba la construcción de los grafos de
+# FaceMesh y Hands, la primera inferencia de cada instancia y la primera
+# generación de un PDF. Con CALENTAMIENTO activado, el lifespan de la app
+# llama a calentar() antes de empezar a aceptar conexiones:
+#
+#   face_mesh   una instancia de FaceMesh en cada hilo del ejecutor
+#   hands       el pool de Hands completo (pool_manos.precalentar)
+#   inferencia  rostro y manos sobre calentamiento.jpg en cada hilo del ejecutor,
+#               más la geometría y las zonas de una mano con landmarks fijos
+#               (MediaPipe no detecta manos en la imagen, y sin ellas la primera
+#               petición con manos pagaría esas etapas)
+#   pdf         un reporte completo con esos resultados
+#
+# La imagen no pasa por las caches (no tiene hash), así que no deja entradas.
+import logging
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from faceMesh import registro_face_mesh
+from handsMesh import pool_manos, geometria_manos, etiquetar_zonas_manos, dibujar_manos
+from analisis import analizar_rostro_y_manos, analizar_manos_por_zonas
+from reportes import generar_pdf_completo
+
+logger = logging.getLogger(__name__)
+
+RUTA_IMAGEN_CALENTAMIENTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calentamiento.jpg")
+
+# Landmarks normalizados (orden de MediaPipe Hands) de una mano abierta
+MANO_CALENTAMIENTO = np.array([
+    (0.50, 0.90, 0.0), (0.40, 0.85, 0.0), (0.33, 0.77, 0.0), (0.28, 0.70, 0.0), (0.24, 0.63, 0.0),
+    (0.42, 0.60, 0.0), (0.41, 0.48, 0.0), (0.405, 0.41, 0.0), (0.40, 0.35, 0.0),
+    (0.49, 0.58, 0.0), (0.49, 0.45, 0.0), (0.49, 0.37, 0.0), (0.49, 0.30, 0.0),
+    (0.56, 0.60, 0.0), (0.57, 0.48, 0.0), (0.575, 0.41, 0.0), (0.58, 0.35, 0.0),
+    (0.62, 0.64, 0.0), (0.64, 0.55, 0.0), (0.65, 0.49, 0.0), (0.66, 0.44, 0.0)], dtype=np.float32)
+
+DESACTIVADO = "desactivado"
+FRIO = "frio"
+CALENTANDO = "calentando"
+LISTO = "listo"
+ERROR = "error"
+
+
+def _manos_fijas(image):
+    """
+    Mismo resultado que analisis.analizar_manos, pero con MANO_CALENTAMIENTO
+    en lugar de la detección de MediaPipe.
+    """
+    manos = [MANO_CALENTAMIENTO]
+    lineas = geometria_manos(image, manos)
+    etiquetas, centroides = etiquetar_zonas_manos(lineas)
+    imagen_segmentada = dibujar_manos(image, lineas)
+    intensidades, imagen_con_numeros = analizar_manos_por_zonas(
+        imagen_segmentada, cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), etiquetas, centroides)
+    return {
+        "imagen": imagen_segmentada,
+        "imagen_numerada": imagen_con_numeros,
+        "intensidades": intensidades or {},
+        "landmarks": manos,
+    }
+
+
+def _inferencia(image):
+    """Rostro y manos con los modelos del hilo actual, más el camino de manos con landmarks fijos"""
+    rostro, _ = analizar_rostro_y_manos(image)
+    manos = _manos_fijas(image)
+    # Si el recurso deja de ejercitar alguna etapa, el calentamiento falla en vez de quedar a medias
+    if rostro["landmarks"] is None:
+        raise ValueError("No se detectó el rostro en la imagen de calentamiento")
+    if not manos["intensidades"]:
+        raise ValueError("El calentamiento no produjo zonas de mano")
+    return rostro, manos
+
+
+def _segundos_desde_inicio_proceso():
+    """Segundos desde que arrancó el proceso (incluye importar mediapipe), o None fuera de Linux"""
+    try:
+        with open("/proc/self/stat") as f:
+            inicio = int(f.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            return round(float(f.read().split()[0]) - inicio, 3)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class EstadoCalentamiento:
+    """Estado del calentamiento del worker y duración de cada paso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.estado = FRIO
+        self._tiempos = {}
+        self._error = None
+        self._arranque_s = None
+
+    @property
+    def listo(self):
+        return self.estado in (LISTO, DESACTIVADO)
+
+    def desactivar(self):
+        with self._lock:
+            self.estado = DESACTIVADO
+
+    def _paso(self, nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        with self._lock:
+            self._tiempos[nombre] = round(1000 * (time.perf_counter() - inicio), 3)
+        return resultado
+
+    def calentar(self, ejecutor, ruta_imagen=RUTA_IMAGEN_CALENTAMIENTO):
+        """
+        Inicializa los modelos del worker. Los errores se registran en el
+        estado (y en el log) en lugar de propagarse: el worker sigue
+        atendiendo (los modelos se crean en la primera petición), pero /ready
+        responde 503.
+        """
+        with self._lock:
+            self.estado = CALENTANDO
+        inicio = time.perf_counter()
+        try:
+            image = cv2.imread(ruta_imagen)
+            if image is None:
+                raise ValueError(f"No se pudo leer la imagen de calentamiento {ruta_imagen}")
+
+            self._paso("face_mesh", lambda: ejecutor.en_cada_hilo(registro_face_mesh.instancia))
+            self._paso("hands", pool_manos.precalentar)
+            resultados = self._paso("inferencia", lambda: ejecutor.en_cada_hilo(lambda: _inferencia(image)))
+            rostro, manos = resultados[0]
+            self._paso("pdf", lambda: generar_pdf_completo(rostro, manos))
+        except Exception as e:
+            logger.exception("Falló el calentamiento de los modelos")
+            with self._lock:
+                self.estado = ERROR
+                self._error = str(e)
+            return
+
+        with self._lock:
+            self._tiempos["total"] = round(1000 * (time.perf_counter() - inicio), 3)
+            self._arranque_s = _segundos_desde_inicio_proceso()
+            self.estado = LISTO
+        logger.info(f"Modelos calentados en {self._tiempos['total']:.0f} ms")
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "listo": self.listo,
+                "pid": os.getpid(),
+                "tiempos_ms": dict(self._tiempos),
+                "arranque_s": self._arranque_s,
+                "error": self._error,
+            }
+
+
+# Estado del worker actual (gunicorn importa el módulo en cada worker)
+estado_calentamiento = EstadoCalentamiento()
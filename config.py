@@ -0,0 +1,112 @@
+#Configuración del servidor de segmentación (valores por variable de entorno)
+import os
+import tempfile
+
+
+def _entero(nombre, defecto):
+    valor = os.getenv(nombre)
+    return int(valor) if valor not in (None, "") else defecto
+
+
+def _decimal(nombre, defecto):
+    valor = os.getenv(nombre)
+    return float(valor) if valor not in (None, "") else defecto
+
+
+def _booleano(nombre, defecto):
+    valor = os.getenv(nombre)
+    if valor in (None, ""):
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+# ================== POOL DE MEDIAPIPE HANDS ==================
+# Número de instancias de Hands preinicializadas por worker
+POOL_MANOS_TAMANO = _entero("POOL_MANOS_TAMANO", 2)
+# Segundos máximos esperando una instancia libre (None = sin límite)
+POOL_MANOS_TIMEOUT = _decimal("POOL_MANOS_TIMEOUT", None)
+
+# ================== RESOLUCIÓN DE INFERENCIA ==================
+# Megapíxeles máximos de la imagen que se pasa a MediaPipe y a la geometría de
+# manos; las imágenes más grandes se reducen y los resultados se llevan a la
+# resolución original para medir intensidades (0 = siempre resolución completa)
+INFERENCIA_MAX_MEGAPIXELES = _decimal("INFERENCIA_MAX_MEGAPIXELES", 1.0)
+
+# ================== EJECUTOR DE SEGMENTACIÓN ==================
+# Hilos que ejecutan las etapas de CPU por worker; cada uno crea su FaceMesh
+# (conviene igualarlo al pool de manos)
+EJECUTOR_HILOS = _entero("EJECUTOR_HILOS", POOL_MANOS_TAMANO)
+# Peticiones que pueden esperar un hilo libre antes de responder 429
+EJECUTOR_COLA_MAXIMA = _entero("EJECUTOR_COLA_MAXIMA", 8)
+# Retry-After (segundos) cuando todavía no hay tiempos medidos para estimarlo
+RETRY_AFTER_SEGUNDOS = _entero("RETRY_AFTER_SEGUNDOS", 5)
+# Rostro y manos en paralelo dentro del reporte completo (0 = uno tras otro)
+ANALISIS_CONCURRENTE = _booleano("ANALISIS_CONCURRENTE", True)
+
+# ================== CALENTAMIENTO ==================
+# Cada worker crea los modelos y corre una inferencia de prueba antes de
+# aceptar conexiones (/ready responde 503 solo si el calentamiento falló)
+CALENTAMIENTO = _booleano("CALENTAMIENTO", True)
+
+# ================== SUBIDAS ==================
+# Tamaño máximo (MB) de una imagen subida; por encima se responde 413
+MAX_SUBIDA_MB = _entero("MAX_SUBIDA_MB", 20)
+# Tamaño máximo (MB) de la petición de un lote, y del contenido descomprimido de sus zips
+MAX_LOTE_MB = _entero("MAX_LOTE_MB", 200)
+
+# ================== LOTES ==================
+# Imágenes de un lote que se procesan a la vez; corren en el ejecutor de
+# segmentación, así que no suman CPU más allá de EJECUTOR_HILOS
+LOTE_HILOS = _entero("LOTE_HILOS", EJECUTOR_HILOS)
+# Máximo de imágenes por lote (archivos multipart o contenido del zip)
+LOTE_MAX_IMAGENES = _entero("LOTE_MAX_IMAGENES", 200)
+
+# ================== SEGUIMIENTO EN TIEMPO REAL ==================
+# Sesiones WebSocket simultáneas por worker (cada una carga su FaceMesh y su Hands)
+SEGUIMIENTO_MAX_SESIONES = _entero("SEGUIMIENTO_MAX_SESIONES", 4)
+
+# ================== VIDEO ==================
+# Por defecto se analiza uno de cada VIDEO_PASO cuadros
+VIDEO_PASO = _entero("VIDEO_PASO", 5)
+# Tamaño máximo (MB) de un video subido
+MAX_VIDEO_MB = _entero("MAX_VIDEO_MB", 500)
+
+# ================== TRABAJOS ASÍNCRONOS ==================
+# Base SQLite de la cola de trabajos (compartida por los workers que la usen)
+TRABAJOS_DB = os.getenv("TRABAJOS_DB") or os.path.join(tempfile.gettempdir(), "segmentacion_trabajos.db")
+# Trabajos que toma a la vez cada worker (0 = este worker solo encola); el
+# análisis corre en el ejecutor de segmentación, así que no suma CPU más allá
+# de EJECUTOR_HILOS
+TRABAJOS_HILOS = _entero("TRABAJOS_HILOS", 1)
+# Segundos que se conservan un trabajo y su resultado
+TRABAJOS_EXPIRACION = _entero("TRABAJOS_EXPIRACION", 3600)
+# Segundos tras los cuales un trabajo "procesando" sin avances vuelve a la cola
+TRABAJOS_TIEMPO_MAXIMO = _entero("TRABAJOS_TIEMPO_MAXIMO", 600)
+
+# ================== CACHE DE RESULTADOS ==================
+# Memoria máxima (MB) de la cache LRU de reportes por worker (0 = desactivada)
+CACHE_MEMORIA_MB = _entero("CACHE_MEMORIA_MB", 64)
+# Memoria máxima (MB) de la cache de landmarks y mapas de zonas por worker (0 = desactivada)
+CACHE_ETAPAS_MEMORIA_MB = _entero("CACHE_ETAPAS_MEMORIA_MB", 32)
+# Directorio de la cache en disco compartida entre workers (sin definir = solo memoria)
+CACHE_DIRECTORIO = os.getenv("CACHE_DIRECTORIO") or None
+# Tamaño máximo (MB) en disco de cada cache (reportes y etapas); se revisa como
+# mucho una vez por minuto y se borran los archivos usados hace más tiempo
+# (0 = sin límite)
+CACHE_DISCO_MB = _entero("CACHE_DISCO_MB", 1024)
+
+# ================== PERFILADO ==================
+# Fracción de peticiones que se perfilan (0 = ninguna)
+PERFILADO_MUESTREO = _decimal("PERFILADO_MUESTREO", 0.0)
+# Perfila las peticiones que traen la cabecera "X-Perfilar: 1"
+PERFILADO_CABECERA = _booleano("PERFILADO_CABECERA", False)
+# Directorio de los perfiles (compartido por los workers) y cuántos se conservan
+PERFILADO_DIRECTORIO = os.getenv("PERFILADO_DIRECTORIO") or os.path.join(tempfile.gettempdir(), "segmentacion_perfiles")
+PERFILADO_MAX_PERFILES = _entero("PERFILADO_MAX_PERFILES", 50)
+# Intervalo (ms) del muestreo de pilas para los flamegraphs
+PERFILADO_INTERVALO_MS = _entero("PERFILADO_INTERVALO_MS", 5)
+
+# ================== SALIDA A DISCO ==================
+# Si se define, cada petición guarda sus imágenes y su PDF en este directorio;
+# por defecto el procesamiento ocurre solo en memoria
+DIRECTORIO_RESULTADOS = os.getenv("DIRECTORIO_RESULTADOS") or None
@@ -0,0 +1,196 @@
+#Ejecutor de las etapas de segmentación fuera del event loop, con admisión acotada
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import perfiles
+from metricas import DURACION_ETAPA, EJECUTOR_EN_COLA, EJECUTOR_EN_EJECUCION, EJECUTOR_RECHAZADAS
+
+
+class ColaLlena(Exception):
+    """La cola del ejecutor está completa; `retry_after` son los segundos sugeridos para reintentar"""
+
+    def __init__(self, retry_after):
+        super().__init__("La cola de procesamiento está llena")
+        self.retry_after = retry_after
+
+
+class EjecutorSegmentacion:
+    """
+    Ejecuta el trabajo de CPU (MediaPipe, OpenCV, FPDF) en un pool de hilos
+    propio para que el event loop siga atendiendo otras peticiones.
+
+    Como máximo hay `hilos` tareas en ejecución y `cola_maxima` esperando; una
+    tarea más se rechaza de inmediato con ColaLlena en lugar de acumularse.
+    Los trabajos asíncronos y las imágenes de un lote entran con
+    ejecutar_bloqueante() / enviar_bloqueante(), que esperan un lugar en vez
+    de rechazar, así que comparten el mismo límite de hilos.
+    Hands sale del pool de handsMesh y cada hilo usa su propia instancia de
+    FaceMesh (faceMesh.registro_face_mesh).
+    """
+
+    def __init__(self, hilos=1, cola_maxima=0):
+        if hilos < 1:
+            raise ValueError("El ejecutor necesita al menos un hilo")
+        if cola_maxima < 0:
+            raise ValueError("El tamaño de la cola no puede ser negativo")
+        self.hilos = hilos
+        self.cola_maxima = cola_maxima
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="segmentacion")
+        self._lock = threading.Lock()
+        self._hay_lugar = threading.Condition(self._lock)
+        self._en_cola = 0
+        self._en_ejecucion = 0
+        self._aceptadas = 0
+        self._rechazadas = 0
+        self._completadas = 0
+        self._iniciadas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+        self._duracion_total = 0.0
+
+    def _retry_after(self):
+        # Tiempo estimado para vaciar lo pendiente con la duración promedio observada
+        if not self._completadas:
+            return config.RETRY_AFTER_SEGUNDOS
+        duracion = self._duracion_total / self._completadas
+        pendientes = self._en_cola + self._en_ejecucion
+        return max(1, math.ceil(duracion * pendientes / self.hilos))
+
+    def _lleno(self):
+        # Con self._lock tomado
+        return self._en_cola + self._en_ejecucion >= self.hilos + self.cola_maxima
+
+    def _encolar(self):
+        # Con self._lock tomado
+        self._en_cola += 1
+        self._aceptadas += 1
+        EJECUTOR_EN_COLA.inc()
+
+    def _admitir(self, ocupar=True):
+        with self._lock:
+            if self._lleno():
+                self._rechazadas += 1
+                EJECUTOR_RECHAZADAS.inc()
+                raise ColaLlena(self._retry_after())
+            if ocupar:
+                self._encolar()
+
+    def comprobar_lugar(self):
+        """
+        Lanza ColaLlena, como ejecutar(), si ahora no hay lugar, pero sin
+        ocupar ninguno (p. ej. antes de empezar un lote que luego envía sus
+        imágenes con enviar_bloqueante).
+        """
+        self._admitir(ocupar=False)
+
+    def _liberar_en_cola(self):
+        with self._lock:
+            self._en_cola -= 1
+            EJECUTOR_EN_COLA.dec()
+            self._hay_lugar.notify()
+
+    def _enviar(self, funcion, args, kwargs):
+        # El lugar ya se ocupó al admitir la tarea: si submit() falla (p. ej.
+        # RuntimeError tras shutdown) hay que devolverlo o se pierde para siempre
+        try:
+            futuro = perfiles.enviar(self._executor, self._ejecutar_tarea, time.perf_counter(), funcion, args, kwargs)
+        except BaseException:
+            self._liberar_en_cola()
+            raise
+        futuro.add_done_callback(self._al_terminar)
+        return futuro
+
+    def _ejecutar_tarea(self, encolada, funcion, args, kwargs):
+        inicio = time.perf_counter()
+        espera = inicio - encolada
+        with self._lock:
+            self._en_cola -= 1
+            self._en_ejecucion += 1
+            self._iniciadas += 1
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+            EJECUTOR_EN_COLA.dec()
+            EJECUTOR_EN_EJECUCION.inc()
+        DURACION_ETAPA.labels("espera_ejecutor").observe(espera)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._en_ejecucion -= 1
+                self._completadas += 1
+                EJECUTOR_EN_EJECUCION.dec()
+                self._duracion_total += time.perf_counter() - inicio
+                self._hay_lugar.notify()
+
+    def _al_terminar(self, futuro):
+        # Una tarea cancelada antes de empezar nunca pasa por _ejecutar_tarea
+        if futuro.cancelled():
+            self._liberar_en_cola()
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(*args, **kwargs) en el pool y espera su resultado.
+
+        Raises:
+            ColaLlena: Si ya hay `hilos + cola_maxima` tareas pendientes
+        """
+        self._admitir()
+        return await asyncio.wrap_future(self._enviar(funcion, args, kwargs))
+
+    def enviar_bloqueante(self, funcion, *args, **kwargs):
+        """
+        Envía funcion(*args, **kwargs) al pool desde un hilo fuera del event
+        loop y devuelve el Future. Si la cola está llena espera a que se libere
+        un lugar en lugar de rechazar; mientras espera no cuenta como rechazada
+        ni ocupa lugar en la cola. No debe llamarse desde un hilo del propio
+        ejecutor (esperaría un lugar que ese mismo hilo ocupa).
+        """
+        with self._hay_lugar:
+            self._hay_lugar.wait_for(lambda: not self._lleno())
+            self._encolar()
+        return self._enviar(funcion, args, kwargs)
+
+    def ejecutar_bloqueante(self, funcion, *args, **kwargs):
+        """enviar_bloqueante() y espera el resultado (los hilos de trabajos)"""
+        return self.enviar_bloqueante(funcion, *args, **kwargs).result()
+
+    def en_cada_hilo(self, funcion, timeout=60):
+        """
+        Ejecuta funcion() una vez en cada hilo del pool y devuelve sus
+        resultados (p. ej. para crear de antemano el FaceMesh de cada hilo).
+
+        Las tareas esperan en una barrera hasta que todas empezaron, así que
+        cada una ocupa un hilo distinto. No pasan por la admisión ni cuentan
+        en las estadísticas.
+        """
+        barrera = threading.Barrier(self.hilos)
+
+        def tarea():
+            barrera.wait(timeout)
+            return funcion()
+
+        futuros = [self._executor.submit(tarea) for _ in range(self.hilos)]
+        return [futuro.result() for futuro in futuros]
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "hilos": self.hilos,
+                "cola_maxima": self.cola_maxima,
+                "en_cola": self._en_cola,
+                "en_ejecucion": self._en_ejecucion,
+                "aceptadas": self._aceptadas,
+                "rechazadas": self._rechazadas,
+                "completadas": self._completadas,
+                "espera_promedio_ms": round(1000 * self._espera_total / self._iniciadas, 3) if self._iniciadas else 0.0,
+                "espera_maxima_ms": round(1000 * self._espera_maxima, 3),
+                "duracion_promedio_ms": round(1000 * self._duracion_total / self._completadas, 3) if self._completadas else 0.0,
+            }
+
+
+# Ejecutor del worker actual (gunicorn importa el módulo en cada worker)
+ejecutor = EjecutorSegmentacion(hilos=config.EJECUTOR_HILOS, cola_maxima=config.EJECUTOR_COLA_MAXIMA)
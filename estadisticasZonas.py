@@ -0,0 +1,135 @@
+#Estadísticas de intensidad por zona (rostro y manos) en una sola pasada
+import cv2
+import numpy as np
+
+from metricas import cronometrar
+
+
+# Zonas por mapa de bits (uint16); con más zonas se procesan por grupos para
+# que la memoria pico no crezca con el número de zonas
+MAX_ZONAS_POR_MAPA = 16
+
+
+def _tipo_bits(num_zonas):
+    return np.uint8 if num_zonas <= 8 else np.uint16
+
+
+def _caja(puntos, w, h):
+    """Caja envolvente (x0, y0, x1, y1) del polígono recortada a la imagen"""
+    x0, y0 = puntos.min(axis=0)
+    x1, y1 = puntos.max(axis=0) + 1
+    return max(int(x0), 0), max(int(y0), 0), min(int(x1), w), min(int(y1), h)
+
+
+def _estadisticas_histograma(hist):
+    """Media, desviación estándar, mínimo, máximo y número de píxeles de un histograma de 256 niveles"""
+    pixeles = int(hist.sum())
+    if pixeles == 0:
+        return {"promedio": 0, "desviacion": 0, "minimo": None, "maximo": None, "pixeles": 0}
+
+    niveles = np.arange(256, dtype=np.float64)
+    promedio = float(hist @ niveles) / pixeles
+    desviacion = float(np.sqrt(hist @ (niveles - promedio) ** 2 / pixeles))
+    presentes = np.flatnonzero(hist)
+    return {
+        "promedio": promedio,
+        "desviacion": desviacion,
+        "minimo": int(presentes[0]),
+        "maximo": int(presentes[-1]),
+        "pixeles": pixeles,
+    }
+
+
+@cronometrar("estadisticas_zonas")
+def estadisticas_por_zona(gray_image, poligonos):
+    """
+    Calcula media, desviación estándar, mínimo, máximo y número de píxeles
+    de cada zona poligonal sobre una imagen en escala de grises (uint8).
+
+    Cada polígono se rasteriza una sola vez dentro de su caja envolvente y se
+    registra como un bit en un mapa de etiquetas común, de modo que las zonas
+    que se solapan (p. ej. "Boca", "Menton" y "Bozo") conservan sus píxeles
+    compartidos. Las estadísticas salen de un único histograma conjunto
+    (combinación de zonas x nivel de gris), sin máscaras de tamaño completo.
+
+    Args:
+        gray_image (np.ndarray): Imagen uint8 de un canal
+        poligonos (dict): Nombre de zona -> arreglo (N, 2) de puntos enteros (x, y)
+
+    Returns:
+        dict: Nombre de zona -> {"promedio", "desviacion", "minimo", "maximo", "pixeles"}
+    """
+    if gray_image.dtype != np.uint8 or gray_image.ndim != 2:
+        raise ValueError("Se esperaba una imagen en escala de grises uint8")
+
+    nombres = list(poligonos)
+    if not nombres:
+        return {}
+    if len(nombres) > MAX_ZONAS_POR_MAPA:
+        resultados = {}
+        for i in range(0, len(nombres), MAX_ZONAS_POR_MAPA):
+            grupo = {nombre: poligonos[nombre] for nombre in nombres[i:i + MAX_ZONAS_POR_MAPA]}
+            resultados.update(estadisticas_por_zona(gray_image, grupo))
+        return resultados
+
+    h, w = gray_image.shape
+    puntos_zonas = [np.asarray(poligonos[nombre], dtype=np.int32).reshape(-1, 2) for nombre in nombres]
+    cajas = [_caja(puntos, w, h) for puntos in puntos_zonas]
+
+    # Región común que cubre todas las zonas
+    x0 = min(c[0] for c in cajas)
+    y0 = min(c[1] for c in cajas)
+    x1 = max(c[2] for c in cajas)
+    y1 = max(c[3] for c in cajas)
+    if x1 <= x0 or y1 <= y0:
+        return {nombre: _estadisticas_histograma(np.zeros(256, np.int64)) for nombre in nombres}
+
+    # Mapa de bits: el bit i de cada píxel indica si pertenece a la zona i
+    bits = np.zeros((y1 - y0, x1 - x0), dtype=_tipo_bits(len(nombres)))
+    for i, (puntos, (cx0, cy0, cx1, cy1)) in enumerate(zip(puntos_zonas, cajas)):
+        if cx1 <= cx0 or cy1 <= cy0:
+            continue
+        zona = np.zeros((cy1 - cy0, cx1 - cx0), np.uint8)
+        cv2.fillPoly(zona, [puntos - (cx0, cy0)], 1)
+        recorte = bits[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+        recorte[zona.view(bool)] |= bits.dtype.type(1 << i)
+
+    # Una sola pasada: histograma conjunto (combinación de zonas, nivel de gris)
+    en_zonas = bits != 0
+    codigos = bits[en_zonas]
+    niveles = gray_image[y0:y1, x0:x1][en_zonas]
+
+    # Solo se conservan las combinaciones de zonas que aparecen en la imagen
+    presentes = np.bincount(codigos, minlength=1 << (8 * bits.dtype.itemsize)) > 0
+    combinaciones = np.flatnonzero(presentes).astype(bits.dtype)
+    inversa = (np.cumsum(presentes) - 1)[codigos]
+
+    hist = np.bincount(inversa * 256 + niveles,
+                       minlength=len(combinaciones) * 256).reshape(-1, 256)
+
+    resultados = {}
+    for i, nombre in enumerate(nombres):
+        contiene = (combinaciones & bits.dtype.type(1 << i)) != 0
+        resultados[nombre] = _estadisticas_histograma(hist[contiene].sum(axis=0))
+    return resultados
+
+
+@cronometrar("estadisticas_zonas")
+def estadisticas_por_etiqueta(gray_image, etiquetas, num_zonas=None):
+    """
+    Estadísticas por zona a partir de un mapa de etiquetas enteras (0 = sin zona).
+
+    Un solo np.bincount sobre (etiqueta, nivel de gris) da el histograma de todas
+    las zonas a la vez.
+
+    Returns:
+        list: Estadísticas de las zonas 1..num_zonas, en orden
+    """
+    if gray_image.dtype != np.uint8 or gray_image.shape != etiquetas.shape:
+        raise ValueError("Se esperaba una imagen uint8 del mismo tamaño que el mapa de etiquetas")
+    if num_zonas is None:
+        num_zonas = int(etiquetas.max()) if etiquetas.size else 0
+
+    claves = etiquetas.astype(np.int64).ravel() * 256 + gray_image.ravel()
+    hist = np.bincount(claves, minlength=(num_zonas + 1) * 256)[:(num_zonas + 1) * 256].reshape(-1, 256)
+    return [_estadisticas_histograma(hist[zona]) for zona in range(1, num_zonas + 1)]
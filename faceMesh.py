@@ -1,12 +1,89 @@
 #Mediapipe Face Mesh desde la pagina web y la API
+import logging
+import threading
+
 import cv2
 import mediapipe as mp
 import numpy as np
 
+from metricas import cronometrar
+
+logger = logging.getLogger(__name__)
+
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True)
 mp_drawing = mp.solutions.drawing_utils
 
+
+OPCIONES_FACE_MESH = {"static_image_mode": True, "max_num_faces": 1, "refine_landmarks": True}
+# Modo seguimiento: la detección completa solo corre cuando se pierde el rostro
+OPCIONES_FACE_MESH_SEGUIMIENTO = dict(OPCIONES_FACE_MESH, static_image_mode=False)
+# Identifica el modelo y su configuración (p. ej. para invalidar caches de landmarks)
+VERSION_MODELO_ROSTRO = f"mediapipe-{mp.__version__}:FaceMesh:{sorted(OPCIONES_FACE_MESH.items())}"
+
+
+def crear_face_mesh(opciones=OPCIONES_FACE_MESH):
+    """Crea una instancia de MediaPipe FaceMesh (por defecto, con la configuración de imagen estática)"""
+    return mp_face_mesh.FaceMesh(**opciones)
+
+
+class RegistroFaceMesh:
+    """
+    Entrega una instancia de FaceMesh por hilo, creada la primera vez que el
+    hilo la pide.
+
+    El grafo de MediaPipe no admite llamadas concurrentes, así que cada hilo
+    del ejecutor usa la suya y el rendimiento crece con el número de hilos en
+    lugar de serializarse en una instancia compartida. Una instancia que lanza
+    una excepción al procesar se cierra y el hilo crea otra en su siguiente
+    llamada.
+    """
+
+    def __init__(self, fabrica=crear_face_mesh):
+        self._fabrica = fabrica
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._recicladas = 0
+
+    def instancia(self):
+        """FaceMesh del hilo actual"""
+        face_mesh = getattr(self._local, "face_mesh", None)
+        if face_mesh is None:
+            face_mesh = self._fabrica()
+            self._local.face_mesh = face_mesh
+            with self._lock:
+                self._creadas += 1
+        return face_mesh
+
+    def _descartar(self):
+        face_mesh = getattr(self._local, "face_mesh", None)
+        self._local.face_mesh = None
+        if face_mesh is None:
+            return
+        try:
+            face_mesh.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._recicladas += 1
+        logger.warning("Instancia de MediaPipe FaceMesh reciclada")
+
+    def procesar(self, rgb_image):
+        """Ejecuta FaceMesh del hilo actual sobre la imagen"""
+        try:
+            return self.instancia().process(rgb_image)
+        except Exception:
+            self._descartar()
+            raise
+
+    def estadisticas(self):
+        with self._lock:
+            return {"creadas": self._creadas, "recicladas": self._recicladas}
+
+
+# Registro del worker actual (gunicorn importa el módulo en cada worker)
+registro_face_mesh = RegistroFaceMesh()
+
 ZONAS = {
     "frente": [9, 336, 296, 334, 293, 301, 251, 284, 332, 297, 338, 10, 109, 67, 103, 54, 21, 71, 63, 105, 66, 107],  # Puntos de la frente
     "mejilla_izquierda": [138, 215, 177, 137, 227, 111, 31, 228, 229, 230, 120, 47, 126, 209, 129, 203, 206, 216],  # Puntos de la mejilla izquierda
@@ -19,22 +96,50 @@ ZONAS = {
     "bozo": [2, 326, 328, 290, 327, 423, 426, 436, 410, 270, 269, 267, 0, 37, 39, 40, 185, 186, 216, 216, 206, 203, 98, 97]
 }
 
-def segmentar_rostro(image_path: str, output_path: str = "imagen_segmentada.jpg") -> str:
-    image = cv2.imread(image_path)
-    
-    # Preprocesamiento
+@cronometrar("inferencia_rostro")
+def detectar_rostro(image, ecualizar=False, face_mesh=None):
+    """
+    Ejecuta FaceMesh una sola vez sobre la imagen BGR.
+
+    Devuelve un arreglo float32 (N, 3) con los landmarks normalizados (x, y, z)
+    del primer rostro, o None si no se detectó ninguno. Con `face_mesh` se usa
+    esa instancia (p. ej. un tracker de una sesión) en lugar de la del hilo.
+    """
     gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    image_eq = cv2.equalizeHist(gray_image)
-    rgb_image = cv2.cvtColor(image_eq, cv2.COLOR_GRAY2BGR)
+    if ecualizar:
+        gray_image = cv2.equalizeHist(gray_image)
+    rgb_image = cv2.cvtColor(gray_image, cv2.COLOR_GRAY2BGR)
 
-    results = face_mesh.process(rgb_image)
+    if face_mesh is not None:
+        results = face_mesh.process(rgb_image)
+    else:
+        results = registro_face_mesh.procesar(rgb_image)
+    if not results.multi_face_landmarks:
+        return None
+
+    face_landmarks = results.multi_face_landmarks[0]
+    return np.array([(lm.x, lm.y, lm.z) for lm in face_landmarks.landmark], dtype=np.float32)
+
+def landmarks_a_pixeles(landmarks, w, h):
+    """Convierte landmarks normalizados a coordenadas enteras de píxel (igual que int(lm.x * w))"""
+    xs = (landmarks[:, 0].astype(np.float64) * w).astype(np.int32)
+    ys = (landmarks[:, 1].astype(np.float64) * h).astype(np.int32)
+    return np.stack([xs, ys], axis=1)
+
+def dibujar_zonas(image, landmarks, zonas=ZONAS, color=(0, 255, 0)):
+    h, w = image.shape[:2]
+    puntos = landmarks_a_pixeles(landmarks, w, h)
+    for nombre_zona, indices in zonas.items():
+        cv2.polylines(image, [puntos[indices]], isClosed=True, color=color, thickness=2)
+    return image
+
+def segmentar_rostro(image_path: str, output_path: str = "imagen_segmentada.jpg") -> str:
+    image = cv2.imread(image_path)
 
-    if results.multi_face_landmarks:
-        for face_landmarks in results.multi_face_landmarks:
-            h, w, _ = image.shape
-            for nombre_zona, indices in ZONAS.items():
-                puntos = [(int(face_landmarks.landmark[i].x * w), int(face_landmarks.landmark[i].y * h)) for i in indices]
-                cv2.polylines(image, [np.array(puntos)], isClosed=True, color=(0, 255, 0), thickness=2)
+    # Preprocesamiento: FaceMesh sobre la imagen ecualizada
+    landmarks = detectar_rostro(image, ecualizar=True)
+    if landmarks is not None:
+        dibujar_zonas(image, landmarks)
 
     cv2.imwrite(output_path, image)
-    return output_path
\ No newline at end of file
+    return output_path
@@ -0,0 +1,18 @@
+#Configuración de gunicorn (se carga automáticamente desde el directorio de trabajo)
+import os
+import shutil
+
+
+def on_starting(server):
+    # Las métricas de una ejecución anterior no deben sumarse a las nuevas
+    directorio = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directorio:
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.makedirs(directorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Los gauges "livesum" de un worker que terminó dejan de contarse
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
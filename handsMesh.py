@@ -1,8 +1,463 @@
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
 import cv2
 import mediapipe as mp
 import numpy as np
 from PIL import Image
 
+import config
+from metricas import DURACION_ETAPA, cronometrar
+
+logger = logging.getLogger(__name__)
+
+
+OPCIONES_HANDS = {"static_image_mode": True, "max_num_hands": 2, "min_detection_confidence": 0.6}
+# Identifica el modelo y su configuración (p. ej. para invalidar caches de landmarks)
+VERSION_MODELO_MANOS = f"mediapipe-{mp.__version__}:Hands:{sorted(OPCIONES_HANDS.items())}"
+# Modo seguimiento: la detección de palmas solo corre cuando se pierde una mano
+OPCIONES_HANDS_SEGUIMIENTO = dict(OPCIONES_HANDS, static_image_mode=False)
+
+
+def crear_hands(opciones=OPCIONES_HANDS):
+    """Crea una instancia de MediaPipe Hands (por defecto, con la configuración de imagen estática)"""
+    return mp.solutions.hands.Hands(**opciones)
+
+
+class PoolManos:
+    """
+    Pool de instancias de MediaPipe Hands preinicializadas (uno por worker).
+
+    Las instancias se crean bajo demanda hasta `tamano` y se reutilizan entre
+    peticiones, de modo que la carga del modelo TFLite se paga una sola vez.
+    Una instancia cerrada o que lanza una excepción al procesar se descarta y
+    se reemplaza por una nueva en la siguiente solicitud.
+    """
+
+    def __init__(self, tamano=1, timeout=None, fabrica=crear_hands):
+        if tamano < 1:
+            raise ValueError("El tamaño del pool de manos debe ser al menos 1")
+        self.tamano = tamano
+        self.timeout = timeout
+        self._fabrica = fabrica
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._en_uso = 0
+        self._recicladas = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    def precalentar(self):
+        """Crea todas las instancias que falten hasta completar el pool"""
+        nuevas = []
+        with self._lock:
+            faltantes = self.tamano - self._creadas
+            self._creadas += faltantes
+        try:
+            for _ in range(faltantes):
+                nuevas.append(self._fabrica())
+        finally:
+            with self._lock:
+                self._creadas -= faltantes - len(nuevas)
+            for hands in nuevas:
+                self._libres.put(hands)
+
+    @staticmethod
+    def _esta_sana(hands):
+        # SolutionBase.close() deja el grafo en None
+        return getattr(hands, "_graph", True) is not None
+
+    def _adquirir(self):
+        while True:
+            try:
+                hands = self._libres.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    crear = self._creadas < self.tamano
+                    if crear:
+                        self._creadas += 1
+                if crear:
+                    try:
+                        return self._fabrica()
+                    except Exception:
+                        with self._lock:
+                            self._creadas -= 1
+                        raise
+                try:
+                    hands = self._libres.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError("No hay instancias de MediaPipe Hands disponibles") from None
+
+            if self._esta_sana(hands):
+                return hands
+            self._descartar(hands)
+
+    def _descartar(self, hands):
+        try:
+            hands.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._creadas -= 1
+            self._recicladas += 1
+        logger.warning("Instancia de MediaPipe Hands reciclada")
+
+    @contextmanager
+    def instancia(self):
+        """Presta una instancia de Hands y la devuelve al pool al terminar"""
+        inicio = time.perf_counter()
+        hands = self._adquirir()
+        espera = time.perf_counter() - inicio
+        DURACION_ETAPA.labels("espera_pool_manos").observe(espera)
+        with self._lock:
+            self._en_uso += 1
+            self._esperas += 1
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+        try:
+            yield hands
+        except Exception:
+            self._descartar(hands)
+            raise
+        else:
+            self._libres.put(hands)
+        finally:
+            with self._lock:
+                self._en_uso -= 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "tamano": self.tamano,
+                "creadas": self._creadas,
+                "en_uso": self._en_uso,
+                "libres": self._libres.qsize(),
+                "recicladas": self._recicladas,
+                "solicitudes": self._esperas,
+                "espera_promedio_ms": round(1000 * self._espera_total / self._esperas, 3) if self._esperas else 0.0,
+                "espera_maxima_ms": round(1000 * self._espera_maxima, 3),
+            }
+
+
+# Pool del worker actual (gunicorn importa el módulo en cada worker)
+pool_manos = PoolManos(tamano=config.POOL_MANOS_TAMANO, timeout=config.POOL_MANOS_TIMEOUT)
+
+
+# ================== RECORRIDO VECTORIZADO DE LÍNEAS ==================
+def _muestrear_linea(p1, p2, num_steps, t_final=1):
+    """
+    Muestrea la recta p1 -> p2 con la misma interpolación que el recorrido
+    original (t en np.linspace(0, t_final, num_steps), truncado a entero).
+    """
+    x1, y1 = p1
+    x2, y2 = p2
+    t = np.linspace(0, t_final, num_steps)
+    xs = (x1 * (1 - t) + x2 * t).astype(np.int64)
+    ys = (y1 * (1 - t) + y2 * t).astype(np.int64)
+    return xs, ys
+
+def _primera_salida(xs, ys, mask):
+    """Índice de la primera muestra fuera de la imagen o de la máscara (len(xs) si ninguna sale)"""
+    h, w = mask.shape[:2]
+    dentro = (xs >= 0) & (ys >= 0) & (xs < w) & (ys < h)
+    dentro[dentro] = mask[ys[dentro], xs[dentro]] != 0
+    fuera = np.flatnonzero(~dentro)
+    return int(fuera[0]) if len(fuera) else len(xs)
+
+def dibujar_linea_limitada(img, p1, p2, mask, color=(255, 0, 255), grosor=2, num_steps=50):
+    """Dibuja una línea entre dos puntos, deteniéndose si sale de la máscara"""
+    xs, ys = _muestrear_linea(p1, p2, num_steps)
+    fin = _primera_salida(xs, ys, mask)
+    if fin >= 2:
+        # Una sola polilínea equivale a un cv2.line por cada par de muestras consecutivas
+        puntos = np.stack([xs[:fin], ys[:fin]], axis=1).astype(np.int32)
+        cv2.polylines(img, [puntos], isClosed=False, color=color, thickness=grosor)
+
+def dibujar_linea_inversa(img, p1, p2, mask, color=(255, 0, 255), grosor=1, num_steps=100):
+    """Dibuja una línea desde p1 en sentido contrario a p2, deteniéndose si sale de la máscara"""
+    x1, y1 = p1
+    x2, y2 = p2
+    if x2 == x1:
+        return
+
+    m = (y2 - y1) / (x2 - x1)
+    b = y1 - m * x1
+
+    xs, _ = _muestrear_linea(p1, p2, num_steps, t_final=-1)
+    ys = (m * xs + b).astype(np.int64)
+    fin = min(_primera_salida(xs, ys, mask), num_steps - 1)
+
+    cv2.line(img, (int(x1), int(y1)), (int(xs[fin]), int(ys[fin])), color, grosor)
+
+
+# ================== BÚSQUEDA DE LA LÍNEA DE NUDILLOS ==================
+# Cada punto base (5, 9, 13, 17) sube por la recta que lo une con su falange (6, 10, 14, 18)
+RECTAS_NUDILLOS = {5: 6, 9: 10, 13: 14, 17: 18}
+# Segmentos de la línea de nudillos, en el orden en que se evalúan
+SEGMENTOS_NUDILLOS = ((5, 9), (17, 13), (9, 13))
+
+def _posiciones_hacia_arriba(hand_points, p, q, max_steps):
+    """
+    Posiciones (max_steps + 1, 2) del punto p tras 0..max_steps pasos de un píxel
+    hacia arriba sobre la recta p-q; x se recalcula desde la ecuación de la recta.
+    """
+    x1, y1 = hand_points[p]
+    x2, y2 = hand_points[q]
+    ys = y1 - np.arange(max_steps + 1, dtype=np.int64)
+    if x2 == x1 or y2 == y1:
+        # Recta vertical u horizontal: x no cambia
+        xs = np.full_like(ys, x1)
+    else:
+        m = (y2 - y1) / (x2 - x1)
+        b = y1 - m * x1
+        xs = ((ys - b) / m).astype(np.int64)
+    xs[0], ys[0] = x1, y1
+    return np.stack([xs, ys], axis=1)
+
+def _segmentos_fuera(inicios, fines, mask, num_steps=1000):
+    """
+    Evalúa a la vez K segmentos (arreglos (K, 2)): True si alguna de sus
+    num_steps muestras cae fuera de la imagen o de la máscara.
+    """
+    t = np.linspace(0, 1, num_steps)
+    xs = (inicios[:, :1] * (1 - t) + fines[:, :1] * t).astype(np.int64)
+    ys = (inicios[:, 1:] * (1 - t) + fines[:, 1:] * t).astype(np.int64)
+    h, w = mask.shape[:2]
+    dentro = (xs >= 0) & (ys >= 0) & (xs < w) & (ys < h)
+    dentro[dentro] = mask[ys[dentro], xs[dentro]] != 0
+    return ~dentro.all(axis=1)
+
+def buscar_nudillos(hand_points, mask, max_steps=500, bloque=32):
+    """
+    Sube los puntos 5, 9, 13 y 17 de a un píxel hasta que los tres segmentos
+    5-9, 17-13 y 9-13 salen de la máscara (o se agotan max_steps pasos) y
+    actualiza hand_points con las posiciones finales.
+
+    En lugar de simular paso a paso, supone que el resultado del último paso
+    (qué segmentos siguen dentro) se repite, evalúa un bloque de pasos futuros
+    en un solo arreglo y salta directo al primer paso donde el patrón cambia.
+    Las posiciones finales son las mismas que las del recorrido paso a paso.
+    """
+    candidatos = {p: _posiciones_hacia_arriba(hand_points, p, q, max_steps)
+                  for p, q in RECTAS_NUDILLOS.items()}
+    pasos_punto = dict.fromkeys(RECTAS_NUDILLOS, 0)
+    patron = (True, True, True)
+    paso = 0
+    tamano_bloque = bloque
+
+    while paso < max_steps:
+        k = min(tamano_bloque, max_steps - paso)
+        dentro_5_9, dentro_17_13, dentro_9_13 = patron
+        mueve = {5: dentro_5_9, 9: dentro_5_9 or dentro_9_13,
+                 13: dentro_17_13 or dentro_9_13, 17: dentro_17_13}
+
+        # Índice del candidato de cada punto en los próximos k pasos si el patrón se mantiene
+        j = np.arange(k)
+        indices = {p: pasos_punto[p] + j * mueve[p] + 1 for p in RECTAS_NUDILLOS}
+        dentro = np.stack([~_segmentos_fuera(candidatos[a][indices[a]], candidatos[b][indices[b]], mask)
+                           for a, b in SEGMENTOS_NUDILLOS], axis=1)
+
+        cambios = np.flatnonzero((dentro != patron).any(axis=1))
+        if len(cambios) == 0:
+            for p in RECTAS_NUDILLOS:
+                pasos_punto[p] += k * mueve[p]
+            paso += k
+            tamano_bloque *= 2
+            continue
+
+        # Los pasos previos al cambio siguieron el patrón; el paso del cambio se aplica tal cual
+        d = int(cambios[0])
+        for p in RECTAS_NUDILLOS:
+            pasos_punto[p] += d * mueve[p]
+        patron = tuple(bool(v) for v in dentro[d])
+        if not any(patron):
+            break
+
+        dentro_5_9, dentro_17_13, dentro_9_13 = patron
+        for p, se_mueve in ((5, dentro_5_9), (9, dentro_5_9 or dentro_9_13),
+                            (13, dentro_17_13 or dentro_9_13), (17, dentro_17_13)):
+            pasos_punto[p] += se_mueve
+        paso += d + 1
+        tamano_bloque = bloque
+
+    for p in RECTAS_NUDILLOS:
+        hand_points[p] = candidatos[p][pasos_punto[p]]
+    return hand_points
+
+
+# ================== ETAPAS DE SEGMENTACIÓN DE MANOS ==================
+COLOR_MANOS = (255, 0, 255)
+# Área mínima (px) para considerar una región cerrada como zona de la mano
+AREA_MINIMA_ZONA = 10
+
+def _inferir_manos(hands, image):
+    # El cronómetro empieza con la instancia ya adquirida: la espera por el
+    # pool se mide aparte ("espera_pool_manos", en PoolManos.instancia)
+    with cronometrar("inferencia_manos"):
+        return hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+def detectar_manos(image, hands=None):
+    """
+    Ejecuta MediaPipe Hands sobre la imagen BGR con una instancia del pool, o
+    con `hands` si se indica (p. ej. el tracker de una sesión).
+
+    Devuelve una lista con un arreglo float32 (21, 3) de landmarks normalizados por mano.
+    """
+    if hands is not None:
+        results = _inferir_manos(hands, image)
+    else:
+        with pool_manos.instancia() as hands:
+            results = _inferir_manos(hands, image)
+
+    if not results.multi_hand_landmarks:
+        return []
+    return [np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+            for hand_landmarks in results.multi_hand_landmarks]
+
+@cronometrar("geometria_manos")
+def geometria_manos(image, manos):
+    """
+    Calcula las líneas de segmentación de las falanges y el contorno de cada mano.
+
+    Args:
+        image (np.ndarray): Imagen BGR original
+        manos (list): Landmarks normalizados de cada mano (salida de detectar_manos)
+
+    Returns:
+        np.ndarray: Máscara uint8 con las líneas dibujadas en 255
+    """
+    h, w = image.shape[:2]
+
+    # Convertir a escala de grises y aplicar umbralización
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
+
+    # Las líneas se dibujan sobre una máscara; el overlay de color sale de ella
+    lineas = np.zeros_like(binary)
+
+    # Crear una máscara negra del mismo tamaño que la imagen
+    mask = np.zeros_like(binary)
+
+    for landmarks in manos:
+        # Extraer coordenadas de los 21 puntos de la mano (igual que int(lm.x * w))
+        hand_points = np.stack([(landmarks[:, 0].astype(np.float64) * w).astype(np.int32),
+                                (landmarks[:, 1].astype(np.float64) * h).astype(np.int32)], axis=1)
+
+        # Unir puntos con líneas para marcar las falanges dentro de la mano
+        finger_sections = [(3, 6), (4, 7), (6, 10), (10, 14), (14, 18),
+                           (7, 11), (11, 15), (15, 19)]
+
+        # Generar el contorno de la mano
+        finger_tips = [4, 8, 12, 16, 20]
+        palm_base = [0, 1, 5, 9, 13, 17]
+        mid_fingers = [6, 10, 14, 18]
+
+        contour_points = np.concatenate([hand_points[finger_tips], 
+                                         hand_points[palm_base], 
+                                         hand_points[mid_fingers]])
+
+        hull = cv2.convexHull(contour_points, returnPoints=True)
+        cv2.fillConvexPoly(mask, hull, 255)
+
+        # Dilatar la máscara para mejorar la cobertura de la mano
+        kernel = np.ones((5, 5), np.uint8)
+        dilated_mask = cv2.dilate(mask, kernel, iterations=1)
+
+        # Crear masked_binary (máscara final)
+        masked_binary = cv2.bitwise_and(binary, binary, mask=dilated_mask)
+
+        # Dibujar las líneas de las falanges
+        for (p1, p2) in finger_sections:
+            if (p1, p2) == (4, 7):
+                dibujar_linea_limitada(lineas, hand_points[7], hand_points[4], binary, color=255)
+            else:
+                dibujar_linea_limitada(lineas, hand_points[p1], hand_points[p2], binary, color=255)
+                dibujar_linea_limitada(lineas, hand_points[p2], hand_points[p1], binary, color=255)
+
+        # Dibujar líneas en sentido contrario
+        dibujar_linea_inversa(lineas, hand_points[19], hand_points[15], dilated_mask, color=255)
+        dibujar_linea_inversa(lineas, hand_points[18], hand_points[14], dilated_mask, color=255)
+        dibujar_linea_inversa(lineas, hand_points[3], hand_points[5], dilated_mask, color=255)
+
+        # Mover los puntos 5, 9, 13 y 17 hacia arriba hasta tocar el borde
+        buscar_nudillos(hand_points, masked_binary)
+
+        # Dibujar las líneas finales
+        cv2.line(lineas, tuple(hand_points[5]), tuple(hand_points[9]), 255, 2)
+        cv2.line(lineas, tuple(hand_points[17]), tuple(hand_points[13]), 255, 2)
+        cv2.line(lineas, tuple(hand_points[9]), tuple(hand_points[13]), 255, 2)
+
+        # Dibujar líneas adicionales desde 5 (contrario a 9) y desde 17 (contrario a 13)
+        dibujar_linea_inversa(lineas, hand_points[5], hand_points[9], masked_binary, color=255, grosor=2, num_steps=1000)
+        dibujar_linea_inversa(lineas, hand_points[17], hand_points[13], masked_binary, color=255, grosor=1, num_steps=1000)
+
+        # Pulgar
+        dibujar_linea_limitada(lineas, hand_points[2], hand_points[6], masked_binary, color=255)
+        dibujar_linea_inversa(lineas, hand_points[2], hand_points[6], dilated_mask, color=255)
+
+        # Encontrar contornos en la imagen procesada
+        contours, _ = cv2.findContours(masked_binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        cv2.drawContours(lineas, contours, -1, 255, 2)
+
+    return lineas
+
+@cronometrar("etiquetado_zonas_manos")
+def etiquetar_zonas_manos(lineas, area_minima=AREA_MINIMA_ZONA):
+    """
+    Construye el mapa de etiquetas de las zonas (falanges y palma) encerradas
+    por las líneas de segmentación.
+
+    Las regiones que tocan el borde de la imagen son fondo. Las zonas se
+    numeran de 1 a N por área descendente; 0 marca líneas y fondo.
+
+    Returns:
+        tuple: (etiquetas int32 del tamaño de la imagen, centroides float64 (N, 2))
+    """
+    # Cerrar huecos de 1-2 px entre líneas que casi se tocan
+    cerradas = cv2.morphologyEx(lineas, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    libres = (cerradas == 0).astype(np.uint8)
+
+    num, componentes, stats, centroides = cv2.connectedComponentsWithStats(libres, connectivity=4)
+
+    h, w = lineas.shape[:2]
+    izquierda, arriba = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    derecha = izquierda + stats[:, cv2.CC_STAT_WIDTH]
+    abajo = arriba + stats[:, cv2.CC_STAT_HEIGHT]
+    areas = stats[:, cv2.CC_STAT_AREA]
+
+    validas = (izquierda > 0) & (arriba > 0) & (derecha < w) & (abajo < h) & (areas > area_minima)
+    validas[0] = False  # componente 0: píxeles de línea
+
+    candidatas = np.flatnonzero(validas)
+    orden = candidatas[np.argsort(-areas[candidatas], kind="stable")]
+
+    renumerar = np.zeros(num, dtype=np.int32)
+    renumerar[orden] = np.arange(1, len(orden) + 1, dtype=np.int32)
+    return renumerar[componentes], centroides[orden]
+
+def dibujar_manos(image, lineas):
+    """Devuelve una copia de la imagen con las líneas de segmentación en magenta"""
+    image_with_contours = image.copy()
+    image_with_contours[lineas > 0] = COLOR_MANOS
+    return image_with_contours
+
+def segmentar_manos_imagen(image):
+    """
+    Etapa de análisis de manos en memoria.
+
+    Returns:
+        dict: "landmarks" (lista de (21, 3) float32), "lineas" (máscara uint8),
+              "etiquetas" (mapa int32 de zonas) y "centroides" ((N, 2) por zona)
+    """
+    manos = detectar_manos(image)
+    lineas = geometria_manos(image, manos)
+    etiquetas, centroides = etiquetar_zonas_manos(lineas)
+    return {"landmarks": manos, "lineas": lineas, "etiquetas": etiquetas, "centroides": centroides}
 
 def segmentar_manos(input_path, output_path):
     """
@@ -12,262 +467,14 @@ def segmentar_manos(input_path, output_path):
         input_path (str): Ruta de la imagen de entrada
         output_path (str): Ruta donde se guardará la imagen procesada
     """
-    # Inicializar MediaPipe Hands
-    mp_hands = mp.solutions.hands
-    mp_drawing = mp.solutions.drawing_utils
-    hands = mp_hands.Hands(static_image_mode=True, max_num_hands=2, min_detection_confidence=0.6)
-
     # Cargar la imagen
     image = cv2.imread(input_path)
     if image is None:
         raise ValueError(f"No se pudo cargar la imagen desde {input_path}")
 
-    # Convertir a escala de grises y aplicar umbralización
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
-
-    # Crear copia de la imagen para mostrar resultados
-    image_with_contours = image.copy()
-
-    # Detectar manos en la imagen original
-    results = hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-
-    # Crear una máscara negra del mismo tamaño que la imagen
-    mask = np.zeros_like(binary)
-
-    if results.multi_hand_landmarks:
-        for hand_landmarks in results.multi_hand_landmarks:
-            # Extraer coordenadas de los 21 puntos de la mano
-            hand_points = np.array([(int(lm.x * image.shape[1]), int(lm.y * image.shape[0])) 
-                                    for lm in hand_landmarks.landmark], np.int32)
-
-            # Puntos clave para dividir falanges
-            selected_points = [3, 4, 5, 6, 10, 14, 18, 7, 11, 15, 19]
-
-            # Dibujar los puntos seleccionados sobre la imagen
-            # for idx in selected_points:
-            #     cv2.circle(image_with_contours, tuple(hand_points[idx]), 5, (0, 0, 255), -1)
-
-            # Unir puntos con líneas para marcar las falanges dentro de la mano
-            finger_sections = [(3, 6), (4, 7), (6, 10), (10, 14), (14, 18),
-                               (7, 11), (11, 15), (15, 19)]
-            
-            def draw_limited_line(img, p1, p2, mask):
-                """Dibuja una línea entre dos puntos, deteniéndose si sale de la máscara"""
-                x1, y1 = hand_points[p1]
-                x2, y2 = hand_points[p2]
-
-                num_steps = 50
-                for t in np.linspace(0, 1, num_steps):
-                    xt = int(x1 * (1 - t) + x2 * t)
-                    yt = int(y1 * (1 - t) + y2 * t)
-
-                    # Verificar límites de la imagen
-                    if xt < 0 or yt < 0 or xt >= image.shape[1] or yt >= image.shape[0]:
-                        break
-
-                    if mask[yt, xt] == 0:
-                        break
-
-                    if t > 0:
-                        cv2.line(img, (prev_x, prev_y), (xt, yt), (255, 0, 255), 2)
-
-                    prev_x, prev_y = xt, yt
-
-            # Generar el contorno de la mano
-            finger_tips = [4, 8, 12, 16, 20]
-            palm_base = [0, 1, 5, 9, 13, 17]
-            mid_fingers = [6, 10, 14, 18]
-
-            contour_points = np.concatenate([hand_points[finger_tips], 
-                                             hand_points[palm_base], 
-                                             hand_points[mid_fingers]])
-
-            hull = cv2.convexHull(contour_points, returnPoints=True)
-            cv2.fillConvexPoly(mask, hull, 255)
-            
-            # Dilatar la máscara para mejorar la cobertura de la mano
-            kernel = np.ones((5, 5), np.uint8)
-            dilated_mask = cv2.dilate(mask, kernel, iterations=1)
-
-            # Crear masked_binary (máscara final)
-            masked_binary = cv2.bitwise_and(binary, binary, mask=dilated_mask)
-
-            # Dibujar landmarks en la imagen
-            # mp_drawing.draw_landmarks(image_with_contours, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-
-            # Dibujar las líneas de las falanges
-            for (p1, p2) in finger_sections:
-                if (p1, p2) == (4, 7):
-                    draw_limited_line(image_with_contours, 7, 4, binary)
-                else:
-                    draw_limited_line(image_with_contours, p1, p2, binary)
-                    draw_limited_line(image_with_contours, p2, p1, binary)
-
-            def draw_reverse_line(img, p1, p2, color, mask):
-                """Dibuja una línea desde p1 en sentido contrario a p2, deteniéndose si sale de la máscara"""
-                x1, y1 = hand_points[p1]
-                x2, y2 = hand_points[p2]
-
-                if x2 != x1:
-                    m = (y2 - y1) / (x2 - x1)
-                    b = y1 - m * x1
-
-                    num_steps = 100
-                    for t in np.linspace(0, -1, num_steps):
-                        x_t = int(x1 * (1 - t) + x2 * t)
-                        y_t = int(m * x_t + b)
-
-                        if x_t < 0 or y_t < 0 or x_t >= image.shape[1] or y_t >= image.shape[0]:
-                            break
-
-                        if mask[y_t, x_t] == 0:
-                            break
-                    
-                    cv2.line(img, (x1, y1), (x_t, y_t), color, 1)
-
-            # Dibujar líneas en sentido contrario
-            draw_reverse_line(image_with_contours, 19, 15, (255, 0, 255), dilated_mask)
-            draw_reverse_line(image_with_contours, 18, 14, (255, 0, 255), dilated_mask)
-            draw_reverse_line(image_with_contours, 3, 5, (255, 0, 255), dilated_mask)
-
-            # Función para calcular la ecuación de la recta entre dos puntos
-            def calculate_line_equation(p1, p2):
-                x1, y1 = hand_points[p1]
-                x2, y2 = hand_points[p2]
-                if x2 == x1:
-                    return None, None
-                m = (y2 - y1) / (x2 - x1)
-                b = y1 - m * x1
-                return m, b
-
-            def move_point_up(p, m, b, step=1):
-                x, y = hand_points[p]
-                y_new = y - step
-                x_new = (y_new - b) / m if m != 0 else x
-                return int(x_new), int(y_new)
-
-            # Calcular las ecuaciones de las rectas
-            m_5_6, b_5_6 = calculate_line_equation(5, 6)
-            m_9_10, b_9_10 = calculate_line_equation(9, 10)
-            m_17_18, b_17_18 = calculate_line_equation(17, 18)
-            m_13_14, b_13_14 = calculate_line_equation(13, 14)
-
-            step = 1
-            max_steps = 500
-
-            def is_line_out_of_mask(p1, p2, mask):
-                x1, y1 = p1
-                x2, y2 = p2
-
-                if mask[y1, x1] == 0 or mask[y2, x2] == 0:
-                    return True
-
-                num_steps = 1000
-                for t in np.linspace(0, 1, num_steps):
-                    xt = int(x1 * (1 - t) + x2 * t)
-                    yt = int(y1 * (1 - t) + y2 * t)
-
-                    if xt < 0 or yt < 0 or xt >= mask.shape[1] or yt >= mask.shape[0]:
-                        return True
-
-                    if mask[yt, xt] == 0:
-                        return True
-
-                return False
-
-            # Mover los puntos hacia arriba hasta tocar el borde
-            for _ in range(max_steps):
-                p5_new = move_point_up(5, m_5_6, b_5_6, step)
-                p9_new = move_point_up(9, m_9_10, b_9_10, step)
-                p17_new = move_point_up(17, m_17_18, b_17_18, step)
-                p13_new = move_point_up(13, m_13_14, b_13_14, step)
-
-                out_5_9 = is_line_out_of_mask(p5_new, p9_new, masked_binary)
-                out_17_13 = is_line_out_of_mask(p17_new, p13_new, masked_binary)
-                out_9_13 = is_line_out_of_mask(p9_new, p13_new, masked_binary)
-
-                if out_5_9 and out_17_13 and out_9_13:
-                    break
-
-                if not out_5_9:
-                    hand_points[5] = p5_new
-                    hand_points[9] = p9_new
-                if not out_17_13:
-                    hand_points[17] = p17_new
-                    hand_points[13] = p13_new
-                if not out_9_13: 
-                    hand_points[9] = p9_new
-                    hand_points[13] = p13_new
-
-            # Dibujar las líneas finales
-            cv2.line(image_with_contours, tuple(hand_points[5]), tuple(hand_points[9]), (255, 0, 255), 2)
-            cv2.line(image_with_contours, tuple(hand_points[17]), tuple(hand_points[13]), (255, 0, 255), 2)
-            cv2.line(image_with_contours, tuple(hand_points[9]), tuple(hand_points[13]), (255, 0, 255), 2)
-
-            # for idx in [5, 9, 17, 13]:
-            #     cv2.circle(image_with_contours, tuple(hand_points[idx]), 5, (255, 0, 255), -1)
-
-            def draw_reverse_line_from_5_to_9(img, color, mask):
-                """Dibuja una línea desde el punto 5 en sentido contrario al punto 9"""
-                x5, y5 = hand_points[5]
-                x9, y9 = hand_points[9]
-
-                if x9 != x5:
-                    m = (y9 - y5) / (x9 - x5)
-                    b = y5 - m * x5
-
-                    num_steps = 1000
-                    for t in np.linspace(0, -1, num_steps):
-                        x_t = int(x5 * (1 - t) + x9 * t)
-                        y_t = int(m * x_t + b)
-
-                        if x_t < 0 or y_t < 0 or x_t >= image.shape[1] or y_t >= image.shape[0]:
-                            break
-
-                        if mask[y_t, x_t] == 0:
-                            break
-                    
-                    cv2.line(img, (x5, y5), (x_t, y_t), color, 2)
-
-            def draw_reverse_line_from_17_to_13(img, color, mask):
-                """Dibuja una línea desde el punto 17 en sentido contrario al punto 13"""
-                x17, y17 = hand_points[17]
-                x13, y13 = hand_points[13]
-
-                if x13 != x17:
-                    m = (y13 - y17) / (x13 - x17)
-                    b = y17 - m * x17
-
-                    num_steps = 1000
-                    for t in np.linspace(0, -1, num_steps):
-                        x_t = int(x17 * (1 - t) + x13 * t)
-                        y_t = int(m * x_t + b)
-
-                        if x_t < 0 or y_t < 0 or x_t >= image.shape[1] or y_t >= image.shape[0]:
-                            break
-
-                        if mask[y_t, x_t] == 0:
-                            break
-                    
-                    cv2.line(img, (x17, y17), (x_t, y_t), color, 1)
-
-            # Dibujar líneas adicionales
-            draw_reverse_line_from_5_to_9(image_with_contours, (255, 0, 255), masked_binary)
-            draw_reverse_line_from_17_to_13(image_with_contours, (255, 0, 255), masked_binary)
-
-            # Pulgar
-            draw_limited_line(image_with_contours, 2, 6, masked_binary)
-            draw_reverse_line(image_with_contours, 2, 6, (255, 0, 255), dilated_mask)
-
-            # Encontrar contornos en la imagen procesada
-            contours, _ = cv2.findContours(masked_binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            cv2.drawContours(image_with_contours, contours, -1, (255, 0, 255), 2)
+    lineas = geometria_manos(image, detectar_manos(image))
 
     # Guardar la imagen procesada
-    cv2.imwrite(output_path, image_with_contours)
-    
-    # Cerrar MediaPipe
-    hands.close()
+    cv2.imwrite(output_path, dibujar_manos(image, lineas))
     
-    return True
\ No newline at end of file
+    return True
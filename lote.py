@@ -0,0 +1,160 @@
+#Procesamiento por lotes: muchas imágenes en una petición, en paralelo y en orden
+import logging
+import os
+import zipfile
+import zlib
+from collections import deque
+from io import BytesIO
+
+import config
+from ejecutor import ejecutor
+from analisis import (ImagenInvalida, decodificar_imagen, analizar_rostro_y_manos,
+                      medir_rostro_y_manos)
+from cacheResultados import hash_contenido
+from reportes import codificar_jpeg, generar_pdf_lote
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+FORMATOS_LOTE = ("json", "pdf")
+# Bytes que se descomprimen por lectura al extraer un zip
+TAMANO_FRAGMENTO = 1024 * 1024
+
+
+class LoteInvalido(ValueError):
+    """El lote está vacío, supera el máximo de imágenes o el zip no se puede leer"""
+
+
+def es_zip(nombre, content_type):
+    return (content_type in ("application/zip", "application/x-zip-compressed")
+            or (nombre or "").lower().endswith(".zip"))
+
+
+def _leer_miembro(archivo, miembro, restante):
+    """Bytes descomprimidos de un miembro del zip, sin pasar de `restante` bytes leídos"""
+    partes = []
+    with archivo.open(miembro) as entrada:
+        while True:
+            parte = entrada.read(min(TAMANO_FRAGMENTO, restante + 1))
+            if not parte:
+                break
+            restante -= len(parte)
+            if restante < 0:
+                raise LoteInvalido(f"El contenido del zip supera el máximo de {config.MAX_LOTE_MB} MB")
+            partes.append(parte)
+    return b"".join(partes)
+
+
+def extraer_zip(datos, max_imagenes=None):
+    """
+    Imágenes contenidas en un zip, en el orden del archivo.
+
+    El tamaño descomprimido total se limita a MAX_LOTE_MB contando los bytes
+    que realmente se descomprimen (no los tamaños que declara el zip), así
+    que un zip pequeño no puede expandirse sin control en memoria.
+
+    Returns:
+        list: Tuplas (nombre, bytes); se ignoran directorios y archivos que no
+              tienen extensión de imagen
+    """
+    max_imagenes = max_imagenes or config.LOTE_MAX_IMAGENES
+    try:
+        archivo = zipfile.ZipFile(BytesIO(datos))
+    except zipfile.BadZipFile:
+        raise LoteInvalido("El archivo zip no es válido") from None
+
+    restante = config.MAX_LOTE_MB * 1024 * 1024
+    imagenes = []
+    with archivo:
+        for miembro in archivo.infolist():
+            if miembro.is_dir() or not miembro.filename.lower().endswith(EXTENSIONES_IMAGEN):
+                continue
+            if len(imagenes) >= max_imagenes:
+                raise LoteInvalido(f"El lote supera el máximo de {max_imagenes} imágenes")
+            try:
+                contenido = _leer_miembro(archivo, miembro, restante)
+            except (zipfile.BadZipFile, zlib.error, NotImplementedError, EOFError) as e:
+                raise LoteInvalido(f"{miembro.filename}: no se pudo descomprimir ({str(e)})") from None
+            restante -= len(contenido)
+            imagenes.append((os.path.basename(miembro.filename), contenido))
+    return imagenes
+
+
+def _procesar_imagen(nombre, datos, formato):
+    """Decodificación, inferencia y render de una imagen del lote (en un hilo del ejecutor)"""
+    hash_imagen = hash_contenido(datos)
+    try:
+        image = decodificar_imagen(datos)
+    except ImagenInvalida as e:
+        return {"nombre": nombre, "hash": hash_imagen, "error": str(e)}
+
+    # El paralelismo del lote es entre imágenes, así que cada una corre sus
+    # etapas en secuencia en su propio hilo
+    if formato == "json":
+        rostro, manos = medir_rostro_y_manos(image, concurrente=False, hash_imagen=hash_imagen)
+        h, w = image.shape[:2]
+        return {"nombre": nombre, "hash": hash_imagen, "ancho": w, "alto": h, "rostro": rostro, "manos": manos}
+
+    rostro, manos = analizar_rostro_y_manos(image, concurrente=False, hash_imagen=hash_imagen)
+    # Solo se conservan las imágenes ya codificadas hasta armar el PDF
+    rostro["imagen"] = codificar_jpeg(rostro["imagen"])
+    manos["imagen"] = codificar_jpeg(manos["imagen"])
+    if manos["imagen_numerada"] is not None:
+        manos["imagen_numerada"] = codificar_jpeg(manos["imagen_numerada"])
+    return {"nombre": nombre, "rostro": rostro, "manos": manos}
+
+
+def _en_orden(imagenes, formato):
+    """
+    Procesa las imágenes en el ejecutor de segmentación compartido y entrega
+    los resultados en el orden de entrada. Hay como máximo 2 x LOTE_HILOS
+    imágenes en curso, así que la memoria no crece con el tamaño del lote, y
+    cada una ocupa un lugar del ejecutor como cualquier otra petición.
+
+    Debe ejecutarse fuera de los hilos del ejecutor (ver enviar_bloqueante).
+    """
+    ventana = 2 * config.LOTE_HILOS
+    pendientes = deque()
+    try:
+        for nombre, datos in imagenes:
+            pendientes.append(ejecutor.enviar_bloqueante(_procesar_imagen, nombre, datos, formato))
+            if len(pendientes) >= ventana:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+    finally:
+        for futuro in pendientes:
+            futuro.cancel()
+
+
+def procesar_lote(imagenes, formato="json"):
+    """
+    Procesa un lote de imágenes con el pipeline completo (rostro + manos).
+
+    Las imágenes se decodifican, analizan y renderizan en paralelo en los hilos
+    del ejecutor de segmentación (con su FaceMesh y el pool de Hands); el PDF
+    combinado se arma en el hilo que llama a medida que llegan los resultados.
+
+    Args:
+        imagenes (list): Tuplas (nombre, bytes)
+        formato (str): "json" (resultados por imagen) o "pdf" (un reporte combinado)
+
+    Returns:
+        dict | bytes: {"total", "errores", "imagenes"} para JSON, bytes del PDF para "pdf"
+    """
+    if formato not in FORMATOS_LOTE:
+        raise LoteInvalido(f"Formato no soportado: {formato}")
+    if not imagenes:
+        raise LoteInvalido("El lote no contiene imágenes")
+    if len(imagenes) > config.LOTE_MAX_IMAGENES:
+        raise LoteInvalido(f"El lote supera el máximo de {config.LOTE_MAX_IMAGENES} imágenes")
+
+    if formato == "pdf":
+        return generar_pdf_lote(_en_orden(imagenes, formato))
+
+    resultados = list(_en_orden(imagenes, formato))
+    return {
+        "total": len(resultados),
+        "errores": sum("error" in resultado for resultado in resultados),
+        "imagenes": resultados,
+    }
@@ -1,104 +1,61 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, WebSocket
+from fastapi.responses import HTMLResponse, Response, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware  
-from fpdf import FPDF
+from contextlib import asynccontextmanager
+from starlette.background import BackgroundTask
+import asyncio
 import uuid
 import os
+import tempfile
+import json
 import logging
+from typing import List
 import cv2
-import mediapipe as mp
-import numpy as np
-from handsMesh import segmentar_manos
-from faceMesh import segmentar_rostro
-
-# ================== LIBRERÍAS Y CONFIGURACIÓN ==================
-# Inicializar MediaPipe Face Mesh
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True)
-
-# Definir zonas faciales
-ZONAS_ROSTRO = {
-    "Frente": [9, 336, 296, 334, 293, 301, 251, 284, 332, 297, 338, 10, 109, 67, 103, 54, 21, 71, 63, 105, 66, 107],
-    "Mejilla Izquierda": [138, 215, 177, 137, 227, 111, 31, 228, 229, 230, 120, 47, 126, 209, 129, 203, 206, 216],
-    "Mejilla Derecha": [367, 435, 401, 366, 447, 340, 261, 448, 449, 450, 349, 277, 355, 429, 358, 423, 426, 436],
-    "Nariz": [2, 326, 328, 290, 392, 439, 278, 279, 420, 399, 419, 351, 168, 122, 196, 174, 198, 49, 48, 219, 64, 98, 97],
-    "Ojo Izquierdo": [223, 222, 221, 189, 245, 128, 232, 231, 230, 229, 228, 31, 226, 113, 225, 224],
-    "Ojo Derecho": [443, 444, 445, 342, 446, 261, 448, 449, 450, 350, 357, 464, 413, 441, 442],
-    "Boca": [17, 314, 405, 321, 375, 287, 409, 270, 269, 267, 0, 37, 39, 40, 185, 57, 146, 91, 181, 84],
-    "Menton": [17, 314, 405, 321, 375, 287, 432, 434, 364, 394, 395, 369, 396, 175, 171, 140, 170, 169, 135, 214, 212, 57, 61, 146, 91, 181, 84],
-    "Bozo": [2, 326, 328, 290, 327, 423, 426, 436, 410, 270, 269, 267, 0, 37, 39, 40, 185, 186, 216, 216, 206, 203, 98, 97]
-}
-
-def procesar_zonas_rostro(image, gray_image, landmarks, zonas):
-    h, w = image.shape[:2]
-    resultados = {}
-    for nombre_zona, indices in zonas.items():
-        puntos = np.array([(int(landmarks.landmark[i].x * w), int(landmarks.landmark[i].y * h)) for i in indices])
-        mask = np.zeros_like(gray_image, dtype=np.uint8)
-        cv2.fillPoly(mask, [puntos], 255)
-        valores_pixeles = gray_image[mask == 255]
-        promedio_intensidad = np.mean(valores_pixeles) if len(valores_pixeles) > 0 else 0
-        resultados[nombre_zona] = promedio_intensidad
-        cv2.polylines(image, [puntos], isClosed=True, color=(255, 0, 255), thickness=2)
-    return resultados
-
-def analizar_manos_por_zonas(image_path, output_path_con_numeros):
-    """
-    Analiza la imagen de manos segmentada, calcula la intensidad promedio
-    de los píxeles en cada zona magenta y dibuja el número de la zona en la imagen.
-    """
-    try:
-        imagen_original = cv2.imread(image_path)
-        if imagen_original is None:
-            logging.warning(f"No se pudo cargar la imagen para analizar manos: {image_path}")
-            return None, False
-
-        imagen_con_numeros = imagen_original.copy()
-        imagen_gris = cv2.cvtColor(imagen_original, cv2.COLOR_BGR2GRAY)
-        hsv = cv2.cvtColor(imagen_original, cv2.COLOR_BGR2HSV)
-
-        lower_magenta = np.array([145, 170, 190])
-        upper_magenta = np.array([155, 240, 255])
-
-        mascara_magenta = cv2.inRange(hsv, lower_magenta, upper_magenta)
-        kernel = np.ones((3, 3), np.uint8)
-        mascara_magenta = cv2.morphologyEx(mascara_magenta, cv2.MORPH_CLOSE, kernel)
-
-        contornos, _ = cv2.findContours(mascara_magenta, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-        umbral_area = 10
-        contornos_filtrados = [c for c in contornos if cv2.contourArea(c) > umbral_area]
-        contornos_ordenados = sorted(contornos_filtrados, key=cv2.contourArea, reverse=True)
-
-        resultados_manos = {}
-        for i, contorno in enumerate(contornos_ordenados):
-            mascara_zona_actual = np.zeros_like(mascara_magenta)
-            cv2.drawContours(mascara_zona_actual, [contorno], -1, 255, thickness=cv2.FILLED)
-            
-            zona_actual_pixeles_values = imagen_gris[np.where(mascara_zona_actual == 255)]
-            
-            promedio_gris = np.mean(zona_actual_pixeles_values) if len(zona_actual_pixeles_values) > 0 else 0
-            resultados_manos[f"Zona Mano {i+1}"] = f"{promedio_gris:.2f}"
-
-            M = cv2.moments(contorno)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                texto = f"{i+1}"
-                cv2.putText(imagen_con_numeros, texto, (cx - 10, cy + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 1, cv2.LINE_AA)
-
-        cv2.imwrite(output_path_con_numeros, imagen_con_numeros)
-        return resultados_manos, True
-
-    except Exception as e:
-        logging.error(f"Error al analizar las manos por zonas: {str(e)}")
-        return None, False
+import config
+from handsMesh import pool_manos
+from faceMesh import registro_face_mesh
+from ejecutor import ejecutor, ColaLlena
+from calentamiento import estado_calentamiento
+from cacheResultados import cache_reportes, cache_etapas, clave_resultado
+import metricas
+import perfiles
+from subidas import MB, SubidaDemasiadoGrande, LimiteCuerpo, leer_subida, guardar_subida, limites_cuerpo
+# ZONAS_ROSTRO y procesar_zonas_rostro se re-exportan desde aquí (con la misma
+# firma) porque antes se definían en este módulo. analizar_manos_por_zonas ya
+# no: ahora recibe el mapa de zonas de la geometría en lugar de rutas de imagen,
+# así que se importa de analisis
+from analisis import (ZONAS_ROSTRO, ImagenInvalida, parece_imagen, decodificar_imagen,
+                      procesar_zonas_rostro, analizar_rostro, analizar_manos,
+                      analizar_rostro_y_manos, medir_rostro, medir_manos, medir_rostro_y_manos)
+from reportes import generar_pdf_rostro, generar_pdf_manos, generar_pdf_completo, generar_pdf_video
+from lote import LoteInvalido, es_zip, extraer_zip, procesar_lote
+from video import VideoInvalido, FORMATOS_VIDEO, es_video, procesar_video
+from seguimiento import SesionSeguimiento, UltimoCuadro, sesiones_seguimiento
+from trabajos import AlmacenTrabajos, GestorTrabajos, FORMATOS_TRABAJO, PENDIENTE, COMPLETADO, ERROR
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    gestor_trabajos.iniciar()
+    # El worker no acepta conexiones hasta que termina el lifespan, así que
+    # ninguna petición paga la inicialización de los modelos
+    if config.CALENTAMIENTO:
+        await asyncio.to_thread(estado_calentamiento.calentar, ejecutor)
+    else:
+        estado_calentamiento.desactivar()
+    yield
+    gestor_trabajos.detener(espera=5)
+
+app = FastAPI(lifespan=lifespan)
+
+# ================== LÍMITE DE SUBIDAS ==================
+# Rechaza con 413 los cuerpos demasiado grandes antes de que se terminen de recibir
+# (se registra antes que CORS para que el 413 también lleve sus cabeceras)
+limite_cuerpo, limites_por_ruta = limites_cuerpo()
+app.add_middleware(LimiteCuerpo, limite=limite_cuerpo, limites=limites_por_ruta)
 
 # ================== CONFIGURACIÓN DE CORS ==================
 # << 2. BLOQUE AÑADIDO PARA HABILITAR CORS
@@ -115,8 +72,119 @@ app.add_middleware(
 )
 # ==========================================================
 
+# ================== PERFILADO ==================
+# Solo se registra si está activado: sin él no hay ningún costo por petición
+# (ni rutas /debug/perfiles)
+PERFILADO = config.PERFILADO_MUESTREO > 0 or config.PERFILADO_CABECERA
+if PERFILADO:
+    app.add_middleware(
+        perfiles.PerfiladoPeticiones,
+        muestreo=config.PERFILADO_MUESTREO,
+        cabecera=config.PERFILADO_CABECERA,
+        maximo=config.PERFILADO_MAX_PERFILES,
+        intervalo_ms=config.PERFILADO_INTERVALO_MS,
+    )
+
+# ================== MÉTRICAS ==================
+# Se registra al final para que sea el middleware más externo y cuente
+# también las respuestas 413 y las de CORS
+app.add_middleware(metricas.MetricasHTTP)
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# ================== ETAPAS DE CPU ==================
+# Se ejecutan en el ejecutor de segmentación, nunca en el event loop
+
+def reporte_rostro(datos, hash_imagen=None):
+    id_unico = str(uuid.uuid4())
+    image = decodificar_imagen(datos)
+    rostro = analizar_rostro(image, hash_imagen)
+
+    pdf_bytes = generar_pdf_rostro(rostro["imagen"], rostro["intensidades"])
+    guardar_resultados(id_unico, {"rostro_segmentado": rostro["imagen"]}, "rostro_segmentado.pdf", pdf_bytes)
+    return pdf_bytes
+
+def reporte_manos(datos, hash_imagen=None):
+    id_unico = str(uuid.uuid4())
+    image = decodificar_imagen(datos)
+    manos = analizar_manos(image, hash_imagen)
+
+    pdf_bytes = generar_pdf_manos(manos["imagen"])
+    guardar_resultados(id_unico, {"manos_segmentado": manos["imagen"]}, "manos_segmentado.pdf", pdf_bytes)
+    return pdf_bytes
+
+def _sin_progreso(etapa):
+    pass
+
+def reporte_completo(datos, hash_imagen=None, progreso=_sin_progreso):
+    id_unico = str(uuid.uuid4())
+    # La imagen se decodifica una vez y ambas etapas trabajan sobre el mismo arreglo
+    progreso("decodificando")
+    image = decodificar_imagen(datos)
+    progreso("analizando")
+    rostro, manos = analizar_rostro_y_manos(image, hash_imagen=hash_imagen)
+
+    progreso("generando_reporte")
+    pdf_bytes = generar_pdf_completo(rostro, manos)
+    guardar_resultados(id_unico, {
+        "rostro_segmentado": rostro["imagen"],
+        "manos_segmentado": manos["imagen"],
+        "manos_numerado": manos["imagen_numerada"],
+    }, "completo_reporte.pdf", pdf_bytes)
+    return pdf_bytes
+
+def _json_bytes(image, **resultados):
+    h, w = image.shape[:2]
+    return json.dumps({"ancho": w, "alto": h, **resultados}, ensure_ascii=False).encode("utf-8")
+
+def mediciones_rostro(datos, hash_imagen=None):
+    image = decodificar_imagen(datos)
+    return _json_bytes(image, rostro=medir_rostro(image, hash_imagen))
+
+def mediciones_manos(datos, hash_imagen=None):
+    image = decodificar_imagen(datos)
+    return _json_bytes(image, manos=medir_manos(image, hash_imagen))
+
+def mediciones_completas(datos, hash_imagen=None, progreso=_sin_progreso):
+    progreso("decodificando")
+    image = decodificar_imagen(datos)
+    progreso("analizando")
+    rostro, manos = medir_rostro_y_manos(image, hash_imagen=hash_imagen)
+    return _json_bytes(image, rostro=rostro, manos=manos)
+
+def serie_video(ruta_video, ruta_salida, formato, paso=None):
+    """Serie temporal de intensidades del video escrita en ruta_salida (CSV o JSON)"""
+    with open(ruta_salida, "w", encoding="utf-8", newline="") as salida:
+        return procesar_video(ruta_video, salida, formato, paso)
+
+def resumen_video(ruta_video, nombre, paso=None):
+    """PDF con el resumen por zona del video (la serie se descarta)"""
+    with open(os.devnull, "w") as salida:
+        informacion = procesar_video(ruta_video, salida, "csv", paso)
+    return generar_pdf_video(nombre, informacion)
+
+# Trabajos asíncronos: mismos pipelines que /procesar-imagen-completa/ y /analizar-completo
+ENDPOINT_TRABAJO = {"pdf": "completo", "json": "json-completo"}
+
+def _procesar_trabajo(formato):
+    funcion = {"pdf": reporte_completo, "json": mediciones_completas}[formato]
+
+    def procesar(datos, hash_imagen, progreso):
+        # En el ejecutor compartido: los trabajos cuentan en el mismo límite de
+        # EJECUTOR_HILOS que las peticiones síncronas
+        resultado = ejecutor.ejecutar_bloqueante(funcion, datos, hash_imagen, progreso)
+        cache_reportes.guardar(clave_resultado(hash_imagen, ENDPOINT_TRABAJO[formato]), resultado)
+        return resultado
+    return procesar
+
+almacen_trabajos = AlmacenTrabajos(config.TRABAJOS_DB, config.TRABAJOS_EXPIRACION, config.TRABAJOS_TIEMPO_MAXIMO)
+gestor_trabajos = GestorTrabajos(
+    almacen_trabajos,
+    {formato: _procesar_trabajo(formato) for formato in FORMATOS_TRABAJO},
+    hilos=config.TRABAJOS_HILOS,
+    errores_cliente=(ImagenInvalida,),
+)
+
 # ================== ENDPOINTS ==================
 
 @app.get("/", response_class=HTMLResponse)
@@ -124,72 +192,90 @@ async def read_root():
     with open("static/index.html", "r", encoding="utf-8") as f:
         return f.read()
 
+async def leer_archivo(file: UploadFile, limite=None):
+    """Lee un archivo subido por fragmentos; 413 si supera el límite"""
+    try:
+        return await leer_subida(file, limite)
+    except SubidaDemasiadoGrande as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+async def leer_imagen(file: UploadFile):
+    """
+    Valida el tipo de archivo y lee los bytes subidos (se decodifican en el ejecutor).
+
+    Returns:
+        tuple: (bytes de la imagen, hash SHA-256 calculado durante la lectura)
+    """
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
+    return await leer_archivo(file)
+
+def _servidor_ocupado(e):
+    return HTTPException(
+        status_code=429,
+        detail="Servidor ocupado, intente de nuevo más tarde",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+async def en_ejecutor(funcion, *args):
+    """Ejecuta una etapa de CPU fuera del event loop; 429 si la cola está llena"""
+    try:
+        return await ejecutor.ejecutar(funcion, *args)
+    except ColaLlena as e:
+        raise _servidor_ocupado(e)
+    except ImagenInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def resultado_con_cache(endpoint, funcion, datos, hash_imagen):
+    """
+    Devuelve el resultado (PDF o JSON) de la cache si esta imagen ya se procesó
+    en este endpoint con la misma versión del pipeline; si no, lo genera en el
+    ejecutor con funcion(datos, hash_imagen) y lo guarda.
+
+    Returns:
+        tuple: (bytes del resultado, "HIT" o "MISS")
+    """
+    clave = clave_resultado(hash_imagen, endpoint)
+    resultado = cache_reportes.obtener(clave)
+    if resultado is not None:
+        return resultado, "HIT"
+
+    resultado = await en_ejecutor(funcion, datos, hash_imagen)
+    cache_reportes.guardar(clave, resultado)
+    return resultado, "MISS"
+
+# Tamaño de cada fragmento al enviar el PDF
+TAMANO_FRAGMENTO_PDF = 64 * 1024
+
+def _fragmentos(datos, tamano=TAMANO_FRAGMENTO_PDF):
+    vista = memoryview(datos)
+    for inicio in range(0, len(vista), tamano):
+        yield vista[inicio:inicio + tamano]
+
+def responder_pdf(pdf_bytes, filename, estado_cache=None):
+    """Envía el PDF generado en memoria por fragmentos, sin pasar por disco"""
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(len(pdf_bytes)),
+    }
+    if estado_cache is not None:
+        headers["X-Cache"] = estado_cache
+    return StreamingResponse(_fragmentos(pdf_bytes), media_type="application/pdf", headers=headers)
+
 @app.post("/procesar-imagen-rostro/")
 async def procesar_imagen_rostro(file: UploadFile = File(...)):
     """
     Endpoint para procesar rostro con segmentación y análisis de intensidad por zonas
     """
     try:
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
-        
-        id_unico = str(uuid.uuid4())
-        input_path = f"{id_unico}_input.jpg"
-        output_path = f"{id_unico}_rostro_segmentado.jpg"
-        pdf_path = f"{id_unico}_rostro_segmentado.pdf"
-        
-        with open(input_path, "wb") as f:
-            f.write(await file.read())
-        
-        image = cv2.imread(input_path)
-        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        rgb_image = cv2.cvtColor(gray_image, cv2.COLOR_GRAY2BGR)
-
-        results = face_mesh.process(rgb_image)
-        intensidades = {}
-
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                intensidades = procesar_zonas_rostro(image, gray_image, face_landmarks, ZONAS_ROSTRO)
-        
-        cv2.imwrite(output_path, image)
-
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=16)
-        pdf.cell(200, 10, txt="Resultado de Segmentación de Rostro", ln=True, align='C')
-        pdf.ln(10)
-        pdf.image(output_path, x=10, y=30, w=180)
-        pdf.ln(120)
-
-        pdf.set_font("Arial", style='B', size=12)
-        pdf.cell(0, 10, "Análisis de Intensidad de Píxeles por Zona:", ln=True)
-        pdf.ln(2)
-
-        pdf.set_font("Arial", style='B', size=10)
-        pdf.cell(90, 8, "Zona del Rostro", 1, 0, 'C')
-        pdf.cell(90, 8, "Intensidad Promedio", 1, 1, 'C')
-
-        pdf.set_font("Arial", size=10)
-        for zona, promedio in intensidades.items():
-            pdf.cell(90, 8, zona, 1, 0, 'L')
-            pdf.cell(90, 8, f"{promedio:.2f}", 1, 1, 'C')
-
-        pdf.output(pdf_path)
-
-        if os.path.exists(input_path):
-            os.remove(input_path)
-
-        return FileResponse(
-            pdf_path, 
-            filename="resultado_rostro_segmentado.pdf", 
-            media_type="application/pdf",
-            background=cleanup_files(output_path, pdf_path)
-        )
+        datos, hash_imagen = await leer_imagen(file)
+        pdf_bytes, estado_cache = await resultado_con_cache("rostro", reporte_rostro, datos, hash_imagen)
+        return responder_pdf(pdf_bytes, "resultado_rostro_segmentado.pdf", estado_cache)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al procesar rostro: {str(e)}")
-        cleanup_temp_files(locals())
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.post("/procesar-imagen-manos/")
@@ -198,45 +284,14 @@ async def procesar_imagen_manos(file: UploadFile = File(...)):
     Endpoint para procesar solo manos
     """
     try:
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
-        
-        id_unico = str(uuid.uuid4())
-        input_path = f"{id_unico}_input.jpg"
-        output_path = f"{id_unico}_manos_segmentado.jpg"
-        pdf_path = f"{id_unico}_manos_segmentado.pdf"
-        
-        with open(input_path, "wb") as f:
-            f.write(await file.read())
-        
-        success = segmentar_manos(input_path, output_path)
-        if not success:
-            raise HTTPException(status_code=500, detail="Error al procesar las manos")
-        
-        if not os.path.exists(output_path):
-            raise HTTPException(status_code=500, detail="No se pudo generar la imagen segmentada")
-        
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=16)
-        pdf.cell(200, 10, txt="Resultado de Segmentación de Manos", ln=True, align='C')
-        pdf.ln(10)
-        pdf.image(output_path, x=10, y=30, w=180)
-        pdf.output(pdf_path)
-        
-        if os.path.exists(input_path):
-            os.remove(input_path)
-        
-        return FileResponse(
-            pdf_path, 
-            filename="resultado_manos_segmentado.pdf", 
-            media_type="application/pdf",
-            background=cleanup_files(output_path, pdf_path)
-        )
+        datos, hash_imagen = await leer_imagen(file)
+        pdf_bytes, estado_cache = await resultado_con_cache("manos", reporte_manos, datos, hash_imagen)
+        return responder_pdf(pdf_bytes, "resultado_manos_segmentado.pdf", estado_cache)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al procesar manos: {str(e)}")
-        cleanup_temp_files(locals())
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.post("/procesar-imagen-local/")
@@ -249,212 +304,346 @@ async def procesar_imagen_completa(file: UploadFile = File(...)):
     Endpoint para procesar rostro + manos en una sola imagen y generar reporte completo.
     """
     try:
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
-        
-        id_unico = str(uuid.uuid4())
-        input_path = f"{id_unico}_input.jpg"
-        rostro_output_path = f"{id_unico}_rostro_segmentado.jpg"
-        manos_output_path = f"{id_unico}_manos_segmentado.jpg"
-        manos_numeros_output_path = f"{id_unico}_manos_numerado.jpg"
-        pdf_path = f"{id_unico}_completo_reporte.pdf"
-        
-        with open(input_path, "wb") as f:
-            f.write(await file.read())
-        
-        rostro_success = segmentar_rostro(input_path, rostro_output_path)
-        manos_success = segmentar_manos(input_path, manos_output_path)
-        
-        if not rostro_success and not manos_success:
-            raise HTTPException(status_code=500, detail="No se pudo procesar ni rostro ni manos")
-
-        intensidades_rostro = {}
-        if rostro_success:
-            image_rostro = cv2.imread(input_path)
-            if image_rostro is not None:
-                gray_image_rostro = cv2.cvtColor(image_rostro, cv2.COLOR_BGR2GRAY)
-                rgb_image_rostro = cv2.cvtColor(gray_image_rostro, cv2.COLOR_GRAY2BGR)
-                
-                results = face_mesh.process(rgb_image_rostro)
-                if results.multi_face_landmarks:
-                    for face_landmarks in results.multi_face_landmarks:
-                        intensidades_rostro = procesar_zonas_rostro(image_rostro, gray_image_rostro, face_landmarks, ZONAS_ROSTRO)
-                cv2.imwrite(rostro_output_path, image_rostro)
-
-        intensidades_manos = {}
-        if manos_success:
-            intensidades_manos, _ = analizar_manos_por_zonas(manos_output_path, manos_numeros_output_path)
-
-        pdf = FPDF()
-        
-        # Página 1: Todas las imágenes en una sola página
-        pdf.add_page()
-        pdf.set_font("Arial", size=16)
-        pdf.cell(200, 10, txt="Reporte de Segmentación y Análisis", ln=True, align='C')
-        pdf.ln(5)
-        
-        # Configuración de posiciones y tamaños
-        image_width = 90  # Ancho de cada imagen
-        image_height = 60  # Alto de cada imagen
-        start_x = 10
-        current_y = 25
-        
-        # Contador de imágenes para organizar la disposición
-        images_added = 0
-        
-        # Rostro segmentado
-        if rostro_success and os.path.exists(rostro_output_path):
-            # Título para la imagen de rostro
-            pdf.set_font("Arial", style='B', size=10)
-            pdf.set_xy(start_x, current_y)
-            pdf.cell(image_width, 5, txt="Rostro Segmentado", ln=False, align='C')
-            
-            # Imagen de rostro
-            pdf.image(rostro_output_path, x=start_x, y=current_y + 5, w=image_width, h=image_height)
-            images_added += 1
-        
-        # Manos segmentadas (lado derecho si hay rostro, sino en la izquierda)
-        if manos_success and os.path.exists(manos_output_path):
-            x_pos = start_x + (image_width + 10) if images_added > 0 else start_x
-            y_pos = current_y if images_added > 0 else current_y
-            
-            # Si ya hay una imagen en la fila, poner al lado; si no, nueva fila
-            if images_added >= 2:
-                y_pos = current_y + image_height + 15
-                x_pos = start_x
-                images_added = 0
-            
-            # Título para la imagen de manos
-            pdf.set_font("Arial", style='B', size=10)
-            pdf.set_xy(x_pos, y_pos)
-            pdf.cell(image_width, 5, txt="Manos Segmentadas", ln=False, align='C')
-            
-            # Imagen de manos
-            pdf.image(manos_output_path, x=x_pos, y=y_pos + 5, w=image_width, h=image_height)
-            images_added += 1
-            
-            # Actualizar current_y para la siguiente imagen
-            if images_added == 1:
-                current_y = y_pos
-        
-        # Manos numeradas
-        if manos_success and os.path.exists(manos_numeros_output_path):
-            x_pos = start_x + (image_width + 10) if images_added == 1 else start_x
-            y_pos = current_y if images_added == 1 else current_y + image_height + 15
-            
-            # Título para la imagen de manos numeradas
-            pdf.set_font("Arial", style='B', size=10)
-            pdf.set_xy(x_pos, y_pos)
-            pdf.cell(image_width, 5, txt="Manos Numeradas", ln=False, align='C')
-            
-            # Imagen de manos numeradas
-            pdf.image(manos_numeros_output_path, x=x_pos, y=y_pos + 5, w=image_width, h=image_height)
-
-        # Página 2: Resumen de procesamiento
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 10, txt=f"Rostro procesado: {'Sí' if rostro_success else 'No'}", ln=True, align='L')
-        pdf.cell(200, 10, txt=f"Manos procesadas: {'Sí' if manos_success else 'No'}", ln=True, align='L')
-        pdf.ln(10)
-
-        # Página 3: Tablas de análisis
-        if intensidades_rostro or intensidades_manos:
-            pdf.add_page()
-            pdf.set_font("Arial", size=16)
-            pdf.cell(200, 10, txt="Análisis de Intensidad de Píxeles", ln=True, align='C')
-            pdf.ln(10)
-
-            if intensidades_rostro:
-                pdf.set_font("Arial", style='B', size=12)
-                pdf.cell(0, 10, "Rostro:", ln=True)
-                pdf.ln(2)
-                pdf.set_font("Arial", style='B', size=10)
-                pdf.cell(90, 8, "Zona del Rostro", 1, 0, 'C')
-                pdf.cell(90, 8, "Intensidad Promedio", 1, 1, 'C')
-                pdf.set_font("Arial", size=10)
-                for zona, promedio in intensidades_rostro.items():
-                    pdf.cell(90, 8, zona, 1, 0, 'L')
-                    pdf.cell(90, 8, f"{promedio:.2f}", 1, 1, 'C')
-                pdf.ln(10)
-
-            if intensidades_manos:
-                pdf.set_font("Arial", style='B', size=12)
-                pdf.cell(0, 10, "Manos:", ln=True)
-                pdf.ln(2)
-                pdf.set_font("Arial", style='B', size=10)
-                pdf.cell(90, 8, "Zona de la Mano", 1, 0, 'C')
-                pdf.cell(90, 8, "Intensidad Promedio", 1, 1, 'C')
-                pdf.set_font("Arial", size=10)
-                
-                # Dividir la tabla de manos en dos columnas si es muy larga
-                items = list(intensidades_manos.items())
-                mid_point = len(items) // 2 + len(items) % 2
-                col1 = items[:mid_point]
-                col2 = items[mid_point:]
-                
-                max_len = max(len(col1), len(col2))
-                
-                for i in range(max_len):
-                    if i < len(col1):
-                        zona1, prom1 = col1[i]
-                        pdf.cell(45, 8, zona1, 1, 0, 'L')
-                        pdf.cell(45, 8, str(prom1), 1, 0, 'C')
-                    else:
-                        pdf.cell(90, 8, "", 1, 0) # Celda vacía
-
-                    if i < len(col2):
-                        zona2, prom2 = col2[i]
-                        pdf.cell(45, 8, zona2, 1, 0, 'L')
-                        pdf.cell(45, 8, str(prom2), 1, 1, 'C')
-                    else:
-                        pdf.cell(90, 8, "", 1, 1) # Celda vacía
-
-        pdf.output(pdf_path)
-        
-        cleanup_temp_files({
-            'input_path': input_path,
-            'rostro_output_path': rostro_output_path,
-            'manos_output_path': manos_output_path,
-            'manos_numeros_output_path': manos_numeros_output_path
-        })
-        
-        return FileResponse(
-            pdf_path, 
-            filename="resultado_completo_reporte.pdf", 
-            media_type="application/pdf",
-            background=cleanup_files(pdf_path)
-        )
+        datos, hash_imagen = await leer_imagen(file)
+        pdf_bytes, estado_cache = await resultado_con_cache("completo", reporte_completo, datos, hash_imagen)
+        return responder_pdf(pdf_bytes, "resultado_completo_reporte.pdf", estado_cache)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al procesar imagen completa: {str(e)}")
-        cleanup_temp_files(locals())
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
-# ================== UTILIDADES ==================
-async def cleanup_files(*file_paths):
-    import asyncio
-    await asyncio.sleep(5) # Aumentar tiempo de espera
-    for file_path in file_paths:
+# ================== ENDPOINTS JSON ==================
+# Solo las mediciones (intensidades por zona y landmarks), sin imágenes ni PDF
+
+def responder_json(json_bytes, estado_cache):
+    return Response(content=json_bytes, media_type="application/json", headers={"X-Cache": estado_cache})
+
+@app.post("/analizar-rostro")
+async def analizar_rostro_json(file: UploadFile = File(...)):
+    """
+    Estadísticas por zona facial (ZONAS_ROSTRO) y landmarks del rostro en JSON
+    """
+    try:
+        datos, hash_imagen = await leer_imagen(file)
+        json_bytes, estado_cache = await resultado_con_cache("json-rostro", mediciones_rostro, datos, hash_imagen)
+        return responder_json(json_bytes, estado_cache)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al analizar rostro: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@app.post("/analizar-manos")
+async def analizar_manos_json(file: UploadFile = File(...)):
+    """
+    Estadísticas de cada "Zona Mano N" y landmarks de las manos en JSON
+    """
+    try:
+        datos, hash_imagen = await leer_imagen(file)
+        json_bytes, estado_cache = await resultado_con_cache("json-manos", mediciones_manos, datos, hash_imagen)
+        return responder_json(json_bytes, estado_cache)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al analizar manos: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@app.post("/analizar-completo")
+async def analizar_completo_json(file: UploadFile = File(...)):
+    """
+    Mediciones de rostro y manos de la misma imagen en JSON
+    """
+    try:
+        datos, hash_imagen = await leer_imagen(file)
+        json_bytes, estado_cache = await resultado_con_cache("json-completo", mediciones_completas, datos, hash_imagen)
+        return responder_json(json_bytes, estado_cache)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al analizar imagen completa: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+# ================== LOTES ==================
+
+async def leer_lote(files):
+    """Bytes de todas las imágenes subidas; un archivo zip se expande a sus imágenes"""
+    imagenes = []
+    for file in files:
+        if es_zip(file.filename, file.content_type):
+            datos, _ = await leer_archivo(file, config.MAX_LOTE_MB * MB)
+            # Descomprimir hasta MAX_LOTE_MB es trabajo de CPU: fuera del event loop
+            imagenes.extend(await en_ejecutor(extraer_zip, datos))
+        elif file.content_type.startswith("image/"):
+            datos, _ = await leer_archivo(file)
+            imagenes.append((file.filename, datos))
+        else:
+            raise HTTPException(status_code=400, detail=f"{file.filename}: el archivo debe ser una imagen o un zip")
+        if len(imagenes) > config.LOTE_MAX_IMAGENES:
+            raise LoteInvalido(f"El lote supera el máximo de {config.LOTE_MAX_IMAGENES} imágenes")
+    return imagenes
+
+@app.post("/procesar-lote/")
+async def procesar_lote_endpoint(files: List[UploadFile] = File(...), formato: str = Query("json")):
+    """
+    Procesa muchas imágenes (varios archivos multipart o un zip) en una sola petición.
+    formato=json devuelve los resultados por imagen; formato=pdf, un reporte combinado.
+    """
+    try:
+        imagenes = await leer_lote(files)
+        try:
+            ejecutor.comprobar_lugar()
+        except ColaLlena as e:
+            raise _servidor_ocupado(e)
+        # Las imágenes pasan una a una por el ejecutor (cada una ocupa su
+        # lugar); el lote solo las coordina y arma el PDF desde otro hilo
+        resultado = await asyncio.to_thread(procesar_lote, imagenes, formato)
+        if formato == "pdf":
+            return responder_pdf(resultado, "resultado_lote_reporte.pdf")
+        return resultado
+
+    except LoteInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al procesar lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+# ================== VIDEO ==================
+
+def _borrar(*rutas):
+    for ruta in rutas:
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Archivo temporal eliminado: {file_path}")
-        except Exception as e:
-            logger.warning(f"No se pudo eliminar el archivo {file_path}: {str(e)}")
-
-def cleanup_temp_files(local_vars):
-    temp_files = ['input_path', 'output_path', 'rostro_output_path', 'manos_output_path', 'manos_numeros_output_path', 'pdf_path']
-    for var_name in temp_files:
-        if var_name in local_vars:
-            file_path = local_vars.get(var_name)
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.info(f"Archivo temporal eliminado por error: {file_path}")
-                except Exception as e:
-                    logger.warning(f"No se pudo eliminar el archivo {file_path}: {str(e)}")
+            os.remove(ruta)
+        except OSError:
+            pass
+
+@app.post("/procesar-video/")
+async def procesar_video_endpoint(file: UploadFile = File(...), formato: str = Query("csv"),
+                                  paso: int = Query(None, ge=1)):
+    """
+    Analiza un video (MP4 u otro formato que lea OpenCV) con FaceMesh y Hands
+    en modo seguimiento, uno de cada `paso` cuadros (por defecto VIDEO_PASO).
+    formato=csv o json devuelve la serie temporal de intensidades por zona;
+    formato=pdf, un reporte con el resumen por zona.
+    """
+    if formato not in FORMATOS_VIDEO + ("pdf",):
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    if not es_video(file.filename, file.content_type):
+        raise HTTPException(status_code=400, detail="El archivo debe ser un video")
+
+    # OpenCV lee el video desde disco; se copia por fragmentos a un temporal
+    extension = os.path.splitext(file.filename or "")[1] or ".mp4"
+    descriptor, ruta_video = tempfile.mkstemp(suffix=extension)
+    temporales = [ruta_video]
+    try:
+        with os.fdopen(descriptor, "wb") as destino:
+            await guardar_subida(file, destino, config.MAX_VIDEO_MB * MB)
+
+        if formato == "pdf":
+            pdf_bytes = await en_ejecutor(resumen_video, ruta_video, file.filename or "video", paso)
+            return responder_pdf(pdf_bytes, "resultado_video_resumen.pdf")
+
+        descriptor, ruta_salida = tempfile.mkstemp(suffix=f".{formato}")
+        os.close(descriptor)
+        temporales.append(ruta_salida)
+        informacion = await en_ejecutor(serie_video, ruta_video, ruta_salida, formato, paso)
+        # La serie se envía desde disco; los temporales se borran al terminar la respuesta
+        respuesta = FileResponse(
+            ruta_salida,
+            media_type="text/csv" if formato == "csv" else "application/json",
+            filename=f"resultado_video_serie.{formato}",
+            headers={"X-Cuadros-Analizados": str(informacion["cuadros_analizados"])},
+            background=BackgroundTask(_borrar, *temporales),
+        )
+        temporales = []
+        return respuesta
+
+    except SubidaDemasiadoGrande as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except VideoInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al procesar video: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+    finally:
+        _borrar(*temporales)
+
+# ================== TRABAJOS ==================
+
+@app.post("/trabajos/", status_code=202)
+async def crear_trabajo(file: UploadFile = File(...), formato: str = Query("pdf")):
+    """
+    Encola el reporte completo (formato=pdf) o las mediciones (formato=json)
+    de una imagen y devuelve el id del trabajo sin esperar al procesamiento.
+    """
+    if formato not in FORMATOS_TRABAJO:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    datos, hash_imagen = await leer_imagen(file)
+    # Rechaza lo que claramente no es una imagen antes de encolarlo; una imagen
+    # dañada con cabecera válida termina en un trabajo con error_cliente
+    if not parece_imagen(datos):
+        raise HTTPException(status_code=400, detail="No se pudo decodificar la imagen")
+
+    # Si el resultado ya está en cache el trabajo nace completado
+    resultado = cache_reportes.obtener(clave_resultado(hash_imagen, ENDPOINT_TRABAJO[formato]))
+    id_trabajo = almacen_trabajos.crear(datos, formato, hash_imagen, resultado)
+    gestor_trabajos.avisar()
+
+    return {
+        "id": id_trabajo,
+        "estado": COMPLETADO if resultado is not None else PENDIENTE,
+        "estado_url": f"/trabajos/{id_trabajo}",
+        "resultado_url": f"/trabajos/{id_trabajo}/resultado",
+    }
+
+@app.get("/trabajos/{id_trabajo}")
+async def estado_trabajo(id_trabajo: str):
+    """Estado y etapa actual del trabajo"""
+    estado = almacen_trabajos.estado(id_trabajo)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return estado
+
+@app.get("/trabajos/{id_trabajo}/resultado")
+async def resultado_trabajo(id_trabajo: str):
+    """PDF o JSON del trabajo; 409 mientras no haya terminado y 422 si la imagen no se pudo procesar"""
+    estado = almacen_trabajos.estado(id_trabajo)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    if estado["estado"] == ERROR and estado["error_cliente"]:
+        raise HTTPException(status_code=422, detail=f"El trabajo terminó con error: {estado['error']}")
+    if estado["estado"] == ERROR:
+        raise HTTPException(status_code=500, detail=f"El trabajo terminó con error: {estado['error']}")
+    if estado["estado"] != COMPLETADO:
+        raise HTTPException(status_code=409, detail=f"El trabajo todavía está {estado['estado']} ({estado['etapa']})")
+
+    resultado = almacen_trabajos.resultado(id_trabajo)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    if estado["formato"] == "pdf":
+        return responder_pdf(resultado, "resultado_completo_reporte.pdf")
+    return Response(content=resultado, media_type="application/json")
+
+# ================== SEGUIMIENTO EN TIEMPO REAL ==================
+
+async def recibir_cuadros(websocket, buzon):
+    """Deja cada cuadro recibido en el buzón hasta que el cliente se desconecta"""
+    try:
+        while True:
+            mensaje = await websocket.receive()
+            if mensaje["type"] == "websocket.disconnect":
+                return
+            datos = mensaje.get("bytes")
+            if datos is None:
+                continue
+            if len(datos) > config.MAX_SUBIDA_MB * MB:
+                await websocket.close(code=1009, reason="Cuadro demasiado grande")
+                return
+            buzon.poner(datos)
+    finally:
+        buzon.cerrar()
+
+@app.websocket("/ws/seguimiento")
+async def seguimiento_ws(websocket: WebSocket, landmarks: bool = True):
+    """
+    Recibe cuadros JPEG como mensajes binarios y responde a cada cuadro
+    procesado con un JSON compacto: "cuadro", "descartados", "ms", "rostro"
+    (promedio por zona de ZONAS_ROSTRO y landmarks) y "manos" (promedio por
+    "Zona Mano N" y landmarks). FaceMesh y Hands corren en modo seguimiento
+    con instancias propias de la conexión. Si el cliente envía más rápido de
+    lo que se procesa, solo se analiza el cuadro más reciente.
+    """
+    if not sesiones_seguimiento.adquirir():
+        # 1013: "Try Again Later"
+        await websocket.close(code=1013, reason="Demasiadas sesiones de seguimiento")
+        return
+
+    sesion = SesionSeguimiento(landmarks=landmarks)
+    buzon = UltimoCuadro()
+    receptor = None
+    try:
+        await websocket.accept()
+        receptor = asyncio.create_task(recibir_cuadros(websocket, buzon))
+        while (cuadro := await buzon.tomar()) is not None:
+            numero, datos = cuadro
+            try:
+                resultado = await ejecutor.ejecutar(sesion.procesar_cuadro, datos, numero, buzon.descartados)
+            except ColaLlena:
+                buzon.descartar()
+                continue
+            except ImagenInvalida as e:
+                await websocket.send_json({"cuadro": numero, "error": str(e)})
+                continue
+            await websocket.send_bytes(resultado)
+    except Exception as e:
+        logger.info(f"Sesión de seguimiento terminada: {str(e)}")
+    finally:
+        if receptor is not None:
+            receptor.cancel()
+        try:
+            # cerrar() espera al cuadro que pueda seguir en el ejecutor
+            await asyncio.to_thread(sesion.cerrar)
+        finally:
+            sesiones_seguimiento.liberar()
+
+# ================== UTILIDADES ==================
+def guardar_resultados(id_unico, imagenes, nombre_pdf, pdf_bytes):
+    """Guarda imágenes y PDF en config.DIRECTORIO_RESULTADOS (solo si está configurado)"""
+    if not config.DIRECTORIO_RESULTADOS:
+        return
+    os.makedirs(config.DIRECTORIO_RESULTADOS, exist_ok=True)
+    for nombre, imagen in imagenes.items():
+        if imagen is not None:
+            cv2.imwrite(os.path.join(config.DIRECTORIO_RESULTADOS, f"{id_unico}_{nombre}.jpg"), imagen)
+    with open(os.path.join(config.DIRECTORIO_RESULTADOS, f"{id_unico}_{nombre_pdf}"), "wb") as f:
+        f.write(pdf_bytes)
+
+# ================== PERFILES ==================
+# Solo con el perfilado activado, como el middleware
+if PERFILADO:
+    @app.get("/debug/perfiles")
+    async def listar_perfiles():
+        """Perfiles guardados, del más reciente al más antiguo"""
+        return {"perfiles": await asyncio.to_thread(perfiles.listar)}
+
+    @app.get("/debug/perfiles/{id_perfil}")
+    async def descargar_perfil(id_perfil: str, formato: str = Query("pstats")):
+        """
+        Descarga un perfil: formato=pstats (pstats.Stats / snakeviz), collapsed
+        (flamegraph.pl, speedscope) o json (metadatos)
+        """
+        ruta = perfiles.ruta_perfil(id_perfil, formato)
+        if ruta is None:
+            raise HTTPException(status_code=404, detail="Perfil no encontrado")
+        return FileResponse(ruta, filename=os.path.basename(ruta))
 
 # ================== INFO ==================
+@app.get("/metrics")
+async def metrics():
+    """Métricas en formato Prometheus (sumadas entre workers si PROMETHEUS_MULTIPROC_DIR está definido)"""
+    contenido, content_type = metricas.exponer()
+    return Response(content=contenido, media_type=content_type)
+
+@app.get("/ready")
+async def ready():
+    """
+    200 si el worker que responde tiene los modelos inicializados (o el
+    calentamiento está desactivado) y 503 si el calentamiento falló; incluye
+    la duración de cada paso. El calentamiento corre en el lifespan, antes de
+    que el worker acepte conexiones, así que nunca se responde "calentando".
+    """
+    estado = estado_calentamiento.estadisticas()
+    return Response(content=json.dumps(estado, ensure_ascii=False), media_type="application/json",
+                    status_code=200 if estado["listo"] else 503)
+
 @app.get("/health")
 async def health_check():
     return {
@@ -463,8 +652,26 @@ async def health_check():
         "endpoints": {
             "rostro": "/procesar-imagen-rostro/",
             "manos": "/procesar-imagen-manos/",
-            "completo": "/procesar-imagen-completa/"
-        }
+            "completo": "/procesar-imagen-completa/",
+            "analizar_rostro": "/analizar-rostro",
+            "analizar_manos": "/analizar-manos",
+            "analizar_completo": "/analizar-completo",
+            "lote": "/procesar-lote/",
+            "trabajos": "/trabajos/",
+            "seguimiento": "/ws/seguimiento",
+            "video": "/procesar-video/",
+            "metricas": "/metrics",
+            **({"perfiles": "/debug/perfiles"} if PERFILADO else {}),
+            "listo": "/ready"
+        },
+        "pool_manos": pool_manos.estadisticas(),
+        "face_mesh": registro_face_mesh.estadisticas(),
+        "cache_reportes": cache_reportes.estadisticas(),
+        "cache_etapas": cache_etapas.estadisticas(),
+        "trabajos": almacen_trabajos.estadisticas(),
+        "seguimiento": sesiones_seguimiento.estadisticas(),
+        "calentamiento": estado_calentamiento.estadisticas(),
+        "ejecutor": ejecutor.estadisticas()
     }
 
 @app.get("/info")
@@ -476,7 +683,22 @@ async def info():
         "available_endpoints": [
             {"endpoint": "/procesar-imagen-rostro/", "method": "POST", "description": "Segmenta rostro y calcula intensidades"},
             {"endpoint": "/procesar-imagen-manos/", "method": "POST", "description": "Segmenta manos"},
-            {"endpoint": "/procesar-imagen-completa/", "method": "POST", "description": "Segmenta rostro y manos en la misma imagen con análisis de intensidad y numeración de zonas"}
+            {"endpoint": "/procesar-imagen-completa/", "method": "POST", "description": "Segmenta rostro y manos en la misma imagen con análisis de intensidad y numeración de zonas"},
+            {"endpoint": "/analizar-rostro", "method": "POST", "description": "Intensidades por zona facial y landmarks en JSON (sin imágenes ni PDF)"},
+            {"endpoint": "/analizar-manos", "method": "POST", "description": "Intensidades por zona de la mano y landmarks en JSON (sin imágenes ni PDF)"},
+            {"endpoint": "/analizar-completo", "method": "POST", "description": "Mediciones de rostro y manos en JSON (sin imágenes ni PDF)"},
+            {"endpoint": "/procesar-lote/", "method": "POST", "description": "Procesa varias imágenes o un zip; resultados por imagen en JSON (formato=json) o un PDF combinado (formato=pdf)"},
+            {"endpoint": "/trabajos/", "method": "POST", "description": "Encola el reporte completo (formato=pdf) o las mediciones (formato=json) y devuelve el id del trabajo"},
+            {"endpoint": "/trabajos/{id}", "method": "GET", "description": "Estado y etapa del trabajo"},
+            {"endpoint": "/trabajos/{id}/resultado", "method": "GET", "description": "PDF o JSON del trabajo terminado"},
+            {"endpoint": "/procesar-video/", "method": "POST", "description": "Serie temporal de intensidades por zona de un video (formato=csv o json) o PDF con el resumen (formato=pdf)"},
+            {"endpoint": "/ready", "method": "GET", "description": "Estado del calentamiento de los modelos del worker (503 si falló) y duración de cada paso"},
+            {"endpoint": "/metrics", "method": "GET", "description": "Métricas en formato Prometheus: latencia por etapa, peticiones, bytes, caches y ejecutor"},
+            *([
+                {"endpoint": "/debug/perfiles", "method": "GET", "description": "Perfiles de las peticiones perfiladas (PERFILADO_MUESTREO o cabecera X-Perfilar)"},
+                {"endpoint": "/debug/perfiles/{id}", "method": "GET", "description": "Descarga un perfil en formato pstats, collapsed o json"},
+            ] if PERFILADO else []),
+            {"endpoint": "/ws/seguimiento", "method": "WEBSOCKET", "description": "Cuadros JPEG en tiempo real; intensidades por zona y landmarks de cada cuadro en JSON"}
         ]
     }
 
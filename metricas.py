@@ -0,0 +1,107 @@
+#Métricas en formato Prometheus: latencia por etapa, peticiones, bytes, caches y ejecutor
+#
+# Con gunicorn cada worker es un proceso: si PROMETHEUS_MULTIPROC_DIR está
+# definido, prometheus_client escribe los valores de cada worker en ese
+# directorio y /metrics los suma con MultiProcessCollector, así que cualquier
+# worker que atienda la consulta devuelve el total del servidor (ver
+# gunicorn.conf.py, que limpia el directorio al arrancar y marca los workers
+# que terminan).
+import os
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Segundos: de 1 ms a 30 s (una imagen de 24 MP con PDF ronda el segundo)
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DURACION_ETAPA = Histogram(
+    "segmentacion_etapa_segundos", "Duración de cada etapa del pipeline",
+    ["etapa"], buckets=BUCKETS_LATENCIA)
+DURACION_PETICION = Histogram(
+    "segmentacion_peticion_segundos", "Duración de las peticiones HTTP por endpoint",
+    ["endpoint"], buckets=BUCKETS_LATENCIA)
+PETICIONES = Counter(
+    "segmentacion_peticiones_total", "Peticiones HTTP por endpoint y código de estado",
+    ["endpoint", "estado"])
+BYTES_RECIBIDOS = Counter(
+    "segmentacion_bytes_recibidos_total", "Bytes del cuerpo de las peticiones", ["endpoint"])
+BYTES_ENVIADOS = Counter(
+    "segmentacion_bytes_enviados_total", "Bytes del cuerpo de las respuestas", ["endpoint"])
+CONSULTAS_CACHE = Counter(
+    "segmentacion_cache_consultas_total",
+    "Consultas a las caches por resultado (tasa de aciertos = hit / (hit + miss))",
+    ["cache", "resultado"])
+EJECUTOR_EN_COLA = Gauge(
+    "segmentacion_ejecutor_en_cola", "Tareas esperando un hilo del ejecutor", multiprocess_mode="livesum")
+EJECUTOR_EN_EJECUCION = Gauge(
+    "segmentacion_ejecutor_en_ejecucion", "Tareas en ejecución en el ejecutor", multiprocess_mode="livesum")
+EJECUTOR_RECHAZADAS = Counter(
+    "segmentacion_ejecutor_rechazadas_total", "Tareas rechazadas con 429 por cola llena")
+
+
+def cronometrar(etapa):
+    """
+    Registra la duración de una etapa en segmentacion_etapa_segundos.
+    Sirve como decorador de funciones síncronas o como `with cronometrar(...)`.
+    """
+    return DURACION_ETAPA.labels(etapa).time()
+
+
+def exponer():
+    """
+    Cuerpo y content type de /metrics. En modo multiproceso se agregan los
+    valores de todos los workers; si no, los del proceso actual.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def _endpoint(scope):
+    # Plantilla de la ruta (p. ej. /trabajos/{id_trabajo}) para no crear una serie por id
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
+
+
+class MetricasHTTP:
+    """Middleware ASGI que cuenta peticiones, códigos de estado, bytes y duración por endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = 500
+        recibidos = enviados = 0
+
+        async def recibir():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+            return mensaje
+
+        async def enviar(mensaje):
+            nonlocal estado, enviados
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                enviados += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            endpoint = _endpoint(scope)
+            PETICIONES.labels(endpoint, str(estado)).inc()
+            DURACION_PETICION.labels(endpoint).observe(time.perf_counter() - inicio)
+            BYTES_RECIBIDOS.labels(endpoint).inc(recibidos)
+            BYTES_ENVIADOS.labels(endpoint).inc(enviados)
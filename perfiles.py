@@ -0,0 +1,243 @@
+#Perfilado opcional por petición: cProfile y pilas muestreadas de las etapas de CPU
+#
+# Una petición se perfila si trae la cabecera "X-Perfilar: 1" (con
+# PERFILADO_CABECERA=1) o si sale sorteada con PERFILADO_MUESTREO. Su trabajo
+# de CPU corre en los hilos del ejecutor (y del análisis de manos o del lote),
+# así que el perfil viaja en una ContextVar hasta cada tarea enviada con
+# enviar(), y cada hilo perfila su propio tramo. Con el perfilado desactivado
+# el middleware no se registra y enviar() solo consulta la ContextVar.
+#
+# Por petición se guardan en PERFILADO_DIRECTORIO:
+#   <id>.pstats     estadísticas de cProfile de todos los tramos (pstats.Stats)
+#   <id>.collapsed  pilas muestreadas en formato "colapsado" (flamegraph.pl, speedscope)
+#   <id>.json       endpoint, estado, duración y número de muestras
+import asyncio
+import cProfile
+import contextvars
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+import config
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_PERFIL = {"pstats": ".pstats", "collapsed": ".collapsed", "json": ".json"}
+_ID_VALIDO = re.compile(r"^[0-9a-f]{32}$")
+
+_perfil_actual = contextvars.ContextVar("perfil_actual", default=None)
+
+
+class Perfil:
+    """Perfil de una petición: un cProfile por tramo de hilo y un muestreador de pilas"""
+
+    def __init__(self, id_perfil, intervalo=0.005):
+        self.id = id_perfil
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._hilos = set()
+        self._perfiladores = []
+        self._pilas = Counter()
+        self._muestras = 0
+        self._detener = threading.Event()
+        self._muestreador = None
+
+    @contextmanager
+    def segmento(self):
+        """Perfila el hilo actual mientras dura el bloque (los tramos anidados no se duplican)"""
+        hilo = threading.get_ident()
+        with self._lock:
+            anidado = hilo in self._hilos
+            self._hilos.add(hilo)
+        if anidado:
+            yield
+            return
+
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            # Desde Python 3.12 solo puede haber un cProfile activo a la vez;
+            # este tramo queda cubierto solo por las pilas muestreadas
+            perfilador = None
+        try:
+            yield
+        finally:
+            if perfilador is not None:
+                perfilador.disable()
+            with self._lock:
+                self._hilos.discard(hilo)
+                if perfilador is not None:
+                    self._perfiladores.append(perfilador)
+
+    def iniciar(self):
+        self._muestreador = threading.Thread(target=self._muestrear, name=f"perfil-{self.id[:8]}", daemon=True)
+        self._muestreador.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._muestreador is not None:
+            self._muestreador.join()
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            with self._lock:
+                hilos = list(self._hilos)
+            if not hilos:
+                continue
+            cuadros = sys._current_frames()
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for hilo in hilos:
+                cuadro = cuadros.get(hilo)
+                if cuadro is None:
+                    continue
+                # La pila empieza en la tarea enviada, sin los marcos del pool de hilos
+                pila = []
+                while cuadro is not None and cuadro.f_code is not _ejecutar_en_segmento.__code__:
+                    codigo = cuadro.f_code
+                    pila.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    cuadro = cuadro.f_back
+                pila.append(nombres.get(hilo, str(hilo)))
+                self._pilas[";".join(reversed(pila))] += 1
+                self._muestras += 1
+
+    def guardar(self, directorio, metadatos):
+        """Escribe los tres archivos del perfil en `directorio`"""
+        os.makedirs(directorio, exist_ok=True)
+        base = os.path.join(directorio, self.id)
+        with self._lock:
+            perfiladores = list(self._perfiladores)
+        if perfiladores:
+            pstats.Stats(*perfiladores).dump_stats(base + ".pstats")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for pila, cantidad in self._pilas.most_common():
+                f.write(f"{pila} {cantidad}\n")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(dict(metadatos, id=self.id, muestras=self._muestras, tramos=len(perfiladores)),
+                      f, ensure_ascii=False)
+
+
+def _ejecutar_en_segmento(perfil, funcion, args, kwargs):
+    with perfil.segmento():
+        return funcion(*args, **kwargs)
+
+
+def enviar(executor, funcion, *args, **kwargs):
+    """
+    executor.submit(funcion, *args, **kwargs); si la petición actual se está
+    perfilando, la tarea se perfila en su hilo y hereda el perfil para las
+    tareas que a su vez envíe.
+    """
+    perfil = _perfil_actual.get()
+    if perfil is None:
+        return executor.submit(funcion, *args, **kwargs)
+    return executor.submit(contextvars.copy_context().run, _ejecutar_en_segmento, perfil, funcion, args, kwargs)
+
+
+def _recortar(directorio, maximo):
+    """Borra los perfiles más antiguos para conservar como máximo `maximo`"""
+    metadatos = sorted((os.path.join(directorio, nombre) for nombre in os.listdir(directorio)
+                        if nombre.endswith(".json")), key=os.path.getmtime, reverse=True)
+    for ruta in metadatos[maximo:]:
+        base = ruta[:-len(".json")]
+        for extension in FORMATOS_PERFIL.values():
+            try:
+                os.remove(base + extension)
+            except OSError:
+                pass
+
+
+def listar(directorio=None):
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo"""
+    directorio = directorio or config.PERFILADO_DIRECTORIO
+    if not os.path.isdir(directorio):
+        return []
+    perfiles = []
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directorio, nombre), encoding="utf-8") as f:
+                perfiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(perfiles, key=lambda perfil: perfil.get("inicio", 0), reverse=True)
+
+
+def ruta_perfil(id_perfil, formato, directorio=None):
+    """Ruta del archivo de un perfil, o None si el id o el formato no son válidos o no existe"""
+    if formato not in FORMATOS_PERFIL or not _ID_VALIDO.match(id_perfil):
+        return None
+    ruta = os.path.join(directorio or config.PERFILADO_DIRECTORIO, id_perfil + FORMATOS_PERFIL[formato])
+    return ruta if os.path.isfile(ruta) else None
+
+
+class PerfiladoPeticiones:
+    """
+    Middleware ASGI que perfila las peticiones elegidas y devuelve el id del
+    perfil en la cabecera X-Perfil-Id. Solo se registra si el perfilado está
+    activado en la configuración.
+    """
+
+    def __init__(self, app, muestreo=0.0, cabecera=False, directorio=None, maximo=50, intervalo_ms=5):
+        self.app = app
+        self.muestreo = muestreo
+        self.cabecera = cabecera
+        self.directorio = directorio or config.PERFILADO_DIRECTORIO
+        self.maximo = maximo
+        self.intervalo = intervalo_ms / 1000
+
+    def _perfilar(self, scope):
+        if scope["path"].startswith(("/debug/", "/metrics")):
+            return False
+        if self.cabecera and dict(scope["headers"]).get(b"x-perfilar", b"").lower() in (b"1", b"true"):
+            return True
+        return self.muestreo > 0 and random.random() < self.muestreo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._perfilar(scope):
+            await self.app(scope, receive, send)
+            return
+
+        perfil = Perfil(uuid.uuid4().hex, self.intervalo)
+        estado = 500
+
+        async def enviar_respuesta(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                mensaje = dict(mensaje, headers=list(mensaje.get("headers", [])) + [(b"x-perfil-id", perfil.id.encode())])
+            await send(mensaje)
+
+        inicio = time.time()
+        token = _perfil_actual.set(perfil)
+        perfil.iniciar()
+        try:
+            await self.app(scope, receive, enviar_respuesta)
+        finally:
+            _perfil_actual.reset(token)
+            perfil.detener()
+            metadatos = {
+                "metodo": scope["method"],
+                "ruta": scope["path"],
+                "estado": estado,
+                "inicio": inicio,
+                "duracion_ms": round(1000 * (time.time() - inicio), 3),
+            }
+            try:
+                await asyncio.to_thread(self._guardar, perfil, metadatos)
+            except OSError as e:
+                logger.error(f"No se pudo guardar el perfil {perfil.id}: {str(e)}")
+
+    def _guardar(self, perfil, metadatos):
+        perfil.guardar(self.directorio, metadatos)
+        _recortar(self.directorio, self.maximo)
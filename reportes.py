@@ -0,0 +1,283 @@
+#Generación de los reportes PDF en memoria a partir de las imágenes y resultados
+from io import BytesIO
+
+import cv2
+from fpdf import FPDF
+
+from metricas import cronometrar
+
+
+def codificar_jpeg(imagen):
+    """Codifica una imagen BGR como JPEG (bytes) para embeberla en un reporte"""
+    ok, buffer = cv2.imencode(".jpg", imagen)
+    if not ok:
+        raise ValueError("No se pudo codificar la imagen para el reporte")
+    return buffer.tobytes()
+
+
+def _imagen_para_pdf(imagen):
+    """Buffer JPEG que FPDF embebe directamente; acepta una imagen BGR o bytes ya codificados"""
+    if isinstance(imagen, (bytes, bytearray)):
+        return BytesIO(imagen)
+    return BytesIO(codificar_jpeg(imagen))
+
+
+def _pdf_bytes(pdf):
+    return bytes(pdf.output())
+
+
+@cronometrar("render_pdf")
+def generar_pdf_rostro(imagen_rostro, intensidades):
+    """Reporte de una página con el rostro segmentado y la tabla de intensidades"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=16)
+    pdf.cell(200, 10, text="Resultado de Segmentación de Rostro", new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(10)
+    pdf.image(_imagen_para_pdf(imagen_rostro), x=10, y=30, w=180)
+    pdf.ln(120)
+
+    pdf.set_font("Arial", style='B', size=12)
+    pdf.cell(0, 10, "Análisis de Intensidad de Píxeles por Zona:", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(2)
+
+    pdf.set_font("Arial", style='B', size=10)
+    pdf.cell(90, 8, "Zona del Rostro", border=1, align='C')
+    pdf.cell(90, 8, "Intensidad Promedio", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+
+    pdf.set_font("Arial", size=10)
+    for zona, promedio in intensidades.items():
+        pdf.cell(90, 8, zona, border=1, align='L')
+        pdf.cell(90, 8, f"{promedio:.2f}", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+
+    return _pdf_bytes(pdf)
+
+
+@cronometrar("render_pdf")
+def generar_pdf_manos(imagen_manos):
+    """Reporte de una página con las manos segmentadas"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=16)
+    pdf.cell(200, 10, text="Resultado de Segmentación de Manos", new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(10)
+    pdf.image(_imagen_para_pdf(imagen_manos), x=10, y=30, w=180)
+    return _pdf_bytes(pdf)
+
+
+@cronometrar("render_pdf")
+def generar_pdf_completo(rostro, manos):
+    """
+    Reporte completo: imágenes, resumen de procesamiento y tablas de intensidad.
+
+    Args:
+        rostro (dict | None): Resultado de analisis.analizar_rostro
+        manos (dict | None): Resultado de analisis.analizar_manos
+    """
+    pdf = FPDF()
+    _agregar_reporte_completo(pdf, rostro, manos)
+    return _pdf_bytes(pdf)
+
+
+@cronometrar("render_pdf")
+def generar_pdf_lote(resultados):
+    """
+    Un solo PDF con el reporte completo de cada imagen de un lote, en orden.
+
+    Args:
+        resultados (iterable): dicts con "nombre" y, o bien "rostro" y "manos"
+            (como en generar_pdf_completo; las imágenes pueden venir ya
+            codificadas con codificar_jpeg), o bien "error"
+    """
+    pdf = FPDF()
+    for resultado in resultados:
+        # Las fuentes estándar de FPDF solo admiten latin-1
+        nombre = resultado["nombre"].encode("latin-1", "replace").decode("latin-1")
+        if "error" in resultado:
+            pdf.add_page()
+            pdf.set_font("Arial", size=12)
+            pdf.cell(200, 10, text=f"{nombre}: no se pudo procesar ({resultado['error']})", new_x="LMARGIN", new_y="NEXT", align='L')
+            continue
+        _agregar_reporte_completo(pdf, resultado["rostro"], resultado["manos"],
+                                  titulo=f"Reporte de Segmentación y Análisis: {nombre}")
+    return _pdf_bytes(pdf)
+
+
+def _agregar_reporte_completo(pdf, rostro, manos, titulo="Reporte de Segmentación y Análisis"):
+    rostro_success = rostro is not None
+    manos_success = manos is not None
+    intensidades_rostro = rostro["intensidades"] if rostro_success else {}
+    intensidades_manos = manos["intensidades"] if manos_success else {}
+
+    # Página 1: Todas las imágenes en una sola página
+    pdf.add_page()
+    pdf.set_font("Arial", size=16)
+    pdf.cell(200, 10, text=titulo, new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(5)
+
+    # Configuración de posiciones y tamaños
+    image_width = 90  # Ancho de cada imagen
+    image_height = 60  # Alto de cada imagen
+    start_x = 10
+    current_y = 25
+
+    # Contador de imágenes para organizar la disposición
+    images_added = 0
+
+    # Rostro segmentado
+    if rostro_success:
+        # Título para la imagen de rostro
+        pdf.set_font("Arial", style='B', size=10)
+        pdf.set_xy(start_x, current_y)
+        pdf.cell(image_width, 5, text="Rostro Segmentado", align='C')
+
+        # Imagen de rostro
+        pdf.image(_imagen_para_pdf(rostro["imagen"]), x=start_x, y=current_y + 5, w=image_width, h=image_height)
+        images_added += 1
+
+    # Manos segmentadas (lado derecho si hay rostro, sino en la izquierda)
+    if manos_success:
+        x_pos = start_x + (image_width + 10) if images_added > 0 else start_x
+        y_pos = current_y if images_added > 0 else current_y
+
+        # Si ya hay una imagen en la fila, poner al lado; si no, nueva fila
+        if images_added >= 2:
+            y_pos = current_y + image_height + 15
+            x_pos = start_x
+            images_added = 0
+
+        # Título para la imagen de manos
+        pdf.set_font("Arial", style='B', size=10)
+        pdf.set_xy(x_pos, y_pos)
+        pdf.cell(image_width, 5, text="Manos Segmentadas", align='C')
+
+        # Imagen de manos
+        pdf.image(_imagen_para_pdf(manos["imagen"]), x=x_pos, y=y_pos + 5, w=image_width, h=image_height)
+        images_added += 1
+
+        # Actualizar current_y para la siguiente imagen
+        if images_added == 1:
+            current_y = y_pos
+
+    # Manos numeradas
+    if manos_success and manos["imagen_numerada"] is not None:
+        x_pos = start_x + (image_width + 10) if images_added == 1 else start_x
+        y_pos = current_y if images_added == 1 else current_y + image_height + 15
+
+        # Título para la imagen de manos numeradas
+        pdf.set_font("Arial", style='B', size=10)
+        pdf.set_xy(x_pos, y_pos)
+        pdf.cell(image_width, 5, text="Manos Numeradas", align='C')
+
+        # Imagen de manos numeradas
+        pdf.image(_imagen_para_pdf(manos["imagen_numerada"]), x=x_pos, y=y_pos + 5, w=image_width, h=image_height)
+
+    # Página 2: Resumen de procesamiento
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, text=f"Rostro procesado: {'Sí' if rostro_success else 'No'}", new_x="LMARGIN", new_y="NEXT", align='L')
+    pdf.cell(200, 10, text=f"Manos procesadas: {'Sí' if manos_success else 'No'}", new_x="LMARGIN", new_y="NEXT", align='L')
+    pdf.ln(10)
+
+    # Página 3: Tablas de análisis
+    if intensidades_rostro or intensidades_manos:
+        pdf.add_page()
+        pdf.set_font("Arial", size=16)
+        pdf.cell(200, 10, text="Análisis de Intensidad de Píxeles", new_x="LMARGIN", new_y="NEXT", align='C')
+        pdf.ln(10)
+
+        if intensidades_rostro:
+            pdf.set_font("Arial", style='B', size=12)
+            pdf.cell(0, 10, "Rostro:", new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(2)
+            pdf.set_font("Arial", style='B', size=10)
+            pdf.cell(90, 8, "Zona del Rostro", border=1, align='C')
+            pdf.cell(90, 8, "Intensidad Promedio", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font("Arial", size=10)
+            for zona, promedio in intensidades_rostro.items():
+                pdf.cell(90, 8, zona, border=1, align='L')
+                pdf.cell(90, 8, f"{promedio:.2f}", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(10)
+
+        if intensidades_manos:
+            pdf.set_font("Arial", style='B', size=12)
+            pdf.cell(0, 10, "Manos:", new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(2)
+            pdf.set_font("Arial", style='B', size=10)
+            pdf.cell(90, 8, "Zona de la Mano", border=1, align='C')
+            pdf.cell(90, 8, "Intensidad Promedio", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font("Arial", size=10)
+
+            # Dividir la tabla de manos en dos columnas si es muy larga
+            items = list(intensidades_manos.items())
+            mid_point = len(items) // 2 + len(items) % 2
+            col1 = items[:mid_point]
+            col2 = items[mid_point:]
+
+            max_len = max(len(col1), len(col2))
+
+            for i in range(max_len):
+                if i < len(col1):
+                    zona1, prom1 = col1[i]
+                    pdf.cell(45, 8, zona1, border=1, align='L')
+                    pdf.cell(45, 8, str(prom1), border=1, align='C')
+                else:
+                    pdf.cell(90, 8, "", border=1) # Celda vacía
+
+                if i < len(col2):
+                    zona2, prom2 = col2[i]
+                    pdf.cell(45, 8, zona2, border=1, align='L')
+                    pdf.cell(45, 8, str(prom2), border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+                else:
+                    pdf.cell(90, 8, "", border=1, new_x="LMARGIN", new_y="NEXT") # Celda vacía
+
+
+@cronometrar("render_pdf")
+def generar_pdf_video(nombre, informacion):
+    """
+    Resumen de un video: datos del análisis y, por zona, intensidad promedio,
+    mínima y máxima a lo largo de los cuadros analizados.
+
+    Args:
+        nombre (str): Nombre del archivo de video
+        informacion (dict): Resultado de video.procesar_video
+    """
+    # Las fuentes estándar de FPDF solo admiten latin-1
+    nombre = nombre.encode("latin-1", "replace").decode("latin-1")
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=16)
+    pdf.cell(200, 10, text=f"Resumen del Video: {nombre}", new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(5)
+
+    pdf.set_font("Arial", size=12)
+    duracion = informacion["cuadros"] / informacion["fps"] if informacion["fps"] else 0
+    for texto in (f"Resolución: {informacion['ancho']} x {informacion['alto']}, {informacion['fps']:.2f} fps, {duracion:.1f} s",
+                  f"Cuadros analizados: {informacion['cuadros_analizados']} (uno de cada {informacion['paso']})",
+                  f"Cuadros con rostro: {informacion['cuadros_con_rostro']}",
+                  f"Cuadros con manos: {informacion['cuadros_con_manos']}"):
+        pdf.cell(200, 8, text=texto, new_x="LMARGIN", new_y="NEXT", align='L')
+    pdf.ln(5)
+
+    for parte, titulo, encabezado in (("rostro", "Rostro:", "Zona del Rostro"), ("manos", "Manos:", "Zona de la Mano")):
+        zonas = informacion["resumen"][parte]
+        if not zonas:
+            continue
+        pdf.set_font("Arial", style='B', size=12)
+        pdf.cell(0, 10, titulo, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+        pdf.set_font("Arial", style='B', size=10)
+        pdf.cell(60, 8, encabezado, border=1, align='C')
+        for columna in ("Cuadros", "Promedio", "Mínimo"):
+            pdf.cell(30, 8, columna, border=1, align='C')
+        pdf.cell(30, 8, "Máximo", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Arial", size=10)
+        for zona, valores in zonas.items():
+            pdf.cell(60, 8, zona, border=1, align='L')
+            pdf.cell(30, 8, str(valores["cuadros"]), border=1, align='C')
+            pdf.cell(30, 8, f"{valores['promedio']:.2f}", border=1, align='C')
+            pdf.cell(30, 8, f"{valores['minimo']:.2f}", border=1, align='C')
+            pdf.cell(30, 8, f"{valores['maximo']:.2f}", border=1, align='C', new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(10)
+
+    return _pdf_bytes(pdf)
@@ -0,0 +1,155 @@
+#Sesiones de seguimiento: FaceMesh y Hands con static_image_mode=False por sesión
+import asyncio
+import json
+import threading
+import time
+
+import config
+from faceMesh import crear_face_mesh, OPCIONES_FACE_MESH_SEGUIMIENTO
+from handsMesh import crear_hands, OPCIONES_HANDS_SEGUIMIENTO
+from analisis import decodificar_imagen, medir_cuadro
+
+
+class SesionSeguimiento:
+    """
+    Trackers de MediaPipe de una sola secuencia de cuadros (una conexión
+    WebSocket o un video).
+
+    En modo seguimiento MediaPipe reutiliza los landmarks del cuadro anterior
+    y solo vuelve a ejecutar la detección completa cuando pierde el rostro o
+    una mano, así que cada sesión necesita sus propias instancias: el estado
+    no se puede compartir entre secuencias. Los modelos se cargan en el primer
+    cuadro, dentro del hilo que lo procesa.
+    """
+
+    def __init__(self, landmarks=True):
+        self.landmarks = landmarks
+        self._face_mesh = None
+        self._hands = None
+        self._lock = threading.Lock()
+        self._cerrada = False
+
+    def medir(self, image):
+        """Mediciones de un cuadro ya decodificado (ver analisis.medir_cuadro)"""
+        with self._lock:
+            if self._cerrada:
+                raise RuntimeError("La sesión de seguimiento está cerrada")
+            if self._face_mesh is None:
+                self._face_mesh = crear_face_mesh(OPCIONES_FACE_MESH_SEGUIMIENTO)
+                self._hands = crear_hands(OPCIONES_HANDS_SEGUIMIENTO)
+            return medir_cuadro(image, self._face_mesh, self._hands, self.landmarks)
+
+    def procesar_cuadro(self, datos, numero=0, descartados=0):
+        """
+        Decodifica un cuadro (JPEG u otro formato de imagen) y devuelve sus
+        mediciones como JSON compacto en bytes.
+
+        Raises:
+            ImagenInvalida: Si los bytes no son una imagen válida
+        """
+        inicio = time.perf_counter()
+        resultado = self.medir(decodificar_imagen(datos))
+        resultado = {
+            "cuadro": numero,
+            "descartados": descartados,
+            "ms": round(1000 * (time.perf_counter() - inicio), 1),
+            **resultado,
+        }
+        return json.dumps(resultado, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def cerrar(self):
+        """Libera los trackers; espera a que termine el cuadro en curso"""
+        with self._lock:
+            self._cerrada = True
+            for instancia in (self._face_mesh, self._hands):
+                if instancia is not None:
+                    try:
+                        instancia.close()
+                    except Exception:
+                        pass
+            self._face_mesh = self._hands = None
+
+
+class UltimoCuadro:
+    """
+    Buzón de un solo cuadro entre la recepción y el procesamiento.
+
+    Si llega un cuadro nuevo antes de que se procese el pendiente, el
+    pendiente se descarta: cuando el cliente envía más rápido de lo que el
+    servidor procesa, siempre se analiza el cuadro más reciente y la latencia
+    no se acumula.
+    """
+
+    def __init__(self):
+        self._pendiente = None
+        self._hay_cuadro = asyncio.Event()
+        self._cerrado = False
+        self.recibidos = 0
+        self.descartados = 0
+
+    def poner(self, datos):
+        if self._pendiente is not None:
+            self.descartados += 1
+        self.recibidos += 1
+        self._pendiente = (self.recibidos, datos)
+        self._hay_cuadro.set()
+
+    def descartar(self):
+        """Cuenta como descartado un cuadro que se tomó pero no se pudo procesar"""
+        self.descartados += 1
+
+    def cerrar(self):
+        self._cerrado = True
+        self._hay_cuadro.set()
+
+    async def tomar(self):
+        """
+        Espera el siguiente cuadro.
+
+        Returns:
+            tuple | None: (número de cuadro, bytes), o None si se cerró sin cuadros pendientes
+        """
+        while self._pendiente is None:
+            if self._cerrado:
+                return None
+            self._hay_cuadro.clear()
+            await self._hay_cuadro.wait()
+        cuadro, self._pendiente = self._pendiente, None
+        return cuadro
+
+
+class LimiteSesiones:
+    """Cuenta las sesiones de seguimiento abiertas en el worker y limita su número"""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._abiertas = 0
+        self._rechazadas = 0
+        self._total = 0
+
+    def adquirir(self):
+        with self._lock:
+            if self._abiertas >= self.maximo:
+                self._rechazadas += 1
+                return False
+            self._abiertas += 1
+            self._total += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self._abiertas -= 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "maximo": self.maximo,
+                "abiertas": self._abiertas,
+                "total": self._total,
+                "rechazadas": self._rechazadas,
+            }
+
+
+# Sesiones del worker actual (gunicorn importa el módulo en cada worker)
+sesiones_seguimiento = LimiteSesiones(config.SEGUIMIENTO_MAX_SESIONES)
@@ -0,0 +1,156 @@
+#Lectura de subidas por fragmentos con límite de tamaño y hash incremental
+import hashlib
+
+from starlette.responses import JSONResponse
+
+import config
+from metricas import cronometrar
+
+MB = 1024 * 1024
+# Tamaño de cada lectura del archivo subido
+TAMANO_FRAGMENTO = 1024 * 1024
+# Margen sobre el tamaño del archivo para las cabeceras multipart y demás campos
+MARGEN_MULTIPART = 64 * 1024
+
+
+class SubidaDemasiadoGrande(Exception):
+    """El cuerpo de la petición o un archivo supera el límite configurado"""
+
+    def __init__(self, limite):
+        super().__init__(f"El archivo supera el máximo permitido de {limite // MB} MB")
+        self.limite = limite
+
+
+async def leer_subida(file, limite=None):
+    """
+    Lee un UploadFile por fragmentos calculando su SHA-256 al vuelo.
+
+    Se corta en cuanto se supera `limite` (o antes, si el tamaño ya se conoce)
+    y el contenido queda en un único bytearray, que el decodificador usa con
+    np.frombuffer sin copiarlo otra vez.
+
+    Returns:
+        tuple: (bytearray con el contenido, hash SHA-256 hex)
+
+    Raises:
+        SubidaDemasiadoGrande: Si el archivo supera el límite
+    """
+    limite = limite or config.MAX_SUBIDA_MB * MB
+    if file.size is not None and file.size > limite:
+        raise SubidaDemasiadoGrande(limite)
+
+    datos = bytearray()
+    hash_imagen = hashlib.sha256()
+    with cronometrar("lectura_subida"):
+        while True:
+            fragmento = await file.read(TAMANO_FRAGMENTO)
+            if not fragmento:
+                break
+            if len(datos) + len(fragmento) > limite:
+                raise SubidaDemasiadoGrande(limite)
+            hash_imagen.update(fragmento)
+            datos += fragmento
+    return datos, hash_imagen.hexdigest()
+
+
+async def guardar_subida(file, destino, limite):
+    """
+    Copia un UploadFile por fragmentos a un archivo abierto en modo binario,
+    sin tenerlo completo en memoria (p. ej. videos que OpenCV lee desde disco).
+
+    Returns:
+        int: Bytes copiados
+
+    Raises:
+        SubidaDemasiadoGrande: Si el archivo supera el límite
+    """
+    if file.size is not None and file.size > limite:
+        raise SubidaDemasiadoGrande(limite)
+
+    copiados = 0
+    with cronometrar("lectura_subida"):
+        while True:
+            fragmento = await file.read(TAMANO_FRAGMENTO)
+            if not fragmento:
+                return copiados
+            copiados += len(fragmento)
+            if copiados > limite:
+                raise SubidaDemasiadoGrande(limite)
+            destino.write(fragmento)
+
+
+def _respuesta_413(limite):
+    return JSONResponse(status_code=413, content={"detail": str(SubidaDemasiadoGrande(limite))})
+
+
+def limites_cuerpo():
+    """Límite general del cuerpo y límites por ruta, con margen para el multipart"""
+    limite = config.MAX_SUBIDA_MB * MB + MARGEN_MULTIPART
+    return limite, {
+        "/procesar-lote/": config.MAX_LOTE_MB * MB + MARGEN_MULTIPART,
+        "/procesar-video/": config.MAX_VIDEO_MB * MB + MARGEN_MULTIPART,
+    }
+
+
+class LimiteCuerpo:
+    """
+    Middleware ASGI que rechaza con 413 los cuerpos que superan el límite.
+
+    Con Content-Length se responde antes de leer nada; sin él (chunked) se
+    cuentan los bytes a medida que llegan y se corta en cuanto se supera el
+    límite, antes de que el parser multipart termine de recibir el archivo.
+    `limites` asocia prefijos de ruta con límites propios (p. ej. lotes).
+    """
+
+    def __init__(self, app, limite, limites=None):
+        self.app = app
+        self.limite = limite
+        self.limites = limites or {}
+
+    def _limite_ruta(self, ruta):
+        for prefijo, limite in self.limites.items():
+            if ruta.startswith(prefijo):
+                return limite
+        return self.limite
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limite = self._limite_ruta(scope["path"])
+        for nombre, valor in scope["headers"]:
+            if nombre == b"content-length" and valor.isdigit() and int(valor) > limite:
+                await _respuesta_413(limite)(scope, receive, send)
+                return
+
+        recibido = 0
+        excedido = False
+        respondido = False
+
+        async def recibir():
+            nonlocal recibido, excedido
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibido += len(mensaje.get("body", b""))
+                if recibido > limite:
+                    excedido = True
+                    raise SubidaDemasiadoGrande(limite)
+            return mensaje
+
+        async def enviar(mensaje):
+            nonlocal respondido
+            # Si el límite se superó, la respuesta de error que arme la app
+            # (p. ej. el 400 de FastAPI por un cuerpo incompleto) se reemplaza por el 413
+            if excedido:
+                if not respondido:
+                    respondido = True
+                    await _respuesta_413(limite)(scope, receive, send)
+                return
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        except SubidaDemasiadoGrande:
+            if not respondido:
+                await _respuesta_413(limite)(scope, receive, send)
@@ -0,0 +1,11 @@
+#Configuración común de las pruebas: los módulos del servidor se importan desde la raíz
+import os
+import sys
+
+# Antes de importar config: sin calentamiento, caches ni trabajos en segundo plano
+os.environ.setdefault("CALENTAMIENTO", "0")
+os.environ.setdefault("TRABAJOS_HILOS", "0")
+os.environ.pop("CACHE_DIRECTORIO", None)
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
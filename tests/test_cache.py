@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+
+from cacheResultados import (CacheMemoria, CacheDisco, CacheResultados, CacheEtapas, clave_resultado,
+                             hash_contenido, VERSION_REPORTES)
+
+
+def _clave(i):
+    return clave_resultado(hash_contenido(str(i).encode()), "prueba")
+
+
+# ================== CLAVES ==================
+def test_clave_cambia_con_endpoint_y_version():
+    hash_imagen = hash_contenido(b"imagen")
+    clave = clave_resultado(hash_imagen, "rostro")
+    assert clave == clave_resultado(hash_imagen, "rostro", VERSION_REPORTES)
+    assert clave != clave_resultado(hash_imagen, "manos")
+    assert clave != clave_resultado(hash_imagen, "rostro", "otra-version")
+    assert clave != clave_resultado(hash_contenido(b"otra imagen"), "rostro")
+
+
+# ================== MEMORIA ==================
+def test_memoria_desaloja_por_bytes_en_orden_lru():
+    cache = CacheMemoria(max_bytes=300)
+    cache.guardar("a", b"x" * 100)
+    cache.guardar("b", b"x" * 100)
+    cache.guardar("c", b"x" * 100)
+    assert cache.obtener("a") is not None  # "b" pasa a ser el menos usado
+    cache.guardar("d", b"x" * 100)
+
+    assert cache.obtener("b") is None
+    assert all(cache.obtener(clave) is not None for clave in ("a", "c", "d"))
+    estadisticas = cache.estadisticas()
+    assert estadisticas["bytes"] == 300
+    assert estadisticas["entradas"] == 3
+    assert estadisticas["desalojos"] == 1
+
+
+def test_memoria_no_guarda_valores_mayores_que_el_limite():
+    cache = CacheMemoria(max_bytes=100)
+    cache.guardar("a", b"x" * 50)
+    cache.guardar("grande", b"x" * 101)
+    assert cache.obtener("grande") is None
+    assert cache.obtener("a") is not None
+    assert cache.estadisticas()["bytes"] == 50
+
+
+def test_memoria_reemplazar_una_clave_no_duplica_bytes():
+    cache = CacheMemoria(max_bytes=1000)
+    cache.guardar("a", b"x" * 100)
+    cache.guardar("a", b"y" * 40)
+    assert cache.obtener("a") == b"y" * 40
+    assert cache.estadisticas()["bytes"] == 40
+
+
+# ================== DISCO ==================
+def test_disco_guarda_y_lee_sin_temporales(tmp_path):
+    cache = CacheDisco(str(tmp_path))
+    clave = _clave(1)
+    assert cache.obtener(clave) is None
+    cache.guardar(clave, b"contenido")
+    assert cache.obtener(clave) == b"contenido"
+
+    archivos = [nombre for _, _, nombres in os.walk(tmp_path) for nombre in nombres]
+    assert archivos == [clave + ".bin"]
+    assert cache.estadisticas()["aciertos"] == 1
+    assert cache.estadisticas()["fallos"] == 1
+
+
+def test_disco_desaloja_los_mas_antiguos_por_mtime(tmp_path):
+    cache = CacheDisco(str(tmp_path), max_bytes=1000, intervalo_limpieza=3600)
+    claves = [_clave(i) for i in range(15)]
+    for i, clave in enumerate(claves):
+        cache.guardar(clave, b"x" * 100)
+        os.utime(cache._ruta(clave), (1000 + i, 1000 + i))
+    # Un acierto renueva el mtime de la entrada más antigua
+    assert cache.obtener(claves[0]) is not None
+
+    # 1500 bytes con límite de 1000: se borra hasta bajar al 90 % (900 bytes)
+    assert cache.limpiar() == 6
+    presentes = [clave for clave in claves if os.path.exists(cache._ruta(clave))]
+    assert presentes == [claves[0]] + claves[7:]
+    assert cache.estadisticas()["bytes"] == 900
+    assert cache.estadisticas()["desalojos"] == 6
+
+
+def test_disco_limpia_al_guardar_como_mucho_una_vez_por_intervalo(tmp_path):
+    cache = CacheDisco(str(tmp_path), max_bytes=250, intervalo_limpieza=3600)
+    for i in range(5):
+        cache.guardar(_clave(i), b"x" * 100)
+    # La primera escritura limpió (sin nada que borrar); las siguientes esperan al intervalo
+    assert cache.estadisticas()["desalojos"] == 0
+    assert sum(len(nombres) for _, _, nombres in os.walk(tmp_path)) == 5
+
+    cache.intervalo_limpieza = 0
+    cache.guardar(_clave(5), b"x" * 100)
+    assert sum(len(nombres) for _, _, nombres in os.walk(tmp_path)) == 2
+
+
+def test_disco_sin_limite_no_borra(tmp_path):
+    cache = CacheDisco(str(tmp_path), max_bytes=0, intervalo_limpieza=0)
+    for i in range(5):
+        cache.guardar(_clave(i), b"x" * 100)
+    assert sum(len(nombres) for _, _, nombres in os.walk(tmp_path)) == 5
+    assert cache.estadisticas()["bytes"] is None
+
+
+# ================== DOS NIVELES ==================
+def test_resultados_promueve_de_disco_a_memoria(tmp_path):
+    disco = CacheDisco(str(tmp_path))
+    disco.guardar("clave", b"reporte")
+    memoria = CacheMemoria(max_bytes=1000)
+    cache = CacheResultados(memoria=memoria, disco=disco, nombre="pruebas")
+
+    assert cache.obtener("clave") == b"reporte"
+    assert memoria.obtener("clave") == b"reporte"
+    assert cache.obtener("otra") is None
+
+
+def test_etapas_guarda_arreglos_por_version():
+    cache = CacheEtapas(CacheResultados(memoria=CacheMemoria(1024 * 1024), nombre="pruebas_etapas"))
+    landmarks = np.arange(12, dtype=np.float32).reshape(4, 3)
+    cache.guardar("rostro", "hash", "v1", {"landmarks": landmarks})
+
+    recuperado = cache.obtener("rostro", "hash", "v1")
+    np.testing.assert_array_equal(recuperado["landmarks"], landmarks)
+    assert cache.obtener("rostro", "hash", "v2") is None
+    assert cache.obtener("manos", "hash", "v1") is None
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+from ejecutor import EjecutorSegmentacion, ColaLlena
+
+
+@pytest.fixture
+def ejecutor():
+    ejecutor = EjecutorSegmentacion(hilos=1, cola_maxima=1)
+    yield ejecutor
+    ejecutor._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _bloqueada(evento):
+    return lambda: evento.wait(5)
+
+
+def test_parametros_invalidos():
+    with pytest.raises(ValueError):
+        EjecutorSegmentacion(hilos=0)
+    with pytest.raises(ValueError):
+        EjecutorSegmentacion(hilos=1, cola_maxima=-1)
+
+
+def test_ejecutar_devuelve_el_resultado(ejecutor):
+    assert asyncio.run(ejecutor.ejecutar(lambda a, b=0: a + b, 2, b=3)) == 5
+    estadisticas = ejecutor.estadisticas()
+    assert estadisticas["completadas"] == 1
+    assert estadisticas["en_cola"] == 0
+    assert estadisticas["en_ejecucion"] == 0
+
+
+def test_ejecutar_propaga_excepciones_y_libera_el_lugar(ejecutor):
+    def falla():
+        raise KeyError("x")
+
+    with pytest.raises(KeyError):
+        asyncio.run(ejecutor.ejecutar(falla))
+    assert ejecutor.estadisticas()["en_ejecucion"] == 0
+    assert asyncio.run(ejecutor.ejecutar(lambda: 1)) == 1
+
+
+def test_cola_llena_rechaza_con_retry_after(ejecutor):
+    liberar = threading.Event()
+
+    async def escenario():
+        pendientes = [asyncio.ensure_future(ejecutor.ejecutar(_bloqueada(liberar))) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ColaLlena) as error:
+            await ejecutor.ejecutar(lambda: None)
+        liberar.set()
+        await asyncio.gather(*pendientes)
+        return error.value
+
+    error = asyncio.run(escenario())
+    assert error.retry_after >= 1
+    estadisticas = ejecutor.estadisticas()
+    assert estadisticas["rechazadas"] == 1
+    assert estadisticas["aceptadas"] == 2
+    assert estadisticas["completadas"] == 2
+
+
+def test_comprobar_lugar_no_ocupa(ejecutor):
+    ejecutor.comprobar_lugar()
+    ejecutor.comprobar_lugar()
+    assert ejecutor.estadisticas()["en_cola"] == 0
+
+    liberar = threading.Event()
+    futuros = [ejecutor.enviar_bloqueante(_bloqueada(liberar)) for _ in range(2)]
+    with pytest.raises(ColaLlena):
+        ejecutor.comprobar_lugar()
+    liberar.set()
+    for futuro in futuros:
+        futuro.result(5)
+
+
+def test_cancelar_una_tarea_en_cola_libera_su_lugar(ejecutor):
+    liberar = threading.Event()
+    en_ejecucion = ejecutor.enviar_bloqueante(_bloqueada(liberar))
+    en_cola = ejecutor.enviar_bloqueante(lambda: None)
+    assert ejecutor.estadisticas()["en_cola"] == 1
+
+    assert en_cola.cancel()
+    assert ejecutor.estadisticas()["en_cola"] == 0
+    ejecutor.comprobar_lugar()
+    liberar.set()
+    en_ejecucion.result(5)
+
+
+def test_enviar_bloqueante_espera_lugar_sin_contar_como_rechazada(ejecutor):
+    liberar = threading.Event()
+    futuros = [ejecutor.enviar_bloqueante(_bloqueada(liberar)) for _ in range(2)]
+    resultado = []
+    hilo = threading.Thread(target=lambda: resultado.append(ejecutor.ejecutar_bloqueante(lambda: "listo")))
+    hilo.start()
+    hilo.join(0.1)
+    assert hilo.is_alive()
+
+    liberar.set()
+    hilo.join(5)
+    assert resultado == ["listo"]
+    for futuro in futuros:
+        futuro.result(5)
+    assert ejecutor.estadisticas()["rechazadas"] == 0
+    assert ejecutor.estadisticas()["completadas"] == 3
+
+
+def test_fallo_al_enviar_devuelve_el_lugar():
+    ejecutor = EjecutorSegmentacion(hilos=1, cola_maxima=0)
+    ejecutor._executor.shutdown()
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            asyncio.run(ejecutor.ejecutar(lambda: None))
+    with pytest.raises(RuntimeError):
+        ejecutor.ejecutar_bloqueante(lambda: None)
+    assert ejecutor.estadisticas()["en_cola"] == 0
+    ejecutor.comprobar_lugar()
+
+
+def test_en_cada_hilo_usa_hilos_distintos():
+    ejecutor = EjecutorSegmentacion(hilos=3)
+    try:
+        nombres = ejecutor.en_cada_hilo(lambda: threading.current_thread().name)
+    finally:
+        ejecutor._executor.shutdown()
+    assert len(set(nombres)) == 3
+    assert ejecutor.estadisticas()["aceptadas"] == 0
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+import pytest
+
+from estadisticasZonas import estadisticas_por_zona, estadisticas_por_etiqueta
+
+
+def _referencia(gray_image, puntos):
+    """Estadísticas con una máscara del tamaño de la imagen por zona"""
+    mascara = np.zeros(gray_image.shape, np.uint8)
+    cv2.fillPoly(mascara, [np.asarray(puntos, np.int32).reshape(-1, 2)], 255)
+    valores = gray_image[mascara == 255].astype(np.float64)
+    if valores.size == 0:
+        return {"promedio": 0, "desviacion": 0, "minimo": None, "maximo": None, "pixeles": 0}
+    return {
+        "promedio": valores.mean(),
+        "desviacion": valores.std(),
+        "minimo": int(valores.min()),
+        "maximo": int(valores.max()),
+        "pixeles": int(valores.size),
+    }
+
+
+def _comparar(resultado, esperado):
+    assert resultado["pixeles"] == esperado["pixeles"]
+    assert resultado["minimo"] == esperado["minimo"]
+    assert resultado["maximo"] == esperado["maximo"]
+    assert resultado["promedio"] == pytest.approx(esperado["promedio"], abs=1e-9)
+    assert resultado["desviacion"] == pytest.approx(esperado["desviacion"], abs=1e-9)
+
+
+def _poligonos(generador, cantidad, w, h):
+    poligonos = {}
+    for i in range(cantidad):
+        centro = generador.uniform((-20, -20), (w + 20, h + 20))
+        angulos = np.sort(generador.uniform(0, 2 * np.pi, generador.integers(3, 9)))
+        radios = generador.uniform(5, 60, angulos.size)
+        poligonos[f"zona {i}"] = np.stack([centro[0] + radios * np.cos(angulos),
+                                           centro[1] + radios * np.sin(angulos)], axis=1).astype(np.int32)
+    return poligonos
+
+
+@pytest.mark.parametrize("cantidad", [1, 8, 9, 16, 40])
+def test_coincide_con_mascaras_completas(cantidad):
+    generador = np.random.default_rng(cantidad)
+    gray_image = generador.integers(0, 256, (180, 240), dtype=np.uint8)
+    poligonos = _poligonos(generador, cantidad, 240, 180)
+
+    resultados = estadisticas_por_zona(gray_image, poligonos)
+    assert list(resultados) == list(poligonos)
+    for nombre, puntos in poligonos.items():
+        _comparar(resultados[nombre], _referencia(gray_image, puntos))
+
+
+def test_zonas_solapadas_conservan_los_pixeles_compartidos():
+    gray_image = np.full((50, 50), 100, np.uint8)
+    gray_image[20:30, 20:30] = 200
+    cuadrado = np.array([[10, 10], [39, 10], [39, 39], [10, 39]])
+    resultados = estadisticas_por_zona(gray_image, {"A": cuadrado, "B": cuadrado + 5})
+    _comparar(resultados["A"], _referencia(gray_image, cuadrado))
+    _comparar(resultados["B"], _referencia(gray_image, cuadrado + 5))
+
+
+def test_zona_fuera_de_la_imagen():
+    gray_image = np.zeros((20, 20), np.uint8)
+    resultados = estadisticas_por_zona(gray_image, {"fuera": np.array([[30, 30], [40, 30], [40, 40]])})
+    assert resultados["fuera"]["pixeles"] == 0
+    assert resultados["fuera"]["minimo"] is None
+    assert estadisticas_por_zona(gray_image, {}) == {}
+
+
+def test_rechaza_imagenes_que_no_son_grises_uint8():
+    with pytest.raises(ValueError):
+        estadisticas_por_zona(np.zeros((10, 10, 3), np.uint8), {})
+    with pytest.raises(ValueError):
+        estadisticas_por_zona(np.zeros((10, 10), np.float32), {})
+
+
+def test_por_etiqueta_coincide_con_mascaras():
+    generador = np.random.default_rng(0)
+    gray_image = generador.integers(0, 256, (60, 80), dtype=np.uint8)
+    etiquetas = generador.integers(0, 5, (60, 80))
+    resultados = estadisticas_por_etiqueta(gray_image, etiquetas, num_zonas=6)
+    assert len(resultados) == 6
+    for zona, resultado in enumerate(resultados, start=1):
+        valores = gray_image[etiquetas == zona].astype(np.float64)
+        if valores.size == 0:
+            assert resultado["pixeles"] == 0
+            continue
+        _comparar(resultado, {"promedio": valores.mean(), "desviacion": valores.std(),
+                              "minimo": int(valores.min()), "maximo": int(valores.max()),
+                              "pixeles": int(valores.size)})
@@ -0,0 +1,90 @@
+import zipfile
+from io import BytesIO
+
+import pytest
+
+import config
+from lote import LoteInvalido, es_zip, extraer_zip, procesar_lote
+
+MB = 1024 * 1024
+
+
+def _zip(miembros, compresion=zipfile.ZIP_DEFLATED):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compresion) as archivo:
+        for nombre, contenido in miembros:
+            archivo.writestr(nombre, contenido)
+    return buffer.getvalue()
+
+
+def test_es_zip():
+    assert es_zip("lote.ZIP", None)
+    assert es_zip(None, "application/zip")
+    assert not es_zip("foto.jpg", "image/jpeg")
+
+
+def test_extrae_solo_imagenes_en_orden():
+    datos = _zip([("fotos/b.jpg", b"b"), ("notas.txt", b"x"), ("fotos/", b""), ("a.PNG", b"a")])
+    assert extraer_zip(datos) == [("b.jpg", b"b"), ("a.PNG", b"a")]
+
+
+def test_zip_invalido():
+    with pytest.raises(LoteInvalido):
+        extraer_zip(b"esto no es un zip")
+
+
+def test_maximo_de_imagenes():
+    datos = _zip([(f"{i}.jpg", b"x") for i in range(4)])
+    assert len(extraer_zip(datos, max_imagenes=4)) == 4
+    with pytest.raises(LoteInvalido, match="3 imágenes"):
+        extraer_zip(datos, max_imagenes=3)
+
+
+def test_limite_de_bytes_descomprimidos(monkeypatch):
+    monkeypatch.setattr(config, "MAX_LOTE_MB", 1)
+    assert len(extraer_zip(_zip([("a.jpg", b"\0" * (MB // 2))]))) == 1
+    # Cada miembro cabe, pero la suma no
+    with pytest.raises(LoteInvalido, match="1 MB"):
+        extraer_zip(_zip([("a.jpg", b"\0" * (600 * 1024)), ("b.jpg", b"\0" * (600 * 1024))]))
+
+
+def test_bomba_de_compresion(monkeypatch):
+    monkeypatch.setattr(config, "MAX_LOTE_MB", 1)
+    datos = _zip([("bomba.jpg", b"\0" * (20 * MB))])
+    assert len(datos) < 100 * 1024
+    with pytest.raises(LoteInvalido):
+        extraer_zip(datos)
+
+
+def test_tamano_declarado_falso_no_evade_el_limite(monkeypatch):
+    monkeypatch.setattr(config, "MAX_LOTE_MB", 1)
+    contenido = b"\0" * (2 * MB)
+    datos = bytearray(_zip([("a.jpg", contenido)]))
+    # Tamaño descomprimido declarado de 10 bytes en la cabecera local y en el directorio central
+    real = len(contenido).to_bytes(4, "little")
+    falso = (10).to_bytes(4, "little")
+    assert datos.count(real) == 2
+    datos = bytes(datos).replace(real, falso)
+    with pytest.raises(LoteInvalido):
+        extraer_zip(datos)
+
+
+def test_miembro_corrupto():
+    datos = bytearray(_zip([("a.jpg", b"contenido de prueba " * 100)]))
+    datos[60:80] = b"\xff" * 20
+    with pytest.raises(LoteInvalido):
+        extraer_zip(bytes(datos))
+
+
+def test_procesar_lote_valida_la_entrada():
+    with pytest.raises(LoteInvalido):
+        procesar_lote([], "json")
+    with pytest.raises(LoteInvalido):
+        procesar_lote([("a.jpg", b"x")], "csv")
+
+
+def test_procesar_lote_reporta_imagenes_invalidas_por_separado():
+    resultado = procesar_lote([("a.jpg", b"no es imagen"), ("b.jpg", b"tampoco")], "json")
+    assert resultado["total"] == 2
+    assert resultado["errores"] == 2
+    assert [imagen["nombre"] for imagen in resultado["imagenes"]] == ["a.jpg", "b.jpg"]
@@ -0,0 +1,66 @@
+import pstats
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import perfiles
+
+
+# ================== RUTAS ==================
+def test_ruta_perfil_valida_id_y_formato(tmp_path):
+    id_perfil = uuid.uuid4().hex
+    (tmp_path / f"{id_perfil}.json").write_text("{}")
+
+    assert perfiles.ruta_perfil(id_perfil, "json", str(tmp_path)) == str(tmp_path / f"{id_perfil}.json")
+    assert perfiles.ruta_perfil(id_perfil, "pstats", str(tmp_path)) is None
+    assert perfiles.ruta_perfil(id_perfil, "exe", str(tmp_path)) is None
+
+
+@pytest.mark.parametrize("id_perfil", ["../secreto", "..", "ABCDEF" * 6, "a" * 31, "a" * 33, "a" * 31 + "/", ""])
+def test_ruta_perfil_rechaza_ids_invalidos(tmp_path, id_perfil):
+    assert perfiles.ruta_perfil(id_perfil, "json", str(tmp_path)) is None
+
+
+# ================== MIDDLEWARE ==================
+def _trabajo():
+    return sum(i * i for i in range(20_000))
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    app = FastAPI()
+    app.add_middleware(perfiles.PerfiladoPeticiones, cabecera=True, directorio=str(tmp_path), maximo=2)
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    @app.get("/trabajo")
+    async def trabajo():
+        return {"resultado": perfiles.enviar(executor, _trabajo).result()}
+
+    with TestClient(app) as cliente:
+        yield cliente
+    executor.shutdown()
+
+
+def test_solo_perfila_con_la_cabecera(cliente, tmp_path):
+    assert "x-perfil-id" not in cliente.get("/trabajo").headers
+    assert perfiles.listar(str(tmp_path)) == []
+
+    respuesta = cliente.get("/trabajo", headers={"X-Perfilar": "1"})
+    id_perfil = respuesta.headers["x-perfil-id"]
+    [metadatos] = perfiles.listar(str(tmp_path))
+    assert metadatos["id"] == id_perfil
+    assert metadatos["ruta"] == "/trabajo"
+    assert metadatos["estado"] == 200
+
+    # El tramo enviado al executor queda en el pstats del perfil
+    estadisticas = pstats.Stats(perfiles.ruta_perfil(id_perfil, "pstats", str(tmp_path)))
+    assert any(funcion[2] == "_trabajo" for funcion in estadisticas.stats)
+
+
+def test_conserva_como_maximo_los_mas_recientes(cliente, tmp_path):
+    ids = [cliente.get("/trabajo", headers={"X-Perfilar": "1"}).headers["x-perfil-id"] for _ in range(3)]
+    assert [metadatos["id"] for metadatos in perfiles.listar(str(tmp_path))] == ids[:0:-1]
+    assert perfiles.ruta_perfil(ids[0], "collapsed", str(tmp_path)) is None
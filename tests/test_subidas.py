@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+from io import BytesIO
+
+import pytest
+from fastapi import FastAPI, Request, UploadFile, File
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers, UploadFile as UploadFileStarlette
+
+from subidas import MB, SubidaDemasiadoGrande, LimiteCuerpo, leer_subida, guardar_subida
+
+
+def _subida(datos, size=None):
+    return UploadFileStarlette(BytesIO(datos), size=size, filename="imagen.jpg",
+                               headers=Headers({"content-type": "image/jpeg"}))
+
+
+# ================== LECTURA POR FRAGMENTOS ==================
+def test_leer_subida_devuelve_contenido_y_hash():
+    datos = bytes(range(256)) * 10_000
+    contenido, hash_imagen = asyncio.run(leer_subida(_subida(datos), limite=10 * MB))
+    assert bytes(contenido) == datos
+    assert hash_imagen == hashlib.sha256(datos).hexdigest()
+
+
+def test_leer_subida_corta_al_superar_el_limite():
+    with pytest.raises(SubidaDemasiadoGrande):
+        asyncio.run(leer_subida(_subida(b"x" * (MB + 1)), limite=MB))
+
+
+def test_leer_subida_rechaza_por_tamano_declarado_sin_leer():
+    archivo = _subida(b"x" * 10, size=2 * MB)
+    with pytest.raises(SubidaDemasiadoGrande):
+        asyncio.run(leer_subida(archivo, limite=MB))
+    assert archivo.file.tell() == 0
+
+
+def test_guardar_subida_copia_y_corta_al_superar_el_limite():
+    destino = BytesIO()
+    assert asyncio.run(guardar_subida(_subida(b"y" * 1000), destino, limite=MB)) == 1000
+    assert destino.getvalue() == b"y" * 1000
+
+    with pytest.raises(SubidaDemasiadoGrande):
+        asyncio.run(guardar_subida(_subida(b"y" * (MB + 1)), BytesIO(), limite=MB))
+
+
+# ================== LÍMITE DEL CUERPO ==================
+LIMITE = 1000
+
+
+@pytest.fixture
+def cliente():
+    app = FastAPI()
+    app.add_middleware(LimiteCuerpo, limite=LIMITE, limites={"/lote/": 10 * LIMITE})
+
+    @app.post("/cuerpo/")
+    async def cuerpo(request: Request):
+        return {"bytes": len(await request.body())}
+
+    @app.post("/lote/")
+    async def lote(request: Request):
+        return {"bytes": len(await request.body())}
+
+    @app.post("/archivo/")
+    async def archivo(file: UploadFile = File(...)):
+        return {"bytes": len(await file.read())}
+
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+def _fragmentos(total, tamano=100):
+    for inicio in range(0, total, tamano):
+        yield b"x" * min(tamano, total - inicio)
+
+
+def test_cuerpo_dentro_del_limite(cliente):
+    respuesta = cliente.post("/cuerpo/", content=b"x" * LIMITE)
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"bytes": LIMITE}
+
+
+def test_content_length_excedido_responde_413(cliente):
+    respuesta = cliente.post("/cuerpo/", content=b"x" * (LIMITE + 1))
+    assert respuesta.status_code == 413
+    assert "MB" in respuesta.json()["detail"]
+
+
+def test_chunked_excedido_responde_413(cliente):
+    respuesta = cliente.post("/cuerpo/", content=_fragmentos(LIMITE + 1))
+    assert respuesta.status_code == 413
+
+
+def test_chunked_dentro_del_limite(cliente):
+    respuesta = cliente.post("/cuerpo/", content=_fragmentos(LIMITE))
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"bytes": LIMITE}
+
+
+def test_multipart_excedido_responde_413(cliente):
+    respuesta = cliente.post("/archivo/", files={"file": ("imagen.jpg", b"x" * (2 * LIMITE), "image/jpeg")})
+    assert respuesta.status_code == 413
+
+
+def test_limite_propio_por_ruta(cliente):
+    assert cliente.post("/lote/", content=b"x" * (5 * LIMITE)).status_code == 200
+    assert cliente.post("/lote/", content=_fragmentos(10 * LIMITE + 1)).status_code == 413
@@ -0,0 +1,142 @@
+import sqlite3
+import time
+
+import pytest
+
+from trabajos import AlmacenTrabajos, GestorTrabajos, PENDIENTE, PROCESANDO, COMPLETADO, ERROR
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenTrabajos(str(tmp_path / "trabajos.db"), expiracion=3600, tiempo_maximo=600)
+
+
+def _esperar(condicion, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+# ================== ALMACÉN ==================
+def test_ciclo_completo(almacen):
+    id_trabajo = almacen.crear(b"imagen", "pdf", hash_imagen="abc")
+    estado = almacen.estado(id_trabajo)
+    assert estado["estado"] == PENDIENTE
+    assert estado["etapa"] == "en_cola"
+    assert estado["hash"] == "abc"
+    assert estado["error_cliente"] is False
+
+    assert almacen.reclamar("prueba") == (id_trabajo, "pdf", "abc", b"imagen")
+    assert almacen.estado(id_trabajo)["estado"] == PROCESANDO
+    almacen.etapa(id_trabajo, "rostro")
+    assert almacen.estado(id_trabajo)["etapa"] == "rostro"
+
+    almacen.completar(id_trabajo, b"%PDF")
+    assert almacen.estado(id_trabajo)["estado"] == COMPLETADO
+    assert almacen.resultado(id_trabajo) == b"%PDF"
+    with sqlite3.connect(almacen.ruta) as conexion:
+        assert conexion.execute("SELECT entrada FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone() == (None,)
+
+
+def test_reclamar_toma_el_mas_antiguo_una_sola_vez(almacen):
+    primero = almacen.crear(b"1", "json")
+    segundo = almacen.crear(b"2", "json")
+    assert almacen.reclamar("a")[0] == primero
+    assert almacen.reclamar("b")[0] == segundo
+    assert almacen.reclamar("c") is None
+
+
+def test_crear_con_resultado_queda_completado(almacen):
+    id_trabajo = almacen.crear(b"imagen", "json", resultado=b"{}")
+    assert almacen.estado(id_trabajo)["estado"] == COMPLETADO
+    assert almacen.resultado(id_trabajo) == b"{}"
+    assert almacen.reclamar("prueba") is None
+
+
+def test_fallar_distingue_errores_del_cliente(almacen):
+    servidor = almacen.crear(b"1", "pdf")
+    cliente = almacen.crear(b"2", "pdf")
+    almacen.fallar(servidor, "sin memoria")
+    almacen.fallar(cliente, "imagen inválida", cliente=True)
+
+    assert almacen.estado(servidor)["estado"] == ERROR
+    assert almacen.estado(servidor)["error_cliente"] is False
+    assert almacen.estado(cliente)["error"] == "imagen inválida"
+    assert almacen.estado(cliente)["error_cliente"] is True
+    assert almacen.estadisticas()[ERROR] == 2
+
+
+def test_expirados_no_se_encuentran_y_se_borran(tmp_path):
+    almacen = AlmacenTrabajos(str(tmp_path / "trabajos.db"), expiracion=-1)
+    id_trabajo = almacen.crear(b"imagen", "pdf", resultado=b"%PDF")
+    assert almacen.estado(id_trabajo) is None
+    assert almacen.resultado(id_trabajo) is None
+
+    almacen.mantenimiento()
+    with sqlite3.connect(almacen.ruta) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM trabajos").fetchone() == (0,)
+
+
+def test_mantenimiento_devuelve_a_la_cola_los_colgados(tmp_path):
+    almacen = AlmacenTrabajos(str(tmp_path / "trabajos.db"), tiempo_maximo=-1)
+    id_trabajo = almacen.crear(b"imagen", "pdf")
+    almacen.reclamar("worker-muerto")
+    almacen.mantenimiento()
+
+    estado = almacen.estado(id_trabajo)
+    assert estado["estado"] == PENDIENTE
+    assert estado["etapa"] == "en_cola"
+    assert almacen.reclamar("otro")[0] == id_trabajo
+
+
+def test_migra_bases_sin_error_cliente(tmp_path):
+    ruta = str(tmp_path / "antigua.db")
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute(
+            "CREATE TABLE trabajos (id TEXT PRIMARY KEY, estado TEXT NOT NULL, etapa TEXT, formato TEXT NOT NULL,"
+            " hash TEXT, error TEXT, creado REAL NOT NULL, actualizado REAL NOT NULL, expira REAL NOT NULL,"
+            " procesador TEXT, entrada BLOB, resultado BLOB)")
+        ahora = time.time()
+        conexion.execute("INSERT INTO trabajos VALUES ('viejo', ?, 'en_cola', 'pdf', NULL, NULL, ?, ?, ?,"
+                         " NULL, x'00', NULL)", (PENDIENTE, ahora, ahora, ahora + 3600))
+
+    almacen = AlmacenTrabajos(ruta)
+    assert almacen.estado("viejo")["error_cliente"] is False
+    almacen.fallar("viejo", "imagen inválida", cliente=True)
+    assert almacen.estado("viejo")["error_cliente"] is True
+
+
+# ================== GESTOR ==================
+class ErrorDeEntrada(ValueError):
+    pass
+
+
+def _procesar(datos, hash_imagen, progreso):
+    progreso("procesando")
+    if datos == b"invalida":
+        raise ErrorDeEntrada("no es una imagen")
+    if datos == b"rompe":
+        raise RuntimeError("fallo interno")
+    return datos.upper()
+
+
+def test_gestor_procesa_y_clasifica_errores(almacen):
+    gestor = GestorTrabajos(almacen, {"pdf": _procesar}, hilos=1, intervalo=0.05,
+                            errores_cliente=(ErrorDeEntrada,))
+    bien = almacen.crear(b"ok", "pdf")
+    invalida = almacen.crear(b"invalida", "pdf")
+    rompe = almacen.crear(b"rompe", "pdf")
+    gestor.iniciar()
+    try:
+        assert _esperar(lambda: all(almacen.estado(i)["estado"] in (COMPLETADO, ERROR)
+                                    for i in (bien, invalida, rompe)))
+    finally:
+        gestor.detener(espera=5)
+
+    assert almacen.resultado(bien) == b"OK"
+    assert almacen.estado(invalida)["error_cliente"] is True
+    assert almacen.estado(rompe)["estado"] == ERROR
+    assert almacen.estado(rompe)["error_cliente"] is False
@@ -0,0 +1,235 @@
+#Trabajos asíncronos: alta inmediata, consulta de estado y descarga del resultado
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+FORMATOS_TRABAJO = ("pdf", "json")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    etapa TEXT,
+    formato TEXT NOT NULL,
+    hash TEXT,
+    error TEXT,
+    error_cliente INTEGER NOT NULL DEFAULT 0,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    expira REAL NOT NULL,
+    procesador TEXT,
+    entrada BLOB,
+    resultado BLOB
+);
+CREATE INDEX IF NOT EXISTS trabajos_estado ON trabajos (estado, creado);
+CREATE INDEX IF NOT EXISTS trabajos_expira ON trabajos (expira);
+"""
+
+_CAMPOS_ESTADO = ("id", "estado", "etapa", "formato", "hash", "error", "error_cliente", "creado", "actualizado",
+                  "expira")
+
+
+class AlmacenTrabajos:
+    """
+    Cola y estado de los trabajos en SQLite, compartida por todos los workers
+    de gunicorn que apunten al mismo archivo.
+
+    Cada operación abre su propia conexión (sqlite3 no comparte conexiones
+    entre hilos) y la base usa WAL para que las consultas de estado no
+    esperen a las escrituras.
+    """
+
+    def __init__(self, ruta, expiracion=3600, tiempo_maximo=600):
+        self.ruta = ruta
+        self.expiracion = expiracion
+        self.tiempo_maximo = tiempo_maximo
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        with self._conexion() as conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(_ESQUEMA)
+            # Bases creadas antes de que existiera la columna
+            columnas = {fila[1] for fila in conexion.execute("PRAGMA table_info(trabajos)")}
+            if "error_cliente" not in columnas:
+                conexion.execute("ALTER TABLE trabajos ADD COLUMN error_cliente INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _conexion(self):
+        with closing(sqlite3.connect(self.ruta, timeout=30)) as conexion:
+            with conexion:
+                yield conexion
+
+    def crear(self, entrada, formato, hash_imagen=None, resultado=None):
+        """Registra un trabajo pendiente (o ya completado si se conoce el resultado) y devuelve su id"""
+        ahora = time.time()
+        id_trabajo = uuid.uuid4().hex
+        estado, etapa = (COMPLETADO, COMPLETADO) if resultado is not None else (PENDIENTE, "en_cola")
+        with self._conexion() as conexion:
+            conexion.execute(
+                "INSERT INTO trabajos (id, estado, etapa, formato, hash, creado, actualizado, expira, entrada, resultado)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_trabajo, estado, etapa, formato, hash_imagen, ahora, ahora, ahora + self.expiracion,
+                 None if resultado is not None else entrada, resultado))
+        return id_trabajo
+
+    def reclamar(self, procesador):
+        """
+        Toma el trabajo pendiente más antiguo para `procesador`.
+
+        Returns:
+            tuple | None: (id, formato, hash, entrada) o None si la cola está vacía
+        """
+        with self._conexion() as conexion:
+            # BEGIN IMMEDIATE: solo un worker a la vez puede reclamar
+            conexion.execute("BEGIN IMMEDIATE")
+            fila = conexion.execute(
+                "SELECT id, formato, hash, entrada FROM trabajos WHERE estado = ? ORDER BY creado LIMIT 1",
+                (PENDIENTE,)).fetchone()
+            if fila is None:
+                return None
+            conexion.execute(
+                "UPDATE trabajos SET estado = ?, etapa = ?, procesador = ?, actualizado = ? WHERE id = ?",
+                (PROCESANDO, "iniciando", procesador, time.time(), fila[0]))
+        return fila
+
+    def etapa(self, id_trabajo, etapa):
+        with self._conexion() as conexion:
+            conexion.execute("UPDATE trabajos SET etapa = ?, actualizado = ? WHERE id = ?",
+                             (etapa, time.time(), id_trabajo))
+
+    def completar(self, id_trabajo, resultado):
+        with self._conexion() as conexion:
+            conexion.execute(
+                "UPDATE trabajos SET estado = ?, etapa = ?, resultado = ?, entrada = NULL, actualizado = ? WHERE id = ?",
+                (COMPLETADO, COMPLETADO, resultado, time.time(), id_trabajo))
+
+    def fallar(self, id_trabajo, error, cliente=False):
+        """Marca el trabajo con error; `cliente` indica que la causa fue la entrada (p. ej. una imagen inválida)"""
+        with self._conexion() as conexion:
+            conexion.execute(
+                "UPDATE trabajos SET estado = ?, error = ?, error_cliente = ?, entrada = NULL, actualizado = ?"
+                " WHERE id = ?",
+                (ERROR, error, int(cliente), time.time(), id_trabajo))
+
+    def estado(self, id_trabajo):
+        """Estado del trabajo como dict, o None si no existe o ya expiró"""
+        with self._conexion() as conexion:
+            fila = conexion.execute(
+                f"SELECT {', '.join(_CAMPOS_ESTADO)} FROM trabajos WHERE id = ? AND expira > ?",
+                (id_trabajo, time.time())).fetchone()
+        if fila is None:
+            return None
+        estado = dict(zip(_CAMPOS_ESTADO, fila))
+        estado["error_cliente"] = bool(estado["error_cliente"])
+        return estado
+
+    def resultado(self, id_trabajo):
+        with self._conexion() as conexion:
+            fila = conexion.execute("SELECT resultado FROM trabajos WHERE id = ? AND expira > ?",
+                                    (id_trabajo, time.time())).fetchone()
+        return fila[0] if fila else None
+
+    def mantenimiento(self):
+        """
+        Borra los trabajos expirados y devuelve a la cola los que llevan más de
+        `tiempo_maximo` segundos procesándose (p. ej. si su worker murió).
+        """
+        ahora = time.time()
+        with self._conexion() as conexion:
+            borrados = conexion.execute("DELETE FROM trabajos WHERE expira <= ?", (ahora,)).rowcount
+            reintentos = conexion.execute(
+                "UPDATE trabajos SET estado = ?, etapa = ?, procesador = NULL WHERE estado = ? AND actualizado < ?",
+                (PENDIENTE, "en_cola", PROCESANDO, ahora - self.tiempo_maximo)).rowcount
+        if borrados or reintentos:
+            logger.info(f"Trabajos expirados: {borrados}, devueltos a la cola: {reintentos}")
+
+    def estadisticas(self):
+        with self._conexion() as conexion:
+            filas = conexion.execute(
+                "SELECT estado, COUNT(*) FROM trabajos WHERE expira > ? GROUP BY estado", (time.time(),)).fetchall()
+        conteos = {estado: 0 for estado in (PENDIENTE, PROCESANDO, COMPLETADO, ERROR)}
+        conteos.update(dict(filas))
+        return conteos
+
+
+class GestorTrabajos:
+    """
+    Hilos locales que procesan la cola de trabajos de un AlmacenTrabajos.
+
+    `procesadores` asocia cada formato con una función
+    funcion(datos, hash_imagen, progreso) que devuelve los bytes del resultado
+    y llama a progreso(etapa) al empezar cada etapa. Las excepciones de
+    `errores_cliente` se registran como errores de la entrada y no del servidor.
+    """
+
+    def __init__(self, almacen, procesadores, hilos=1, intervalo=1.0, errores_cliente=()):
+        self.almacen = almacen
+        self.procesadores = procesadores
+        self.errores_cliente = errores_cliente
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._hilos = []
+        self._nombre = f"{socket.gethostname()}:{os.getpid()}"
+
+    def iniciar(self):
+        if self._hilos:
+            return
+        self._detener.clear()
+        for i in range(self.hilos):
+            hilo = threading.Thread(target=self._bucle, name=f"trabajos-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self, espera=None):
+        self._detener.set()
+        self._aviso.set()
+        for hilo in self._hilos:
+            hilo.join(espera)
+        self._hilos = []
+
+    def avisar(self):
+        """Despierta a los hilos tras encolar un trabajo en este worker"""
+        self._aviso.set()
+
+    def _bucle(self):
+        ultimo_mantenimiento = 0.0
+        while not self._detener.is_set():
+            try:
+                if time.monotonic() - ultimo_mantenimiento > 60:
+                    self.almacen.mantenimiento()
+                    ultimo_mantenimiento = time.monotonic()
+                trabajo = self.almacen.reclamar(self._nombre)
+            except sqlite3.Error as e:
+                logger.error(f"Error en la cola de trabajos: {str(e)}")
+                trabajo = None
+            if trabajo is None:
+                self._aviso.wait(self.intervalo)
+                self._aviso.clear()
+                continue
+            self._procesar(*trabajo)
+
+    def _procesar(self, id_trabajo, formato, hash_imagen, entrada):
+        try:
+            resultado = self.procesadores[formato](
+                entrada, hash_imagen, progreso=lambda etapa: self.almacen.etapa(id_trabajo, etapa))
+            self.almacen.completar(id_trabajo, resultado)
+        except self.errores_cliente as e:
+            self.almacen.fallar(id_trabajo, str(e), cliente=True)
+        except Exception as e:
+            logger.error(f"Error en el trabajo {id_trabajo}: {str(e)}")
+            self.almacen.fallar(id_trabajo, str(e))
@@ -0,0 +1,223 @@
+#Procesamiento de videos: serie temporal de intensidades por zona con seguimiento
+#
+#   python video.py captura.mp4 --paso 5 --formato csv --salida serie.csv --pdf resumen.pdf
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+import cv2
+
+import config
+from seguimiento import SesionSeguimiento
+
+FORMATOS_VIDEO = ("csv", "json")
+EXTENSIONES_VIDEO = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+
+# Columnas del CSV: una fila por zona y cuadro analizado
+COLUMNAS_CSV = ("cuadro", "tiempo_s", "parte", "zona", "promedio")
+
+
+class VideoInvalido(ValueError):
+    """El archivo no se puede abrir como video o el formato pedido no existe"""
+
+
+def es_video(nombre, content_type):
+    return ((content_type or "").startswith("video/")
+            or (nombre or "").lower().endswith(EXTENSIONES_VIDEO))
+
+
+def cuadros_video(ruta, paso=1, max_cuadros=None):
+    """
+    Lee el video de a un cuadro y entrega uno de cada `paso`.
+
+    Los cuadros saltados solo se avanzan con grab() (sin convertirlos a BGR),
+    y nunca hay más de un cuadro decodificado en memoria.
+
+    Yields:
+        tuple: (número de cuadro en el video, tiempo en segundos, imagen BGR)
+    """
+    captura = cv2.VideoCapture(ruta)
+    if not captura.isOpened():
+        raise VideoInvalido("No se pudo abrir el video")
+    fps = captura.get(cv2.CAP_PROP_FPS) or 0.0
+    try:
+        numero = entregados = 0
+        while max_cuadros is None or entregados < max_cuadros:
+            if not captura.grab():
+                break
+            if numero % paso == 0:
+                ok, cuadro = captura.retrieve()
+                if not ok:
+                    break
+                tiempo = numero / fps if fps > 0 else captura.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                yield numero, tiempo, cuadro
+                entregados += 1
+            numero += 1
+    finally:
+        captura.release()
+
+
+def propiedades_video(ruta):
+    """fps, cuadros (según el contenedor), ancho y alto del video"""
+    captura = cv2.VideoCapture(ruta)
+    if not captura.isOpened():
+        raise VideoInvalido("No se pudo abrir el video")
+    try:
+        return {
+            "fps": round(captura.get(cv2.CAP_PROP_FPS) or 0.0, 3),
+            "cuadros": int(captura.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "ancho": int(captura.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "alto": int(captura.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        captura.release()
+
+
+class ResumenZonas:
+    """
+    Promedio, mínimo y máximo de cada zona a lo largo del video, acumulados
+    cuadro a cuadro (la memoria no depende de la duración).
+    """
+
+    def __init__(self):
+        self._zonas = {}
+
+    def agregar(self, parte, zonas):
+        for zona, promedio in zonas.items():
+            acumulado = self._zonas.setdefault((parte, zona), [0, 0.0, math.inf, -math.inf])
+            acumulado[0] += 1
+            acumulado[1] += promedio
+            acumulado[2] = min(acumulado[2], promedio)
+            acumulado[3] = max(acumulado[3], promedio)
+
+    def resultado(self):
+        """dict: parte ("rostro" / "manos") -> zona -> {"cuadros", "promedio", "minimo", "maximo"}"""
+        resumen = {"rostro": {}, "manos": {}}
+        for (parte, zona), (cuadros, suma, minimo, maximo) in self._zonas.items():
+            resumen[parte][zona] = {
+                "cuadros": cuadros,
+                "promedio": round(suma / cuadros, 2),
+                "minimo": minimo,
+                "maximo": maximo,
+            }
+        return resumen
+
+
+class _EscritorCSV:
+    def __init__(self, salida):
+        self._csv = csv.writer(salida)
+        self._csv.writerow(COLUMNAS_CSV)
+
+    def agregar(self, fila):
+        for parte in ("rostro", "manos"):
+            for zona, promedio in fila[parte].items():
+                self._csv.writerow((fila["cuadro"], fila["tiempo_s"], parte, zona, promedio))
+
+    def cerrar(self, informacion):
+        pass
+
+
+class _EscritorJSON:
+    """Escribe {"serie": [...], ...información y resumen} a medida que llegan los cuadros"""
+
+    def __init__(self, salida):
+        self._salida = salida
+        self._primera = True
+        salida.write('{"serie":[')
+
+    def agregar(self, fila):
+        if not self._primera:
+            self._salida.write(",")
+        self._primera = False
+        self._salida.write(json.dumps(fila, ensure_ascii=False, separators=(",", ":")))
+
+    def cerrar(self, informacion):
+        resto = json.dumps(informacion, ensure_ascii=False, separators=(",", ":"))
+        self._salida.write("]," + resto[1:] if len(resto) > 2 else "]}")
+
+
+def procesar_video(ruta, salida, formato="csv", paso=None, max_cuadros=None, progreso=None):
+    """
+    Analiza rostro y manos en uno de cada `paso` cuadros del video con
+    FaceMesh y Hands en modo seguimiento y escribe la serie temporal de
+    intensidades por zona en `salida` (archivo de texto) a medida que avanza.
+
+    La numeración de las zonas de la mano sale del etiquetado de cada cuadro
+    (ver analisis.medir_cuadro), así que la serie de una "Zona Mano N" puede
+    mezclar zonas distintas de la mano entre cuadros.
+
+    Args:
+        formato (str): "csv" (cuadro, tiempo_s, parte, zona, promedio) o "json"
+        paso (int | None): Se analiza uno de cada `paso` cuadros (por defecto VIDEO_PASO)
+        max_cuadros (int | None): Máximo de cuadros analizados
+        progreso (callable | None): progreso(cuadros_analizados) tras cada cuadro
+
+    Returns:
+        dict: Propiedades del video, "paso", "cuadros_analizados",
+              "cuadros_con_rostro", "cuadros_con_manos" y "resumen" por zona
+    """
+    if formato not in FORMATOS_VIDEO:
+        raise VideoInvalido(f"Formato no soportado: {formato}")
+    paso = max(1, paso or config.VIDEO_PASO)
+    informacion = dict(propiedades_video(ruta), paso=paso)
+
+    escritor = _EscritorCSV(salida) if formato == "csv" else _EscritorJSON(salida)
+    resumen = ResumenZonas()
+    analizados = con_rostro = con_manos = 0
+    sesion = SesionSeguimiento(landmarks=False)
+    try:
+        for numero, tiempo, cuadro in cuadros_video(ruta, paso, max_cuadros):
+            medicion = sesion.medir(cuadro)
+            rostro = medicion["rostro"]["zonas"] if medicion["rostro"] else {}
+            manos = medicion["manos"]["zonas"]
+            escritor.agregar({"cuadro": numero, "tiempo_s": round(tiempo, 3), "rostro": rostro, "manos": manos})
+            resumen.agregar("rostro", rostro)
+            resumen.agregar("manos", manos)
+            analizados += 1
+            con_rostro += bool(rostro)
+            con_manos += medicion["manos"]["detectadas"] > 0
+            if progreso is not None:
+                progreso(analizados)
+    finally:
+        sesion.cerrar()
+
+    informacion.update({
+        "cuadros_analizados": analizados,
+        "cuadros_con_rostro": con_rostro,
+        "cuadros_con_manos": con_manos,
+        "resumen": resumen.resultado(),
+    })
+    escritor.cerrar(informacion)
+    return informacion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serie temporal de intensidades por zona de un video")
+    parser.add_argument("video")
+    parser.add_argument("--paso", type=int, default=config.VIDEO_PASO, help="Analizar uno de cada N cuadros")
+    parser.add_argument("--formato", choices=FORMATOS_VIDEO, default="csv")
+    parser.add_argument("--salida", help="Archivo de la serie (por defecto, salida estándar)")
+    parser.add_argument("--pdf", help="Escribe también un PDF con el resumen por zona")
+    parser.add_argument("--max-cuadros", type=int)
+    args = parser.parse_args()
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8", newline="") as salida:
+            informacion = procesar_video(args.video, salida, args.formato, args.paso, args.max_cuadros)
+    else:
+        informacion = procesar_video(args.video, sys.stdout, args.formato, args.paso, args.max_cuadros)
+
+    if args.pdf:
+        from reportes import generar_pdf_video
+        with open(args.pdf, "wb") as f:
+            f.write(generar_pdf_video(os.path.basename(args.video), informacion))
+    print(f"{informacion['cuadros_analizados']} cuadros analizados "
+          f"(rostro en {informacion['cuadros_con_rostro']}, manos en {informacion['cuadros_con_manos']})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()